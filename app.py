@@ -10,12 +10,15 @@ import numpy as np
 from notifications import check_and_send_notifications
 
 # Importy lokalne
-from config import EDITIONS_CONFIG, MONTH_NAMES
+from config import EDITIONS_CONFIG, MONTH_NAMES, get_edition_status
 from page_form import show_submission_form
 from page_current_ranking import show_current_edition_dashboard
 from page_historical_stats import show_historical_stats
 from google_connect import connect_to_google_sheets
-from data_loader import load_google_sheet_data, process_raw_data
+from data_loader import load_google_sheet_data, prefetch_worksheets
+from derived_cache import get_derived_edition
+from sheet_refresher import start_sheet_refresher
+from write_queue import start_write_queue
 
 # ==============================================================================
 # 🎯 KOD GOOGLE ANALYTICS (Bezpośrednie wstawienie)
@@ -224,15 +227,11 @@ def check_if_edition_is_finished(sheet, edition_key):
         if df_raw.empty: return False
         
         expected_cols = ['Participant', 'Day', 'Status']
-        current_data, max_day, success = process_raw_data(df_raw, 'pl', expected_cols, sheet_name)
+        edition = get_derived_edition(sheet_name, df_raw, participants_list, 'pl', expected_cols)
         
-        if not success or max_day == 0: return False
+        if not edition.success or edition.max_day_reported == 0: return False
         
-        from page_current_ranking import calculate_ranking
-        _, elimination_map = calculate_ranking(current_data, max_day, 'pl', participants_list, ranking_type='live')
-        
-        eliminated_count = sum(1 for p in participants_list if elimination_map.get(p) is not None)
-        return eliminated_count == len(participants_list)
+        return bool((edition.matrix.elimination_days() > 0).all())
         
     except Exception:
         return False
@@ -241,41 +240,20 @@ def main():
     """Główna funkcja renderująca aplikację Streamlit."""
     
     sheet = connect_to_google_sheets()
+    # Wątek odświeżający zakładki w tle - jeden na proces, rendery czytają z pamięci
+    refresher = start_sheet_refresher(sheet) if sheet else None
+    # Wątek kolejki zapisów - wysyła też wpisy, które nie zdążyły wyjść przed restartem
+    write_worker = start_write_queue(sheet) if sheet else None
 
     # === 1. INICJALIZACJA I STATUSY EDYCJI ===
     TODAY = date.today()
     edition_statuses = {}
     
+    status_icons = {'UPCOMING': '⏳', 'ACTIVE': '🟢', 'FINALIZATION': '🚩', 'FINISHED': '🏁'}
+    
     for key, cfg in EDITIONS_CONFIG.items():
-        start_date = cfg['start_date']
-        start_month = start_date.month
-        start_year = start_date.year
-        today_month = TODAY.month
-        today_year = TODAY.year
-        
-        status = 'UNKNOWN'
-        icon = '❓'
-        
-        if start_year > today_year or (start_year == today_year and start_month > today_month):
-            status = 'UPCOMING'
-            icon = '⏳'
-        elif start_year < today_year or (start_year == today_year and start_month <= today_month):
-            months_since_start = (today_year - start_year) * 12 + (today_month - start_month)
-            if start_month == today_month and start_year == today_year:
-                status = 'ACTIVE'
-                icon = '🟢'
-            elif (start_year == today_year and start_month == today_month - 1) or (start_year == today_year - 1 and start_month == 12 and today_month == 1):
-                status = 'FINALIZATION'
-                icon = '🚩'
-            else:
-                status = 'FINISHED'
-                icon = '🏁'
-            
-            if cfg.get('is_manually_closed', False):
-                status = 'FINISHED'
-                icon = '🏁'
-        
-        edition_statuses[key] = {'status': status, 'icon': icon}
+        status = get_edition_status(cfg, TODAY)
+        edition_statuses[key] = {'status': status, 'icon': status_icons.get(status, '❓')}
     
     VISIBLE_EDITIONS_KEYS = [k for k, v in EDITIONS_CONFIG.items() if not v.get('is_hidden', False)] 
     
@@ -417,6 +395,14 @@ def main():
             st.session_state.nav_selection = key
             st.rerun()
             
+    # === POBRANIE ZAKŁADEK ===
+    # Log (pasek boczny, panel admina) i arkusz wybranej edycji - jednym żądaniem do Google Sheets
+    needed_worksheets = ["LogWpisow"]
+    nav_edition = re.match(r"nav_(\w+?)_(ranking|form)$", st.session_state.nav_selection)
+    if nav_edition and nav_edition.group(1) in EDITIONS_CONFIG:
+        needed_worksheets.append(EDITIONS_CONFIG[nav_edition.group(1)]['sheet_name'])
+    prefetch_worksheets(sheet, needed_worksheets)
+
     # === LOG ADMIN ===
     helper_percentage_all = 0
     helper_percentage_recent = 0
@@ -439,6 +425,25 @@ def main():
     
     log_title = f"📋 Log (Admin) - Pomoc: {helper_percentage_all}% ({helper_percentage_recent}% z ost. 200)"
     with st.sidebar.expander(log_title, expanded=False):
+        if refresher:
+            refresh_status = refresher.status()
+            age = refresh_status['last_refresh_age']
+            age_txt = f"{int(age)} s temu" if age is not None else "jeszcze nie było"
+            st.caption(f"🔄 Odświeżanie w tle: {age_txt} | nieudane: {refresh_status['failure_count']}")
+        if write_worker:
+            queue_status = write_worker.status()
+            st.caption(f"📤 Kolejka zapisów: {queue_status['pending']} oczekujących | nieudane próby: {queue_status['failure_count']} | porzucone: {queue_status['dead']}")
+            if queue_status['pending'] and queue_status['last_error']:
+                st.warning(f"Ostatni błąd zapisu: {queue_status['last_error']}")
+            if queue_status['dead']:
+                st.error(f"Wierszy nie udało się zapisać po wielu próbach: {queue_status['dead']}")
+                st.dataframe(pd.DataFrame([
+                    {'Czas': datetime.fromtimestamp(d['failed_at']).strftime('%H:%M %d-%m'), 'Zakładka': d['worksheet'], 'Wiersz': str(d['row']), 'Błąd': d['error']}
+                    for d in write_worker.queue.dead_writes()
+                ]), hide_index=True, width="stretch")
+                if st.button("📤 Ponów porzucone zapisy"):
+                    st.info(f"Ponowiono {write_worker.queue.retry_dead_writes()} wierszy.")
+                    write_worker.wake()
         admin_edition_key = active_edition_key if active_edition_key else 'december'
         show_admin_panel_expanded(lang=lang, sheet=sheet, edition_key=admin_edition_key)
         
@@ -0,0 +1,214 @@
+"""
+Pamięć podręczna wykresów - gotowe obrazki PNG zamiast ponownego rysowania.
+
+Każdy rerun Streamlit budował wszystkie wykresy od zera (plt.subplots,
+rysowanie, st.pyplot), choć ich dane zwykle się nie zmieniły. Tutaj wykres
+to funkcja draw(*dane) -> Figure bez efektów ubocznych; kluczem jest skrót
+nazwy tej funkcji, jej argumentów (tablice, ramki, etykiety) i stylu.
+Niezmieniony wykres to jedno wyszukanie w słowniku i st.image - bez
+Matplotliba. Pamięć jest ograniczona (LRU po rozmiarze obrazków).
+
+Animacje (render_animation) to GIF składany z klatek rysowanych w puli
+procesów - przeglądarka odtwarza go sama, bez rerunów Streamlit. Każdy proces
+puli importuje całą aplikację (streamlit, pandas, matplotlib), więc domyślnie
+jest jeden.
+"""
+import atexit
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import streamlit as st
+from PIL import Image
+
+CHART_STYLE = 'dark_background'
+MAX_CHART_CACHE_BYTES = 64 * 1024 * 1024
+MAX_CHART_CACHE_ENTRIES = 256
+
+# Te same ustawienia, których używa st.pyplot
+SAVEFIG_OPTIONS = {"bbox_inches": "tight", "dpi": 200, "format": "png"}
+
+# Klatki animacji: stały rozmiar (bez bbox_inches="tight") i niższa rozdzielczość -
+# st.image i tak zmniejsza obrazki szersze niż 1460 px, a GIF-a zmniejszonego traci animację
+ANIMATION_DPI = 100
+ANIMATION_FRAME_MS = 300
+ANIMATION_LAST_FRAME_MS = 2000
+# Procesy rysujące klatki (POPRZECZKA_ANIMATION_WORKERS); 0 = rysowanie w procesie aplikacji
+ANIMATION_WORKERS = int(os.environ.get("POPRZECZKA_ANIMATION_WORKERS", 1))
+
+
+def _update_array(digest, values):
+    array = np.asarray(values)
+    digest.update(repr((array.dtype.str, array.shape)).encode())
+    if array.dtype == object:
+        digest.update(repr(array.tolist()).encode())
+    else:
+        digest.update(np.ascontiguousarray(array).tobytes())
+
+
+def _update_digest(digest, value):
+    """Dopisuje do skrótu wartość argumentu wykresu (rekurencyjnie dla kolekcji)."""
+    # Kolumny bezpośrednio jako bajty - hash_pandas_object ma duży koszt stały,
+    # a wykres dostaje często dziesiątki małych ramek (po jednej na uczestnika)
+    if isinstance(value, pd.DataFrame):
+        digest.update(f'DataFrame{list(value.columns)!r}'.encode())
+        _update_array(digest, value.index)
+        for column in range(value.shape[1]):
+            _update_array(digest, value.iloc[:, column])
+    elif isinstance(value, pd.Series):
+        digest.update(f'Series{value.name!r}'.encode())
+        _update_array(digest, value.index)
+        _update_array(digest, value)
+    elif isinstance(value, (pd.Index, np.ndarray)):
+        _update_array(digest, value)
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key, item in value.items():
+            _update_digest(digest, key)
+            _update_digest(digest, item)
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _update_digest(digest, item)
+    else:
+        # Liczby, napisy, daty, range, None - repr jednoznacznie opisuje wartość
+        digest.update(f'{type(value).__name__}:{value!r};'.encode())
+
+
+def chart_key(draw, args, kwargs, style=CHART_STYLE):
+    digest = hashlib.sha1(f'{draw.__module__}.{draw.__qualname__}|{style}'.encode())
+    _update_digest(digest, list(args))
+    _update_digest(digest, dict(sorted(kwargs.items())))
+    return digest.hexdigest()
+
+
+class ChartCache:
+    """Obrazki wykresów {klucz: PNG} z limitem łącznego rozmiaru (LRU)."""
+
+    def __init__(self, max_bytes=MAX_CHART_CACHE_BYTES, max_entries=MAX_CHART_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.total_bytes = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= len(previous)
+            self._images[key] = image
+            self.total_bytes += len(image)
+            while self._images and (self.total_bytes > self.max_bytes or len(self._images) > self.max_entries):
+                _, evicted = self._images.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+
+@st.cache_resource
+def get_chart_cache():
+    """Jedna pamięć wykresów na proces (wspólna dla wszystkich sesji)."""
+    return ChartCache()
+
+
+def render_chart(draw, *args, style=CHART_STYLE, **kwargs):
+    """
+    Zwraca PNG wykresu draw(*args, **kwargs). Rysowanie odbywa się tylko przy
+    braku obrazka w pamięci, w kontekście stylu - zmiany rcParams (np.
+    plt.style.use) nie wyciekają do innych wykresów.
+    """
+    cache = get_chart_cache()
+    key = chart_key(draw, args, kwargs, style)
+    image = cache.get(key)
+    if image is None:
+        with plt.style.context(style):
+            fig = draw(*args, **kwargs)
+            buffer = io.BytesIO()
+            fig.savefig(buffer, **SAVEFIG_OPTIONS)
+        plt.close(fig)
+        image = buffer.getvalue()
+        cache.put(key, image)
+    return image
+
+
+def show_chart(draw, *args, **kwargs):
+    """Wyświetla wykres (jak st.pyplot - na całą szerokość kontenera) z pamięci podręcznej."""
+    st.image(render_chart(draw, *args, **kwargs), width="stretch")
+
+
+def _render_frame(draw, frame_args, args, kwargs, style, dpi):
+    """Jedna klatka animacji jako PNG (wywoływane także w procesach puli)."""
+    with plt.style.context(style):
+        fig = draw(*frame_args, *args, **kwargs)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', dpi=dpi)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _shutdown_pool(pool):
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@st.cache_resource(on_release=_shutdown_pool)
+def _animation_pool():
+    """Pula procesów do rysowania klatek (spawn - bez kopiowania wątków serwera)."""
+    pool = ProcessPoolExecutor(max_workers=ANIMATION_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    atexit.register(_shutdown_pool, pool)
+    return pool
+
+
+def _render_frames(draw, frames, args, kwargs, style):
+    jobs = (repeat(draw), frames, repeat(args), repeat(kwargs), repeat(style), repeat(ANIMATION_DPI))
+    if ANIMATION_WORKERS > 0 and len(frames) > 1:
+        try:
+            return list(_animation_pool().map(_render_frame, *jobs))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Pula procesów animacji niedostępna, rysuję klatki po kolei: {e}")
+            _animation_pool.clear()
+    return list(map(_render_frame, *jobs))
+
+
+def render_animation(draw, frames, *args, style=CHART_STYLE, **kwargs):
+    """
+    Zwraca animowany GIF z klatek draw(*frames[i], *args, **kwargs) - frames
+    to argumenty zmieniające się z klatki na klatkę, args/kwargs są wspólne.
+    Klatki rysuje pula procesów; gotowy GIF trafia do tej samej pamięci co
+    wykresy, więc ponowne odtworzenie przy niezmienionych danych nic nie rysuje.
+    """
+    frames = [tuple(frame) for frame in frames]
+    cache = get_chart_cache()
+    key = chart_key(draw, ('gif', ANIMATION_DPI, ANIMATION_FRAME_MS, frames) + args, kwargs, style)
+    animation = cache.get(key)
+    if animation is None:
+        images = [
+            Image.open(io.BytesIO(png)).convert('RGB').quantize(colors=256)
+            for png in _render_frames(draw, frames, args, kwargs, style)
+        ]
+        durations = [ANIMATION_FRAME_MS] * (len(images) - 1) + [ANIMATION_LAST_FRAME_MS]
+        buffer = io.BytesIO()
+        # Bez parametru loop GIF odtwarza się raz, jak dawna animacja klatka po klatce
+        images[0].save(buffer, format='GIF', save_all=True, append_images=images[1:], duration=durations)
+        animation = buffer.getvalue()
+        cache.put(key, animation)
+    return animation
+
+
+def show_animation(draw, frames, *args, **kwargs):
+    """Wyświetla animację z render_animation jako jeden obrazek GIF."""
+    st.image(render_animation(draw, frames, *args, **kwargs), width="stretch")
@@ -107,6 +107,50 @@ DEFAULT_EDITIONS_CONFIG = OrderedDict([
 
 CONFIG_FILE_PATH = 'config_override.json'
 
+# Katalog na dane pochodne (migawki zakładek, skompilowana historia) - można go bezpiecznie usunąć
+CACHE_DIR = os.environ.get(
+    "POPRZECZKA_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+# Kolejka zapisów do arkusza - w przeciwieństwie do CACHE_DIR NIE usuwać (niewysłane wpisy)
+WRITE_QUEUE_PATH = os.environ.get(
+    "POPRZECZKA_WRITE_QUEUE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "write_queue.sqlite")
+)
+
+# Rejestr wysłanych powiadomień (który etap już wyszedł) - też NIE usuwać, bo newslettery pójdą ponownie
+SEND_LEDGER_PATH = os.environ.get(
+    "POPRZECZKA_SEND_LEDGER",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "send_ledger.sqlite")
+)
+
+def get_edition_status(cfg, today):
+    """Status edycji na dany dzień: UPCOMING, ACTIVE, FINALIZATION (miesiąc po) lub FINISHED."""
+    start_date = cfg['start_date']
+    start_month = start_date.month
+    start_year = start_date.year
+    today_month = today.month
+    today_year = today.year
+    
+    if start_year > today_year or (start_year == today_year and start_month > today_month):
+        return 'UPCOMING'
+    
+    if cfg.get('is_manually_closed', False):
+        return 'FINISHED'
+    if start_month == today_month and start_year == today_year:
+        return 'ACTIVE'
+    if (start_year == today_year and start_month == today_month - 1) or (start_year == today_year - 1 and start_month == 12 and today_month == 1):
+        return 'FINALIZATION'
+    return 'FINISHED'
+
+def get_active_edition_keys(today):
+    """Edycje, w których wciąż przybywa wpisów (trwające i w finalizacji)."""
+    return [
+        key for key, cfg in EDITIONS_CONFIG.items()
+        if get_edition_status(cfg, today) in ('ACTIVE', 'FINALIZATION')
+    ]
+
 def save_config_to_json(config_dict):
     """Zapisuje aktualną konfigurację do pliku JSON, konwertując daty na stringi."""
     serializable_config = {}
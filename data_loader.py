@@ -1,94 +1,224 @@
 import pandas as pd
 import streamlit as st
-import json
-from datetime import datetime
+import time
+from gspread.utils import fill_gaps, numericise_all, rowcol_to_a1, to_records
+from config import EDITIONS_CONFIG
 from translations import _t
+from sheet_cache import CachedWorksheet, get_worksheet_cache
+from historical_store import load_historical_frame
+
+def is_append_only_worksheet(worksheet_name):
+    """Zakładki, do których aplikacja tylko dopisuje (append_row) - odświeżamy je przyrostowo."""
+    return worksheet_name == "LogWpisow" or any(
+        cfg['sheet_name'] == worksheet_name for cfg in EDITIONS_CONFIG.values()
+    )
+
+# Ręczne poprawki w środku arkusza nie są widoczne przy dociąganiu samych nowych
+# wierszy - raz na godzinę zakładka i tak pobiera się w całości
+FULL_RELOAD_SECONDS = 3600
+
+def _quoted(worksheet_name):
+    return "'" + worksheet_name.replace("'", "''") + "'"
+
+def _sync_ranges(worksheet_name, previous):
+    """
+    Zakresy do przyrostowego odświeżenia: nagłówek i ogon od ostatniego znanego
+    wiersza (A{n+1}:G, gdzie n+1 to wiersz arkusza z ostatnim zsynchronizowanym
+    wpisem - pobieramy go ponownie, żeby wykryć skrócenie arkusza).
+    None = potrzebne pełne pobranie.
+    """
+    if (
+        previous is None
+        or not is_append_only_worksheet(worksheet_name)
+        or previous.synced_rows == 0
+        or time.time() - previous.full_loaded_at > FULL_RELOAD_SECONDS
+    ):
+        return None
+    last_col = rowcol_to_a1(1, len(previous.frame.columns)).rstrip('0123456789')
+    last_row = previous.synced_rows + 1
+    return [
+        f"{_quoted(worksheet_name)}!A1:{last_col}1",
+        f"{_quoted(worksheet_name)}!A{last_row}:{last_col}",
+    ]
+
+def _merge_sync(previous, header_values, tail_values):
+    """
+    Dokleja nowe wiersze do zsynchronizowanej części ramki. Zwraca None (pełne
+    pobranie), gdy zmienił się nagłówek albo ostatni znany wiersz (arkusz skrócony
+    lub przepisany).
+    """
+    frame = previous.frame
+    width = len(frame.columns)
+    header = fill_gaps(header_values or [[]], cols=width)[0]
+    if header != list(frame.columns) or not tail_values:
+        return None
+
+    tail = [numericise_all(row) for row in fill_gaps(tail_values, cols=width)]
+    if tail[0] != frame.iloc[previous.synced_rows - 1].tolist():
+        return None
+
+    # Wiersze doklejone lokalnie po append_row odrzucamy - są już w ogonie z arkusza
+    merged = frame.iloc[:previous.synced_rows]
+    if len(tail) > 1:
+        merged = pd.concat([merged, pd.DataFrame(tail[1:], columns=frame.columns)], ignore_index=True)
+    return CachedWorksheet(merged, full_loaded_at=previous.full_loaded_at)
+
+def _fetch_worksheet(_sheet, worksheet_name, previous):
+    """
+    Pobiera zakładkę: przyrostowo (tylko nowe wiersze), a gdy się nie da -
+    w całości przez get_all_records. Bez komunikatów UI (działa też w tle);
+    błędy pełnego pobrania przepuszcza dalej.
+    """
+    ranges = _sync_ranges(worksheet_name, previous)
+    if ranges:
+        try:
+            header_range, tail_range = _sheet.values_batch_get(ranges)['valueRanges']
+            synced = _merge_sync(previous, header_range.get('values'), tail_range.get('values'))
+            if synced is not None:
+                return synced
+        except Exception:
+            pass  # przy błędzie próbujemy pełnego pobrania
+    worksheet = _sheet.worksheet(worksheet_name)
+    return CachedWorksheet(pd.DataFrame(worksheet.get_all_records()))
 
-# Zmiana nazwy argumentu 'sheet' na '_sheet' jest kluczowa dla st.cache_data!
-# Zapobiega to błędowi "UnhashableParamError".
-@st.cache_data(ttl=600, show_spinner="Pobieranie danych z Google Sheets...")
 def load_google_sheet_data(_sheet, worksheet_name):
     """
     Ładuje dane z Google Sheets.
-    Cache ustawiony na 10 minut (ttl=600 sekund).
-    Argument '_sheet' ma podkreślenie, aby Streamlit nie próbował go hashować.
+    Cache per zakładka na 10 minut (sheet_cache.SHEET_TTL_SECONDS) - zapis
+    formularza unieważnia/łata tylko zakładki, do których pisał. Po wygaśnięciu
+    zwracamy ostatnią znaną wersję (także z migawki na dysku po restarcie),
+    a zakładka odświeża się w tle; tylko-do-dopisywania dociągają same nowe wiersze.
+    Nazwa '_sheet' została po st.cache_data (obiekt arkusza nie jest hashowany).
     """
-    try:
-        if _sheet is None:
-            return pd.DataFrame()
-        
-        # Pobieranie danych
-        worksheet = _sheet.worksheet(worksheet_name)
-        data = worksheet.get_all_records()
-        return pd.DataFrame(data)
-    except Exception as e:
-        # W razie błędu zwracamy pusty DataFrame, nie cachujemy błędu
-        st.error(f"Błąd pobierania danych: {e}")
+    if _sheet is None:
         return pd.DataFrame()
 
+    def fetch(previous):
+        try:
+            with st.spinner("Pobieranie danych z Google Sheets..."):
+                return _fetch_worksheet(_sheet, worksheet_name, previous)
+        except Exception as e:
+            # W razie błędu zwracamy pusty DataFrame, nie cachujemy błędu
+            st.error(f"Błąd pobierania danych: {e}")
+            return None
+
+    def refresh(previous):
+        try:
+            return _fetch_worksheet(_sheet, worksheet_name, previous)
+        except Exception as e:
+            # Zostaje poprzednia wersja, spróbujemy przy następnym odczycie
+            print(f"Odświeżanie zakładki {worksheet_name} w tle nie powiodło się: {e}")
+            return None
+
+    return get_worksheet_cache().get(worksheet_name, fetch, refresh)
+
+def _values_to_frame(values):
+    """Surowe wiersze zakładki (nagłówek + dane) -> DataFrame taki jak z get_all_records."""
+    if len(values) < 2:
+        return pd.DataFrame()
+    values = fill_gaps(values)
+    header, rows = values[0], values[1:]
+    return pd.DataFrame(to_records(header, [numericise_all(row) for row in rows]))
+
+def _batch_fetch(_sheet, cache, worksheet_names):
+    """
+    Jedno żądanie values_batch_get dla podanych zakładek: całe zakładki albo
+    (dla przeterminowanych tylko-do-dopisywania) sam nagłówek i ogon.
+    Wpisy podmieniamy tylko, jeśli nikt ich w międzyczasie nie zmienił.
+    """
+    plan = []
+    for name in worksheet_names:
+        previous = cache.entry(name)
+        # Sama nazwa zakładki (w apostrofach) jako zakres = cała zakładka
+        plan.append((name, previous, _sync_ranges(name, previous) or [_quoted(name)]))
+
+    response = _sheet.values_batch_get([r for _, _, ranges in plan for r in ranges])
+
+    value_ranges = iter(response.get('valueRanges', []))
+    for name, previous, ranges in plan:
+        results = [next(value_ranges, {}) for _ in ranges]
+        if len(ranges) == 1:
+            entry = CachedWorksheet(_values_to_frame(results[0].get('values', [])))
+        else:
+            entry = _merge_sync(previous, results[0].get('values'), results[1].get('values'))
+        if entry is not None:
+            cache.replace(name, previous, entry)
+
+def refresh_worksheets(_sheet, worksheet_names, cache=None):
+    """
+    Odświeża podane zakładki jednym żądaniem (przyrostowo, gdzie się da),
+    niezależnie od ich ważności. Pomija zakładki odświeżane właśnie przez
+    kogoś innego; zwraca listę odświeżonych. Błędy przepuszcza dalej.
+    """
+    cache = cache or get_worksheet_cache()
+    claimed = cache.claim_refresh(worksheet_names)
+    if not claimed:
+        return []
+    try:
+        _batch_fetch(_sheet, cache, claimed)
+    finally:
+        cache.release_refresh(claimed)
+    return claimed
+
+def prefetch_worksheets(_sheet, worksheet_names):
+    """
+    Pobiera zakładki strony jednym żądaniem values_batch_get (zamiast
+    worksheet() + get_all_records() osobno dla każdej) i wypełnia nimi pamięć
+    zakładek. Kolejne load_google_sheet_data trafiają już w cache.
+    Czekamy tylko, gdy jakiejś zakładki nie ma wcale (ani w pamięci, ani na
+    dysku); same przeterminowane odświeżają się w tle tym samym jednym żądaniem.
+    """
+    if _sheet is None:
+        return
+
+    cache = get_worksheet_cache()
+    missing = cache.missing(worksheet_names)
+    stale = cache.stale(worksheet_names)
+    if not missing and not stale:
+        return
+
+    if missing:
+        try:
+            with st.spinner("Pobieranie danych z Google Sheets..."):
+                _batch_fetch(_sheet, cache, missing + stale)
+        except Exception:
+            # Np. nie istnieje któraś zakładka - load_google_sheet_data pobierze je pojedynczo
+            pass
+        return
+
+    def refresh_stale(names):
+        try:
+            _batch_fetch(_sheet, cache, names)
+        except Exception as e:
+            print(f"Odświeżanie zakładek w tle nie powiodło się: {e}")
+
+    cache.in_background(stale, refresh_stale)
+
 # W pliku data_loader.py
 @st.cache_data(ttl=300)  # Cache na 5 minut (rzadko się zmienia)
 def load_historical_data_from_json():
     """
-    Ładuje dane historyczne z JSON z cache'owaniem.
+    Ładuje dane historyczne z cache'owaniem.
+    Czyta skompilowany plik Feather (historical_store), a JSON przetwarza
+    tylko wtedy, gdy się zmienił.
     """
     try:
-        with open('historical_results.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        df = pd.DataFrame()
-        records = []
-        
-        # Przetwarzanie danych
-        for participant, editions in data.items():
-            for edition_str, values in editions.items():
-                try:
-                    month, year = map(int, edition_str.split('.'))
-                    # Używamy zaimportowanej klasy datetime
-                    date_obj = datetime(year, month, 1)
-                except ValueError:
-                    # Pomijamy błędne daty
-                    continue
-                
-                # Dodajemy rekord
-                record = {
-                    'uczestnik': participant,
-                    'miesiac_rok_str': edition_str,
-                    'miesiac': date_obj,
-                    'rok': year,
-                    # Zmienne wyniki
-                    'miejsce': values.get('miejsce'),
-                    'rezultat_uczestnika': values.get('rezultat_uczestnika'),
-                    'status': values.get('status', 'Brak')
-                }
-                records.append(record)
-
-        if records:
-            df = pd.DataFrame(records)
-
-            # Poprawka na ostrzeżenie o mixed type
-            df.columns = df.columns.astype(str)
-            
-            # Konwersja kolumn
-            df['miesiac'] = pd.to_datetime(df['miesiac'])
-            df['miejsce'] = pd.to_numeric(df['miejsce'], errors='coerce').astype('Int64')
-            df['rezultat_numeric'] = pd.to_numeric(df['rezultat_uczestnika'], errors='coerce')
-            
-            # Wstawienie numeru edycji
-            all_months = df['miesiac'].sort_values().unique()
-            month_to_edition = {month: i + 1 for i, month in enumerate(all_months)}
-            df['edycja_nr'] = df['miesiac'].map(month_to_edition)
-            
-        return df
+        return load_historical_frame()
     except FileNotFoundError:
         return pd.DataFrame()
+
 def process_raw_data(df_raw, lang, expected_cols, sheet_name_for_error_msg):
     """
     Przetwarza surowe dane - NIE cachujemy bo to operacja lokalna na danych z pamięci.
+    Wersja wektorowa (bez iterrows): normalizuje kolumny Day/Status/Timestamp
+    i w jednym przejściu buduje słownik {uczestnik: {dzień: wpis}}.
+
+    Duplikaty (ten sam uczestnik i dzień) rozstrzyga reguła "ostatni zapis wygrywa"
+    według Timestamp. Wpisy bez czytelnego znacznika czasu traktujemy jako starsze
+    od tych z czasem, a przy remisie decyduje kolejność wierszy w arkuszu.
+    Znaczniki bez strefy (formularz zapisuje datetime.now()) traktujemy jak UTC,
+    żeby mieszanka ze znacznikami ze strefą nie wywracała parsowania.
     """
-    current_data = {}
-    max_day_reported = 0
-    
     if df_raw.empty:
          # Cicha obsługa pustego DF, żeby nie straszyć użytkownika na starcie
         return {}, 0, True
@@ -98,27 +228,88 @@ def process_raw_data(df_raw, lang, expected_cols, sheet_name_for_error_msg):
         st.error(_t('current_header_check_error', lang))
         return {}, 0, False
 
-    df_raw['Day'] = pd.to_numeric(df_raw['Day'], errors='coerce')
-    df_raw = df_raw.dropna(subset=['Day'])
+    days = pd.to_numeric(df_raw['Day'], errors='coerce')
+    df = df_raw.assign(Day=days)[days.notna()]
     
-    if df_raw.empty:
+    if df.empty:
         return {}, 0, True
 
-    max_day_reported = int(df_raw['Day'].max())
+    # int() obcina część ułamkową - astype(int) robi to samo
+    df = df.assign(Day=df['Day'].astype(int))
+    max_day_reported = int(df['Day'].max())
 
-    for _, row in df_raw.iterrows():
-        participant = row['Participant']
-        day = int(row['Day'])
-        status = row['Status']
-        timestamp = row['Timestamp']
-        
-        if participant not in current_data:
-            current_data[participant] = {}
-        
-        current_data[participant][day] = {
+    if 'Timestamp' in df.columns:
+        written_at = pd.to_datetime(df['Timestamp'].astype(str), errors='coerce', format='ISO8601', utc=True)
+        order = written_at.reset_index(drop=True).sort_values(kind='stable', na_position='first').index
+        df = df.iloc[order]
+    df = df.drop_duplicates(subset=['Participant', 'Day'], keep='last').sort_index()
+
+    n_rows = len(df)
+    timestamps = df['Timestamp'].tolist() if 'Timestamp' in df.columns else [None] * n_rows
+    notes = df['Notes'].tolist() if 'Notes' in df.columns else [''] * n_rows
+
+    current_data = {}
+    for participant, day, status, timestamp, note in zip(
+        df['Participant'].tolist(), df['Day'].tolist(), df['Status'].tolist(), timestamps, notes
+    ):
+        current_data.setdefault(participant, {})[day] = {
             "status": status,
             "timestamp": timestamp,
-            "notes": row.get('Notes', '')
+            "notes": note
         }
         
     return current_data, max_day_reported, True
+
+
+def _process_raw_data_iterrows(df_raw, expected_cols):
+    """Pierwotna pętla po iterrows (do porównania); duplikaty - ostatni wiersz arkusza wygrywa."""
+    if df_raw.empty or not all(col in df_raw.columns for col in expected_cols):
+        return {}, 0
+    df_raw = df_raw.copy()
+    df_raw['Day'] = pd.to_numeric(df_raw['Day'], errors='coerce')
+    df_raw = df_raw.dropna(subset=['Day'])
+    if df_raw.empty:
+        return {}, 0
+
+    current_data = {}
+    for _, row in df_raw.iterrows():
+        current_data.setdefault(row['Participant'], {})[int(row['Day'])] = {
+            "status": row['Status'],
+            "timestamp": row['Timestamp'],
+            "notes": row.get('Notes', '')
+        }
+    return current_data, int(df_raw['Day'].max())
+
+
+# Pomiar: python data_loader.py - syntetyczny arkusz 50 tys. wierszy, iterrows vs wersja wektorowa
+if __name__ == '__main__':
+    import random
+    import timeit
+    from datetime import datetime, timedelta
+
+    rows_count, participants_count, days_count = 50_000, 200, 60
+    rng = random.Random(1)
+    participants = [f"uczestnik_{i}" for i in range(participants_count)]
+    started = datetime(2025, 4, 1)
+    df_raw = pd.DataFrame([
+        {
+            "Participant": rng.choice(participants),
+            # Dni jak w arkuszu: liczby, tekst i śmieci, które odpadają
+            "Day": rng.choice([rng.randint(1, days_count), str(rng.randint(1, days_count)), "x"]),
+            "Status": rng.choice(["Zaliczone", "Niezaliczone", "Brak raportu"]),
+            "Timestamp": (started + timedelta(seconds=k)).isoformat(),
+            "Notes": rng.choice(["", "notatka"]),
+        }
+        for k in range(rows_count)
+    ])
+    expected_cols = ['Participant', 'Day', 'Status', 'Timestamp']
+
+    # Arkusz uporządkowany w czasie - obie wersje muszą dać to samo
+    current_data, max_day_reported, _ = process_raw_data(df_raw, 'pl', expected_cols, 'bench')
+    assert (current_data, max_day_reported) == _process_raw_data_iterrows(df_raw, expected_cols)
+
+    old_ms = timeit.timeit(lambda: _process_raw_data_iterrows(df_raw, expected_cols), number=1) * 1000
+    new_ms = timeit.timeit(lambda: process_raw_data(df_raw, 'pl', expected_cols, 'bench'), number=5) / 5 * 1000
+    print(f"process_raw_data: {rows_count} wierszy, {participants_count} uczestników, {days_count} dni")
+    print(f"  iterrows: {old_ms:.0f} ms")
+    print(f"  wektorowo: {new_ms:.0f} ms (x{old_ms / new_ms:.1f})")
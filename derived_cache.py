@@ -0,0 +1,134 @@
+"""
+Pamięć podręczna danych pochodnych edycji.
+
+load_google_sheet_data trzyma surowy arkusz przez 600 s, ale przetwarzanie,
+etapy kompletne i rankingi liczyły się od nowa przy każdym rerunie Streamlit
+(każdy ruch suwaka, każde kliknięcie wiersza). Tutaj trzymamy je w pamięci
+procesu pod kluczem: skrót zawartości arkusza + lista uczestników.
+Niezmienione dane = jedno wyszukanie w słowniku. Język nie jest częścią
+klucza - rankingi mają stałe nazwy kolumn, a nagłówki tłumaczy dopiero
+localize_ranking przy wyświetlaniu, więc PL i EN korzystają z jednego wyniku.
+"""
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+from data_loader import process_raw_data
+from edition_matrix import EditionMatrix
+from sheet_cache import hash_worksheet
+
+MAX_CACHED_EDITIONS = 16
+
+
+class DerivedEdition:
+    """Przetworzone dane jednej edycji wraz z leniwie liczonymi pochodnymi."""
+
+    def __init__(self, current_data, max_day_reported, success, participants_list):
+        self.current_data = current_data
+        self.max_day_reported = max_day_reported
+        self.success = success
+        self.participants = list(participants_list)
+        self._matrix = None
+        self._memo = {}
+        # Silnik rankingu liczy dni po kolei - dwie sesje nie mogą go przesuwać naraz
+        self._lock = threading.RLock()
+
+    @property
+    def matrix(self):
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = EditionMatrix.from_processed(
+                    self.current_data, self.participants, self.max_day_reported
+                )
+            return self._matrix
+
+    def _memoized(self, key, compute):
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    def elimination_map(self):
+        """Mapa eliminacji z rankingu live (stan na ostatni raportowany dzień)."""
+        elim = self._memoized('elimination_map', lambda: self.matrix.elimination_map())
+        return dict(elim)
+
+    def complete_stages(self, with_eliminations=True):
+        """
+        Etapy z kompletnymi danymi. Bez eliminacji (with_eliminations=False)
+        wszyscy uczestnicy liczą się jako aktywni - tak jak wstępne wywołanie
+        przed policzeniem rankingu live.
+        """
+        from page_current_ranking import find_last_complete_stage
+
+        def compute():
+            elim = self.elimination_map() if with_eliminations else {}
+            return find_last_complete_stage(self.matrix, elim, self.max_day_reported)
+
+        return list(self._memoized(('complete_stages', with_eliminations), compute))
+
+    def ranking(self, day, ranking_type='live', complete_stages=None):
+        """
+        Ranking (DataFrame ze stałymi kolumnami z compute_ranking, mapa eliminacji) -
+        kopie, więc wywołujący może je modyfikować.
+        """
+        from page_current_ranking import compute_ranking
+
+        key = ('ranking', ranking_type, int(day), tuple(complete_stages or ()))
+        ranking_df, elim = self._memoized(
+            key,
+            lambda: compute_ranking(self.matrix, day, ranking_type=ranking_type, complete_stages=complete_stages)
+        )
+        return ranking_df.copy(), dict(elim)
+
+
+class DerivedDataCache:
+    """LRU edycji przetworzonych, z unieważnianiem per arkusz."""
+
+    def __init__(self, max_entries=MAX_CACHED_EDITIONS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sheet_name, df_raw, participants_list, lang, expected_cols):
+        # lang służy tylko komunikatowi o błędzie nagłówków, a błędnych arkuszy nie zapamiętujemy
+        key = (sheet_name, hash_worksheet(df_raw), tuple(participants_list), tuple(expected_cols))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        current_data, max_day_reported, success = process_raw_data(df_raw, lang, expected_cols, sheet_name)
+        entry = DerivedEdition(current_data, max_day_reported, success, participants_list)
+        if not success:
+            # Błędu nagłówków nie zapamiętujemy - komunikat ma się pokazać przy każdym renderze
+            return entry
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, sheet_name=None):
+        """Usuwa wpisy danego arkusza (albo wszystkie, gdy sheet_name=None)."""
+        with self._lock:
+            for key in [k for k in self._entries if sheet_name is None or k[0] == sheet_name]:
+                del self._entries[key]
+
+
+@st.cache_resource
+def _derived_data_cache():
+    return DerivedDataCache()
+
+
+def get_derived_edition(sheet_name, df_raw, participants_list, lang, expected_cols):
+    """Zwraca przetworzoną edycję z pamięci (lub przetwarza ją raz i zapamiętuje)."""
+    return _derived_data_cache().get(sheet_name, df_raw, participants_list, lang, expected_cols)
+
+
+def invalidate_derived_edition(sheet_name=None):
+    _derived_data_cache().invalidate(sheet_name)
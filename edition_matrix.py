@@ -0,0 +1,267 @@
+"""
+Kolumnowy model edycji: macierz statusów dzień × uczestnik.
+
+Zamiast zagnieżdżonego słownika {uczestnik: {dzień: {...}}} trzymamy jedną
+tablicę int8 (wiersz = dzień, kolumna = uczestnik). Serie, porażki,
+eliminacje, trudność etapów i kompletność danych liczymy operacjami na
+tablicach, a nie tysiącami odwołań do słowników.
+
+Pomiar wyścigu (cała macierz naraz vs dzień po dniu): python edition_matrix.py
+"""
+import threading
+
+import numpy as np
+
+# Kody statusów w macierzy
+STATUS_MISSING = 0    # brak wpisu w arkuszu
+STATUS_PASSED = 1     # "Zaliczone"
+STATUS_FAILED = 2     # "Niezaliczone"
+STATUS_NO_REPORT = 3  # jawny "Brak raportu" (lub inny status)
+
+ELIMINATION_STREAK = 3
+
+_STATUS_CODES = {
+    "Zaliczone": STATUS_PASSED,
+    "Niezaliczone": STATUS_FAILED,
+}
+
+
+def status_code(status):
+    """Zamienia status z arkusza na kod macierzy."""
+    return _STATUS_CODES.get(status, STATUS_NO_REPORT)
+
+
+class EditionMatrix:
+    """Macierz statusów edycji (dni 1..max_day × uczestnicy z listy edycji)."""
+
+    def __init__(self, participants, codes):
+        self.participants = list(participants)
+        self.participant_index = {p: i for i, p in enumerate(self.participants)}
+        self.codes = codes
+        self._cache = {}
+        self._engine = None
+        self._engine_lock = threading.Lock()
+
+    @classmethod
+    def from_processed(cls, current_data, participants_list, max_day):
+        """Buduje macierz ze słownika zwracanego przez process_raw_data."""
+        max_day = max(0, int(max_day))
+        codes = np.zeros((max_day, len(participants_list)), dtype=np.int8)
+        for col, participant in enumerate(participants_list):
+            for day, entry in current_data.get(participant, {}).items():
+                if 1 <= day <= max_day:
+                    codes[day - 1, col] = status_code(entry["status"])
+        return cls(participants_list, codes)
+
+    @property
+    def max_day(self):
+        return self.codes.shape[0]
+
+    @property
+    def engine(self):
+        """Silnik rankingu tej edycji - jeden na macierz, współdzielony przez wszystkie widoki."""
+        with self._engine_lock:
+            if self._engine is None:
+                from ranking_engine import RankingEngine
+                self._engine = RankingEngine(self)
+            return self._engine
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    # --- Dostęp do danych ---
+
+    def day_codes(self, day):
+        """Statusy wszystkich uczestników w danym dniu (poza zakresem: brak wpisu)."""
+        if 1 <= day <= self.max_day:
+            return self.codes[day - 1]
+        return np.zeros(len(self.participants), dtype=np.int8)
+
+    def window(self, max_day):
+        """Wiersze dni 1..max_day; dni spoza zakresu danych uzupełnia brakiem wpisu."""
+        max_day = max(0, int(max_day))
+        if max_day <= self.max_day:
+            return self.codes[:max_day]
+        padding = np.zeros((max_day - self.max_day, len(self.participants)), dtype=np.int8)
+        return np.vstack([self.codes, padding])
+
+    def participant_codes(self, participant, max_day):
+        return self.window(max_day)[:, self.participant_index[participant]]
+
+    @property
+    def max_reported_day(self):
+        """Ostatni dzień z jakimkolwiek wpisem, dla każdego uczestnika (0 = brak wpisów)."""
+        def compute():
+            if self.max_day == 0:
+                return np.zeros(len(self.participants), dtype=int)
+            reported = self.codes != STATUS_MISSING
+            last = self.max_day - np.argmax(reported[::-1], axis=0)
+            return np.where(reported.any(axis=0), last, 0)
+        return self._cached('max_reported_day', compute)
+
+    # --- Statystyki wektorowe ---
+
+    @staticmethod
+    def _run_lengths(mask):
+        """Długość bieżącej serii True w każdym wierszu (kolumnami)."""
+        rows = np.arange(1, mask.shape[0] + 1)[:, None]
+        last_break = np.maximum.accumulate(np.where(mask, 0, rows), axis=0)
+        return np.where(mask, rows - last_break, 0)
+
+    def longest_pass_streaks(self, max_day):
+        """Najdłuższa seria zaliczeń w dniach 1..max_day."""
+        passed = self.window(max_day) == STATUS_PASSED
+        if passed.shape[0] == 0:
+            return np.zeros(len(self.participants), dtype=int)
+        return self._run_lengths(passed).max(axis=0)
+
+    def fail_counts(self, max_day):
+        """Liczba dni bez zaliczenia (porażki i braki danych) w dniach 1..max_day."""
+        return (self.window(max_day) != STATUS_PASSED).sum(axis=0)
+
+    def elimination_days(self):
+        """Dzień eliminacji (3 dni bez zaliczenia z rzędu); 0 = uczestnik nadal w grze."""
+        def compute():
+            if self.max_day == 0:
+                return np.zeros(len(self.participants), dtype=int)
+            streaks = self._run_lengths(self.codes != STATUS_PASSED)
+            out = streaks >= ELIMINATION_STREAK
+            return np.where(out.any(axis=0), np.argmax(out, axis=0) + 1, 0)
+        return self._cached('elimination_days', compute)
+
+    def elimination_map(self):
+        """Mapa eliminacji {uczestnik: dzień/None} po ostatnim dniu - to samo co migawka silnika, bez przechodzenia dni."""
+        return {p: int(day) or None for p, day in zip(self.participants, self.elimination_days())}
+
+    def elimination_array(self, elimination_map):
+        """Mapa eliminacji {uczestnik: dzień/None} jako tablica (0 = w grze)."""
+        return np.array(
+            [elimination_map.get(p) or 0 for p in self.participants], dtype=int
+        )
+
+    def active_mask(self, days, elimination_map):
+        """Kto był aktywny w danych dniach (wiersze = dni, eliminacja w dniu d nadal liczy d)."""
+        elim = self.elimination_array(elimination_map)
+        days = np.asarray(days, dtype=int)[:, None]
+        return (elim == 0) | (elim >= days)
+
+    def stage_fail_rates(self, days, elimination_map):
+        """Odsetek aktywnych uczestników bez zaliczenia dla podanych etapów."""
+        if len(days) == 0:
+            return np.zeros(0)
+        active = self.active_mask(days, elimination_map)
+        not_passed = np.stack([self.day_codes(d) != STATUS_PASSED for d in days])
+        total_active = active.sum(axis=1)
+        fails = (active & not_passed).sum(axis=1)
+        return np.where(total_active > 0, fails / np.maximum(total_active, 1) * 100, 0)
+
+    def complete_days(self, elimination_map, max_day):
+        """
+        Dni, w których każdy aktywny uczestnik ma wpis za ten lub późniejszy dzień.
+
+        Uczestnik blokuje dni od max_reported_day + 1 do dnia eliminacji
+        (albo do max_day, gdy nadal gra), więc kompletność wszystkich dni
+        wynika z tablicy różnic po przedziałach - O(D + P), bez macierzy dzień × uczestnik.
+        """
+        max_day = max(0, int(max_day))
+        if max_day == 0:
+            return []
+        elim = self.elimination_array(elimination_map)
+        # Ostatni dzień, w którym uczestnik jest aktywny (dzień eliminacji nadal się liczy)
+        last_active = np.where(elim == 0, max_day, np.minimum(elim, max_day))
+        first_missing = self.max_reported_day + 1
+        behind = first_missing <= last_active
+        diff = np.bincount(first_missing[behind], minlength=max_day + 2) - np.bincount(last_active[behind] + 1, minlength=max_day + 2)
+        blocked = np.cumsum(diff)[1:max_day + 1] > 0
+
+        days = np.arange(1, max_day + 1)
+        anyone_active = days <= (last_active.max() if len(last_active) else 0)
+        return days[anyone_active & ~blocked].tolist()
+
+    @property
+    def race_matrix(self):
+        """
+        Wyniki wyścigu dla wszystkich dni naraz (dzień × uczestnik): najwyższy
+        zaliczony dzień do danego dnia włącznie - narastające maksimum po masce zaliczeń.
+        """
+        def compute():
+            days = np.arange(1, self.max_day + 1)[:, None]
+            return np.maximum.accumulate(np.where(self.codes == STATUS_PASSED, days, 0), axis=0)
+        return self._cached('race_matrix', compute)
+
+    def race_scores(self, day):
+        """Najwyższy zaliczony dzień do dnia `day` włącznie, dla każdego uczestnika."""
+        day = min(int(day), self.max_day)
+        if day <= 0:
+            return np.zeros(len(self.participants), dtype=int)
+        return self.race_matrix[day - 1].copy()
+
+    def race_history(self, max_day):
+        """Wyniki wyścigu dla dni 1..max_day (wiersz d-1 = race_scores(d)); po końcu danych wyniki się nie zmieniają."""
+        max_day = max(0, int(max_day))
+        if max_day <= self.max_day:
+            return self.race_matrix[:max_day]
+        return np.vstack([self.race_matrix] + [self.race_scores(self.max_day)] * (max_day - self.max_day))
+
+    def completeness_icons(self, elimination_map):
+        """Ikony kompletności (dzień × uczestnik); po eliminacji puste pola."""
+        icons = np.select(
+            [self.codes == STATUS_PASSED, self.codes == STATUS_FAILED, self.codes == STATUS_NO_REPORT],
+            ["✅", "❌", "⬜"],
+            default="❓"
+        ).astype(object)
+        elim = self.elimination_array(elimination_map)
+        days = np.arange(1, self.max_day + 1)[:, None]
+        icons[(elim > 0) & (days > elim)] = ""
+        return icons
+
+
+
+def _race_scores_dict_loop(data, participants, day):
+    """Pierwotna pętla po słowniku {uczestnik: {dzień: wpis}} (do porównania)."""
+    scores = {p: 0 for p in participants}
+    for d in range(1, day + 1):
+        for p in participants:
+            if d in data.get(p, {}) and data[p][d]["status"] == "Zaliczone":
+                scores[p] = d
+    return [scores[p] for p in participants]
+
+
+def _race_scores_day_by_day(codes, day):
+    """Wynik jednego dnia liczony od nowa na macierzy (do porównania)."""
+    passed = codes[:day] == STATUS_PASSED
+    days = np.arange(1, passed.shape[0] + 1)[:, None]
+    return np.where(passed, days, 0).max(axis=0)
+
+
+if __name__ == '__main__':
+    import timeit
+
+    days_count, participants_count = 60, 200
+    rng = np.random.default_rng(0)
+    codes = rng.choice(
+        [STATUS_MISSING, STATUS_PASSED, STATUS_FAILED, STATUS_NO_REPORT],
+        size=(days_count, participants_count), p=[0.05, 0.8, 0.1, 0.05]
+    ).astype(np.int8)
+    participants = [f"uczestnik_{i}" for i in range(participants_count)]
+    statuses = {STATUS_PASSED: "Zaliczone", STATUS_FAILED: "Niezaliczone", STATUS_NO_REPORT: "Brak raportu"}
+    data = {
+        p: {d + 1: {"status": statuses[code]} for d, code in enumerate(codes[:, col]) if code != STATUS_MISSING}
+        for col, p in enumerate(participants)
+    }
+    all_days = range(1, days_count + 1)
+
+    race_matrix = EditionMatrix(participants, codes).race_matrix
+    assert np.array_equal(race_matrix, [_race_scores_day_by_day(codes, d) for d in all_days])
+    assert np.array_equal(race_matrix, [_race_scores_dict_loop(data, participants, d) for d in all_days])
+
+    benchmarks = [
+        ("pętla po słowniku, dzień po dniu", lambda: [_race_scores_dict_loop(data, participants, d) for d in all_days], 3),
+        ("macierz, dzień po dniu", lambda: [_race_scores_day_by_day(codes, d) for d in all_days], 50),
+        ("race_matrix (raz dla wszystkich dni)", lambda: EditionMatrix(participants, codes).race_matrix, 50),
+    ]
+    print(f"Wyniki wyścigu dla wszystkich dni: {days_count} dni × {participants_count} uczestników")
+    for name, run, repeats in benchmarks:
+        print(f"  {name}: {timeit.timeit(run, number=repeats) / repeats * 1000:.2f} ms")
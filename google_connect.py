@@ -1,7 +1,9 @@
+import os
 import streamlit as st
 import gspread
 from google.oauth2.service_account import Credentials
 import requests
+from sheet_cache import patch_cached_worksheet
 
 # Definicja zakresów tylko dla Arkuszy (Dysk nie jest już potrzebny)
 SCOPES = [
@@ -22,6 +24,11 @@ def get_credentials():
 
 @st.cache_resource
 def connect_to_google_sheets():
+    # Tryb offline (praca lokalna, testy): zakładki z plików CSV zamiast Google Sheets
+    local_dir = os.environ.get("POPRZECZKA_LOCAL_SHEETS")
+    if local_dir:
+        from local_sheets import LocalSpreadsheet
+        return LocalSpreadsheet(local_dir)
     try:
         creds = get_credentials()
         if not creds: return None
@@ -66,7 +73,9 @@ def append_to_sheet_dual(sheet, data_old, data_new):
         try:
             ws_old = sheet.worksheet(data_old['sheet_name'])
             ws_old.append_row(data_old['row'])
+            patch_cached_worksheet(data_old['sheet_name'], [data_old['row']])
             sheet.worksheet("LogWpisow").append_row(data_old['log_row'])
+            patch_cached_worksheet("LogWpisow", [data_old['log_row']])
         except Exception as e:
             st.error(f"Błąd zapisu (Stara Edycja): {e}")
             success = False
@@ -75,6 +84,7 @@ def append_to_sheet_dual(sheet, data_old, data_new):
         try:
             ws_new = sheet.worksheet(data_new['sheet_name'])
             ws_new.append_row(data_new['row'])
+            patch_cached_worksheet(data_new['sheet_name'], [data_new['row']])
         except Exception as e:
             st.error(f"Błąd zapisu (Nowa Edycja): {e}. Czy arkusz '{data_new['sheet_name']}' istnieje?")
             success = False
@@ -0,0 +1,163 @@
+"""
+Indeks historii rozgrywek: zagregowane statystyki uczestników i edycji.
+
+Profil uczestnika, karta w rankingu i tabela kontekstu historycznego przy
+każdym kliknięciu filtrowały całą ramkę historii (df[df['uczestnik'] == ...])
+i od nowa liczyły zwycięstwa, medale, rekord i średnie. Indeks liczy to raz
+dla danej wersji historii (kilka groupby), a potem to już tylko odczyt ze
+słownika.
+"""
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from sheet_cache import hash_worksheet
+
+
+class ParticipantHistory:
+    """
+    Statystyki jednego uczestnika ze wszystkich edycji. Brak wartości to NaN
+    (np. brak wyniku w ostatniej edycji); last_edition_* dotyczą ostatniej
+    edycji, w której uczestnik się pojawił.
+    """
+
+    def __init__(self, wins, medals, pb_result, pb_edition, avg_result, avg_result_last_3,
+                 best_position, avg_position, editions_count, last_edition_nr,
+                 last_edition_result, last_edition_rank):
+        self.wins = wins
+        self.medals = medals
+        self.pb_result = pb_result
+        self.pb_edition = pb_edition
+        self.avg_result = avg_result
+        self.avg_result_last_3 = avg_result_last_3
+        self.best_position = best_position
+        self.avg_position = avg_position
+        self.editions_count = editions_count
+        self.last_edition_nr = last_edition_nr
+        self.last_edition_result = last_edition_result
+        self.last_edition_rank = last_edition_rank
+
+
+class EditionSummary:
+    """Podsumowanie jednej edycji: kolejny numer, liczba uczestników, zwycięzcy i wyniki."""
+
+    def __init__(self, edition_str, edition_nr, month, participants, winners, best_result, avg_result):
+        self.edition_str = edition_str
+        self.edition_nr = edition_nr
+        self.month = month
+        self.participants = participants
+        self.winners = winners
+        self.best_result = best_result
+        self.avg_result = avg_result
+
+
+class HistoricalIndex:
+    """Zagregowana historia: participant(nick), edition("MM.RRRR"), context_stats(lista)."""
+
+    def __init__(self, df_historical):
+        self._participants = {}
+        self._editions = {}
+        self.stats = pd.DataFrame()
+        # Edycje od najnowszej (wg daty z "MM.RRRR")
+        self.editions_newest_first = []
+        self._winner_rows = pd.DataFrame(columns=['miesiac_rok_str', 'uczestnik'])
+
+        if df_historical.empty:
+            return
+
+        df = df_historical
+        self.editions_newest_first = sorted(
+            df['miesiac_rok_str'].unique(), key=lambda x: datetime.strptime(x, '%m.%Y'), reverse=True
+        )
+        self.stats = self._participant_stats(df)
+        self._participants = {
+            name: ParticipantHistory(**row) for name, row in self.stats.to_dict(orient='index').items()
+        }
+
+        # Zwycięzcy w kolejności wierszy ramki - tak jak zwracało unique() na przefiltrowanej historii
+        self._winner_rows = df.loc[(df['miejsce'] == 1).fillna(False), ['miesiac_rok_str', 'uczestnik']]
+        winners = self._winner_rows.groupby('miesiac_rok_str', sort=False)['uczestnik'].agg(list)
+        by_edition = df.groupby('miesiac_rok_str', sort=False).agg(
+            edition_nr=('edycja_nr', 'first'),
+            month=('miesiac', 'first'),
+            participants=('uczestnik', 'size'),
+            best_result=('rezultat_numeric', 'max'),
+            avg_result=('rezultat_numeric', 'mean'),
+        )
+        for edition_str, row in by_edition.to_dict(orient='index').items():
+            self._editions[edition_str] = EditionSummary(
+                edition_str, winners=winners.get(edition_str, []), **row
+            )
+
+    @staticmethod
+    def _participant_stats(df):
+        place = df['miejsce']
+        result = df['rezultat_numeric']
+        flags = pd.DataFrame({
+            'uczestnik': df['uczestnik'],
+            'wins': (place == 1).fillna(False).astype(int),
+            'medals': (place <= 3).fillna(False).astype(int),
+        })
+        grouped = df.groupby('uczestnik', sort=False)
+        stats = flags.groupby('uczestnik', sort=False)[['wins', 'medals']].sum()
+        stats['pb_result'] = grouped['rezultat_numeric'].max()
+        stats['avg_result'] = grouped['rezultat_numeric'].mean()
+        stats['best_position'] = grouped['miejsce'].min()
+        stats['avg_position'] = grouped['miejsce'].mean()
+
+        with_result = df[result.notna()]
+        # Edycja rekordu = pierwszy wiersz z najlepszym wynikiem
+        pb_rows = with_result.groupby('uczestnik', sort=False)['rezultat_numeric'].idxmax()
+        stats['pb_edition'] = pd.Series(df.loc[pb_rows.values, 'miesiac_rok_str'].values, index=pb_rows.index)
+        stats['editions_count'] = with_result.groupby('uczestnik', sort=False)['edycja_nr'].nunique()
+        stats['editions_count'] = stats['editions_count'].fillna(0).astype(int)
+
+        last_3_nr = sorted(df['edycja_nr'].unique())[-3:]
+        stats['avg_result_last_3'] = df[df['edycja_nr'].isin(last_3_nr)].groupby('uczestnik', sort=False)['rezultat_numeric'].mean()
+
+        last_nr = grouped['edycja_nr'].transform('max')
+        last_rows = df[df['edycja_nr'] == last_nr].groupby('uczestnik', sort=False)
+        stats['last_edition_nr'] = grouped['edycja_nr'].max()
+        stats['last_edition_result'] = last_rows['rezultat_numeric'].max()
+        stats['last_edition_rank'] = last_rows['miejsce'].min().astype(float)
+        return stats
+
+    def participant(self, name):
+        """ParticipantHistory uczestnika albo None, gdy nie ma go w historii."""
+        return self._participants.get(name)
+
+    def edition(self, edition_str):
+        """EditionSummary edycji "MM.RRRR" albo None."""
+        return self._editions.get(edition_str)
+
+    def last_editions(self, n=3):
+        """n ostatnich edycji (od najnowszej)."""
+        return self.editions_newest_first[:n]
+
+    def recent_winners(self, n=3):
+        """Zwycięzcy n ostatnich edycji (bez powtórzeń)."""
+        rows = self._winner_rows[self._winner_rows['miesiac_rok_str'].isin(self.last_editions(n))]
+        return rows['uczestnik'].unique().tolist()
+
+    def context_stats(self, participants_list):
+        """Statystyki wybranych uczestników (kopia, wiersz = uczestnik z listy, w tej kolejności)."""
+        return self.stats.reindex(participants_list)
+
+    def has_any(self, participants_list):
+        return any(name in self._participants for name in participants_list)
+
+
+@st.cache_resource(max_entries=4)
+def _get_historical_index(data_version, _df_historical):
+    return HistoricalIndex(_df_historical)
+
+
+def get_historical_index(df_historical):
+    """Indeks dla danej wersji historii (klucz = skrót zawartości ramki)."""
+    return _get_historical_index(hash_worksheet(df_historical), df_historical)
+
+
+def fmt_stat(value, fmt="{:.1f}", empty="—"):
+    """Formatuje statystykę z indeksu; NaN (brak danych) jako empty."""
+    return empty if pd.isna(value) else fmt.format(value)
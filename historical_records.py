@@ -0,0 +1,83 @@
+"""
+Historia rekordów: rekordy życiowe (PB) i rekordy wszech czasów.
+
+Kronika, tabela rekordów rozgrywki i oś czasu rekordów życiowych na stronie
+statystyk historycznych osobno sortowały historię i przechodziły ją
+iterrows (per edycja albo per uczestnik). Tutaj jest jedno chronologiczne
+przejście po wynikach, które od razu zbiera wszystkie trzy widoki.
+"""
+import streamlit as st
+
+from sheet_cache import hash_worksheet
+
+
+class RecordsHistory:
+    """
+    Wynik przejścia po historii:
+    - badges: {(uczestnik, "MM.RRRR"): ["PB", "WR"]} - odznaki kroniki,
+    - overall_record: najlepszy wynik w historii,
+    - record_events: rekordy rozgrywki po edycjach (edition, holders, value, previous),
+    - personal_timelines: {uczestnik: [(edition, value, previous), ...]} - kolejne rekordy życiowe.
+    previous = None, gdy wcześniej nie było rekordu.
+    """
+
+    def __init__(self, df):
+        self.badges = {}
+        self.overall_record = 0
+        self.record_events = []
+        self.personal_timelines = {user: [] for user in df['uczestnik'].unique()} if not df.empty else {}
+        if df.empty:
+            return
+
+        scored = df.dropna(subset=['rezultat_numeric']).sort_values('miesiac')
+        personal_best = {}
+        all_time_best = None
+        edition, edition_best, edition_holders = None, None, []
+
+        def close_edition():
+            nonlocal all_time_best
+            if edition is not None and (all_time_best is None or edition_best > all_time_best):
+                self.record_events.append({
+                    'edition': edition,
+                    'holders': list(dict.fromkeys(edition_holders)),
+                    'value': edition_best,
+                    'previous': all_time_best,
+                })
+                all_time_best = edition_best
+
+        for user, edition_str, score in zip(scored['uczestnik'], scored['miesiac_rok_str'], scored['rezultat_numeric']):
+            if edition_str != edition:
+                close_edition()
+                edition, edition_best, edition_holders = edition_str, score, []
+            if score > edition_best:
+                edition_best, edition_holders = score, []
+            if score == edition_best:
+                edition_holders.append(user)
+
+            badges = []
+            previous_pb = personal_best.get(user)
+            if previous_pb is None or score > previous_pb:
+                personal_best[user] = score
+                self.personal_timelines[user].append((edition_str, score, previous_pb))
+                # Pierwszy wynik uczestnika (albo pierwszy niezerowy) to jeszcze nie pobicie rekordu
+                if previous_pb:
+                    badges.append("PB")
+
+            # Rekord "w danej chwili" - liczony wiersz po wierszu, także w obrębie edycji
+            if score > self.overall_record:
+                self.overall_record = score
+                badges.append("WR")
+
+            if badges:
+                self.badges[(user, edition_str)] = badges
+        close_edition()
+
+
+@st.cache_resource(max_entries=4)
+def _get_records_history(data_version, _df_historical):
+    return RecordsHistory(_df_historical)
+
+
+def get_records_history(df_historical):
+    """Historia rekordów dla danej wersji historii (klucz = skrót zawartości ramki)."""
+    return _get_records_history(hash_worksheet(df_historical), df_historical)
@@ -0,0 +1,381 @@
+"""
+Dane strony statystyk historycznych - liczone leniwie i zapamiętywane.
+
+Każda sekcja strony (zestawienia miesięczne, heatmapa, wyścig medalowy,
+ranking edycji, przeżywalność) robiła przy każdym rerunie własne
+posortowane, przefiltrowane i przestawione kopie historii - także po
+kliknięciu w widget, który jej nie dotyczy. HistoricalStats (jeden na
+wersję danych) zapamiętuje agregaty całej historii, a FilteredHistory
+(jeden na zestaw filtrów z panelu bocznego) wszystko, co zależy od
+wybranych uczestników i okresu. Zwracane ramki są współdzielone między
+sesjami - tylko do odczytu.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import streamlit as st
+
+from sheet_cache import hash_worksheet
+from translations import _t
+
+MAX_CACHED_VIEWS = 16
+# Klucze zależą od wyborów użytkowników (uczestnicy, zakres medali) - obiekt żyje
+# w cache_resource całego procesu, więc pamięć wyników też jest LRU
+MAX_MEMO_ENTRIES = 128
+
+
+class _Memoized:
+    def __init__(self):
+        self._memo = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _memoized(self, key, compute):
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+            value = self._memo[key] = compute()
+            while len(self._memo) > MAX_MEMO_ENTRIES:
+                self._memo.popitem(last=False)
+            return value
+
+
+class FilteredHistory(_Memoized):
+    """Historia po filtrach z panelu bocznego (uczestnicy, okres) i liczone z niej tabele."""
+
+    def __init__(self, stats, df, selected_users):
+        super().__init__()
+        self.stats = stats
+        self.df = df
+        self.selected_users = list(selected_users)
+
+    def month_columns(self):
+        """Edycje z widoku w kolejności chronologicznej ("MM.RRRR")."""
+        return self._memoized('month_columns', lambda: self.df['miesiac'].sort_values().dt.strftime('%m.%Y').unique())
+
+    def user_series(self, y_col):
+        """[(uczestnik, wiersze z wartością y_col wg miesiąca)] do wykresu porównawczego."""
+        def compute():
+            series = []
+            for user in self.selected_users:
+                user_data = self.df[self.df['uczestnik'] == user].sort_values('miesiac')
+                user_data_for_plot = user_data.dropna(subset=[y_col])
+                if not user_data_for_plot.empty:
+                    series.append((user, user_data_for_plot))
+            return series
+        return self._memoized(('user_series', y_col), compute)
+
+    def monthly_results(self, lang):
+        """Tabela wyników uczestnik x edycja albo None, gdy brak kolumny rezultat_raw."""
+        def compute():
+            summary_data = self.df
+            if 'rezultat_raw' not in summary_data.columns:
+                return None
+            monthly_results_pivot = summary_data.pivot_table(
+                index='uczestnik',
+                columns='miesiac_rok_str',
+                values='rezultat_raw',
+                aggfunc='first'
+            )
+            monthly_results_pivot = monthly_results_pivot.fillna('–').replace({'None': '–', None: '–'})
+            monthly_results_pivot = monthly_results_pivot.reindex(columns=self.month_columns())
+
+            avg_result_sort = summary_data.groupby('uczestnik')['rezultat_numeric'].mean().sort_values(ascending=False)
+            monthly_results_pivot = monthly_results_pivot.reindex(index=avg_result_sort.index)
+            return monthly_results_pivot.reset_index().rename(columns={'uczestnik': _t('participant', lang)})
+        return self._memoized(('monthly_results', lang), compute)
+
+    def monthly_positions(self, lang):
+        """Tabela miejsc uczestnik x edycja (wiersze wg średniego miejsca)."""
+        def compute():
+            summary_data = self.df
+            monthly_positions_pivot = summary_data.pivot_table(
+                index='uczestnik',
+                columns='miesiac_rok_str',
+                values='miejsce',
+                aggfunc='first'
+            )
+
+            monthly_positions_pivot = monthly_positions_pivot.astype(str)
+            monthly_positions_pivot = monthly_positions_pivot.replace({'<NA>': '–', 'nan': '–', 'None': '–', np.nan: '–'})
+            monthly_positions_pivot = monthly_positions_pivot.reindex(columns=self.month_columns())
+
+            avg_pos_sort = summary_data.groupby('uczestnik')['miejsce'].mean().sort_values()
+            monthly_positions_pivot = monthly_positions_pivot.reindex(index=avg_pos_sort.index)
+            return monthly_positions_pivot.reset_index().rename(columns={'uczestnik': _t('participant', lang)})
+        return self._memoized(('monthly_positions', lang), compute)
+
+    def medal_race(self, min_medal_pos, max_medal_pos):
+        """[(uczestnik, narastająca liczba medali wg edycji)] dla wybranych uczestników."""
+        def compute():
+            race_long = self.stats.medal_race(min_medal_pos, max_medal_pos)
+            if race_long is None:
+                return []
+            race_long_filtered = race_long[race_long['uczestnik'].isin(self.selected_users)]
+            return [
+                (user, race_long_filtered[race_long_filtered['uczestnik'] == user].sort_values('edycja_nr'))
+                for user in race_long_filtered['uczestnik'].unique()
+            ]
+        return self._memoized(('medal_race', min_medal_pos, max_medal_pos), compute)
+
+    def heatmap(self):
+        """Macierz miejsc uczestnik x edycja do heatmapy albo None."""
+        def compute():
+            heatmap_df = self.df.dropna(subset=['miejsce'])
+            if heatmap_df.empty:
+                return None
+            heatmap_pivot = heatmap_df.pivot_table(index='uczestnik', columns='miesiac_rok_str', values='miejsce')
+            heatmap_pivot = heatmap_pivot.reindex(columns=self.month_columns())
+            avg_pos_hm = heatmap_df.groupby('uczestnik')['miejsce'].mean().sort_values().index
+            heatmap_pivot = heatmap_pivot.reindex(index=avg_pos_hm)
+            return heatmap_pivot.astype(float)
+        return self._memoized('heatmap', compute)
+
+    def scatter(self):
+        """(punkty, paleta kolorów miejsc, podpisy [(miesiąc, wynik, uczestnik)]) albo None."""
+        def compute():
+            scatter_df = self.df.dropna(subset=['rezultat_numeric', 'miejsce'])
+            if scatter_df.empty:
+                return None
+
+            unique_positions = sorted(scatter_df['miejsce'].dropna().unique())
+            custom_palette = {}
+            for pos in unique_positions:
+                if pos == 1: custom_palette[pos] = 'red'
+                elif pos == 2: custom_palette[pos] = 'orange'
+                elif pos == 3: custom_palette[pos] = 'yellow'
+                else:
+                    if len(unique_positions) > 3:
+                        viridis_idx = int(np.interp(pos, [unique_positions[3], unique_positions[-1]], [0, len(sns.color_palette("viridis", n_colors=max(1, len(unique_positions) - 3))) - 1]))
+                        custom_palette[pos] = sns.color_palette("viridis", n_colors=max(1, len(unique_positions) - 3))[viridis_idx]
+                    else:
+                        custom_palette[pos] = 'gray'
+
+            labels = []
+            for user in self.selected_users:
+                user_data = scatter_df[scatter_df['uczestnik'] == user].sort_values('miesiac')
+                labels.extend((month, result, user) for month, result in zip(user_data['miesiac'], user_data['rezultat_numeric']))
+            return scatter_df, custom_palette, labels
+        return self._memoized('scatter', compute)
+
+    def position_counts(self, lang):
+        """Klasyfikacja wszystkich miejsc (uczestnik x miejsce + liczba startów) albo None."""
+        def compute():
+            all_positions_df = self.df.dropna(subset=['miejsce'])
+            if all_positions_df.empty:
+                return None
+            position_counts = pd.crosstab(all_positions_df['uczestnik'], all_positions_df['miejsce'])
+            all_possible_positions = range(1, int(all_positions_df['miejsce'].max()) + 1)
+            for pos in all_possible_positions:
+                if pos not in position_counts.columns: position_counts[pos] = 0
+            position_counts = position_counts.reindex(columns=sorted(position_counts.columns), fill_value=0)
+            # Liczymy tylko te wiersze, gdzie jest faktyczny wynik (nie jest NaN)
+            participation_count = self.df.dropna(subset=['rezultat_numeric'])['uczestnik'].value_counts().rename(_t('total_participations', lang))
+            position_counts = position_counts.join(participation_count)
+            sort_cols = [col for col in position_counts.columns if isinstance(col, (int, np.integer))]
+            position_counts = position_counts.sort_values(by=sort_cols, ascending=[False]*len(sort_cols))
+            return position_counts.reset_index().rename(columns={'uczestnik': _t('participant', lang)})
+        return self._memoized(('position_counts', lang), compute)
+
+    def medal_counts(self, lang):
+        """Klasyczna klasyfikacja medalowa (1.-3. miejsce) albo None."""
+        def compute():
+            all_positions_df = self.df.dropna(subset=['miejsce'])
+            top3_positions_df = all_positions_df[all_positions_df['miejsce'].isin([1, 2, 3])]
+            if top3_positions_df.empty:
+                return None
+            medal_counts = pd.crosstab(top3_positions_df['uczestnik'], top3_positions_df['miejsce'])
+            for pos in [1, 2, 3]:
+                if pos not in medal_counts.columns: medal_counts[pos] = 0
+            medal_counts = medal_counts[[1, 2, 3]]
+            medal_counts.columns = ['1. miejsce', '2. miejsce', '3. miejsce']
+            medal_counts[_t('total_medals_col', lang)] = medal_counts['1. miejsce'] + medal_counts['2. miejsce'] + medal_counts['3. miejsce']
+            medal_counts = medal_counts.sort_values(by=['1. miejsce', '2. miejsce', '3. miejsce'], ascending=[False, False, False])
+            return medal_counts.reset_index().rename(columns={'uczestnik': _t('participant', lang)})
+        return self._memoized(('medal_counts', lang), compute)
+
+
+class HistoricalStats(_Memoized):
+    """Agregaty całej historii i widoki po filtrach (LRU po krotce filtrów)."""
+
+    def __init__(self, df):
+        super().__init__()
+        self.df = df
+        self.max_editions_count = int(df['uczestnik'].value_counts().max()) if not df.empty else 1
+        self.active_df = df.dropna(subset=['rezultat_numeric'])
+        self._views = OrderedDict()
+
+    def eligible_users(self, min_editions_count):
+        """Uczestnicy z co najmniej min_editions_count wynikami (nie tylko PAUZA)."""
+        def compute():
+            user_counts = self.active_df['uczestnik'].value_counts()
+            return user_counts[user_counts >= min_editions_count].index.tolist()
+        return self._memoized(('eligible_users', min_editions_count), compute)
+
+    def eligible_df(self, min_editions_count):
+        return self._memoized(
+            ('eligible_df', min_editions_count),
+            lambda: self.df[self.df['uczestnik'].isin(self.eligible_users(min_editions_count))]
+        )
+
+    def selection(self, min_editions_count, selected_users):
+        """Historia wybranych uczestników, bez filtra okresu."""
+        def compute():
+            eligible_df = self.eligible_df(min_editions_count)
+            return eligible_df[eligible_df['uczestnik'].isin(selected_users)]
+        return self._memoized(('selection', min_editions_count, tuple(selected_users)), compute)
+
+    def view(self, min_editions_count, selected_users, period=None):
+        """
+        FilteredHistory dla filtrów z panelu bocznego. period: None (cała
+        historia), ('last_n', n) - n ostatnich edycji, ('range', od, do) - miesiące.
+        """
+        key = (min_editions_count, tuple(selected_users), period)
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+
+        filtered_df = self.selection(min_editions_count, selected_users)
+        if period is not None and not filtered_df.empty:
+            if period[0] == 'last_n':
+                max_edycja_nr = filtered_df['edycja_nr'].max()
+                min_edycja_nr = max_edycja_nr - period[1] + 1
+                filtered_df = filtered_df[filtered_df['edycja_nr'] >= min_edycja_nr]
+            elif period[0] == 'range':
+                _, start_date, end_date = period
+                filtered_df = filtered_df[(filtered_df['miesiac'] >= pd.to_datetime(start_date)) & (filtered_df['miesiac'] <= pd.to_datetime(end_date))]
+        view = FilteredHistory(self, filtered_df, selected_users)
+
+        with self._lock:
+            view = self._views.setdefault(key, view)
+            self._views.move_to_end(key)
+            while len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+        return view
+
+    @property
+    def max_position(self):
+        return int(self.df['miejsce'].max()) if not self.df['miejsce'].isnull().all() else 10
+
+    def medal_race(self, min_medal_pos, max_medal_pos):
+        """Narastająca liczba miejsc z zakresu po edycjach (format długi) albo None."""
+        def compute():
+            medals_history_df = self.df.dropna(subset=['miejsce'])
+            if max_medal_pos > 0:
+                medals_history_df = medals_history_df[
+                    (medals_history_df['miejsce'] >= min_medal_pos) &
+                    (medals_history_df['miejsce'] <= max_medal_pos)
+                ]
+            if medals_history_df.empty:
+                return None
+
+            medals_history_df = medals_history_df.sort_values('edycja_nr').assign(medal_count=1)
+            medals_agg = medals_history_df.groupby(['uczestnik', 'edycja_nr'])['medal_count'].sum().reset_index()
+            if medals_agg.empty:
+                return None
+
+            all_editions = range(1, self.df['edycja_nr'].max() + 1)
+            race_pivot = medals_agg.pivot_table(index='edycja_nr', columns='uczestnik', values='medal_count').reindex(all_editions).fillna(0).cumsum()
+            return race_pivot.melt(var_name='uczestnik', value_name='laczna_liczba_medali', ignore_index=False).reset_index()
+        return self._memoized(('medal_race', min_medal_pos, max_medal_pos), compute)
+
+    def player_stats(self, min_editions_count, lang):
+        """Statystyki uczestników spełniających próg startów (cała historia, bez filtra okresu)."""
+        def compute():
+            stats_df = self.eligible_df(min_editions_count)
+            if stats_df.empty:
+                return None
+            agg_funcs = {
+                'count': ('rezultat_numeric', 'count'),
+                'mean_result': ('rezultat_numeric', 'mean'),
+                'median_result': ('rezultat_numeric', 'median'),
+                'min_result': ('rezultat_numeric', 'min'),
+                'max_result': ('rezultat_numeric', 'max'),
+                'mean_pos': ('miejsce', 'mean'),
+                'median_pos': ('miejsce', 'median'),
+                'best_pos': ('miejsce', 'min'),
+            }
+            player_stats = stats_df.groupby('uczestnik').agg(**agg_funcs).reset_index()
+            player_stats.columns = [
+                _t('participant', lang), _t('count_col', lang),
+                f"{_t('mean_col', lang)} ({_t('results', lang)})", f"{_t('median_col', lang)} ({_t('results', lang)})", f"{_t('min_col', lang)} ({_t('results', lang)})", f"{_t('max_col', lang)} ({_t('results', lang)})",
+                f"{_t('mean_col', lang)} ({_t('positions', lang)})", f"{_t('median_col', lang)} ({_t('positions', lang)})", f"{_t('best_position', lang)}"
+            ]
+            col_mean_res = f"{_t('mean_col', lang)} ({_t('results', lang)})"
+            col_mean_pos = f"{_t('mean_col', lang)} ({_t('positions', lang)})"
+            player_stats[col_mean_res] = player_stats[col_mean_res].round(1)
+            player_stats[col_mean_pos] = player_stats[col_mean_pos].round(1)
+            return player_stats.sort_values(by=col_mean_pos)
+        return self._memoized(('player_stats', min_editions_count, lang), compute)
+
+    def participants_per_edition(self, lang):
+        """Liczba uczestników z wynikiem w każdej edycji (chronologicznie)."""
+        def compute():
+            participants_per_edition = self.active_df.groupby('miesiac_rok_str')['uczestnik'].nunique().reset_index()
+            participants_per_edition.columns = ['miesiac_rok_str', _t('count_col', lang)]
+            participants_per_edition['miesiac'] = participants_per_edition['miesiac_rok_str'].apply(lambda x: datetime.strptime(x, '%m.%Y'))
+            return participants_per_edition.sort_values('miesiac').drop(columns='miesiac')
+        return self._memoized(('participants_per_edition', lang), compute)
+
+    def avg_result_per_edition(self, lang):
+        """Średni wynik w każdej edycji (chronologicznie)."""
+        def compute():
+            avg_edition_stats = self.df.groupby('miesiac_rok_str').agg(
+                avg_result=('rezultat_numeric', 'mean'),
+            ).reset_index()
+            avg_edition_stats.columns = ['miesiac_rok_str', _t('avg_result_edition', lang)]
+            avg_edition_stats[_t('avg_result_edition', lang)] = avg_edition_stats[_t('avg_result_edition', lang)].round(1)
+            avg_edition_stats['miesiac'] = avg_edition_stats['miesiac_rok_str'].apply(lambda x: datetime.strptime(x, '%m.%Y'))
+            return avg_edition_stats.sort_values('miesiac').drop(columns='miesiac')
+        return self._memoized(('avg_result_per_edition', lang), compute)
+
+    def edition_ranking(self, lang):
+        """Ranking edycji: średni wynik, liczba uczestników i zwycięzca."""
+        def compute():
+            edition_ranking_data = []
+            df_sorted_by_edition_full = self.df.sort_values(by='edycja_nr')
+            for ed_nr, edition_data in df_sorted_by_edition_full.groupby('edycja_nr', sort=True):
+                avg_result_ed = edition_data['rezultat_numeric'].mean()
+                winner = "N/A"
+                if not edition_data['miejsce'].isnull().all():
+                    best_place_in_edition = edition_data['miejsce'].min()
+                    winners_in_edition = edition_data[edition_data['miejsce'] == best_place_in_edition]['uczestnik'].unique()
+                    winner = ", ".join(winners_in_edition)
+                edition_ranking_data.append({'Miesiąc/Rok': edition_data['miesiac_rok_str'].iloc[0], _t('avg_result_edition', lang): avg_result_ed.round(1) if pd.notna(avg_result_ed) else 'N/A', _t('participants_chart_ylabel', lang): edition_data['uczestnik'].nunique(), _t('edition_winner', lang): winner})
+            edition_ranking = pd.DataFrame(edition_ranking_data)
+            edition_ranking['miesiac_sort'] = edition_ranking['Miesiąc/Rok'].apply(lambda x: datetime.strptime(x, '%m.%Y'))
+            edition_ranking = edition_ranking.sort_values('miesiac_sort').drop(columns='miesiac_sort')
+            return edition_ranking.set_index('Miesiąc/Rok')
+        return self._memoized(('edition_ranking', lang), compute)
+
+    def survival_curve(self, edition_str):
+        """(dni, liczba aktywnych uczestników w dniu, ostatni dzień do osi X) albo None."""
+        def compute():
+            dropout_day = self.df.loc[self.df['miesiac_rok_str'] == edition_str, 'rezultat_numeric'] + 3
+            if dropout_day.empty:
+                return None
+            max_dropout_day_in_edition = int(dropout_day.max()) if not dropout_day.isnull().all() else 3
+            competition_days = np.arange(1, max_dropout_day_in_edition + 2)
+            # NaN > dzień daje False - uczestnik bez wyniku nie jest liczony jako aktywny
+            active_participants_count = list((dropout_day.to_numpy()[None, :] > competition_days[:, None]).sum(axis=1))
+            last_active_day_index = next((i for i, count in reversed(list(enumerate(active_participants_count))) if count > 0), 0)
+            if active_participants_count and active_participants_count[last_active_day_index] > 0: current_max_day = competition_days[last_active_day_index] + 1
+            elif competition_days.any(): current_max_day = competition_days[last_active_day_index]
+            else: current_max_day = 1
+            return competition_days, active_participants_count, current_max_day
+        return self._memoized(('survival_curve', edition_str), compute)
+
+
+@st.cache_resource(max_entries=2)
+def _get_historical_stats(data_version, _df):
+    return HistoricalStats(_df)
+
+
+def get_historical_stats(df):
+    """HistoricalStats dla danej wersji historii (klucz = skrót zawartości ramki)."""
+    return _get_historical_stats(hash_worksheet(df), df)
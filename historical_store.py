@@ -0,0 +1,152 @@
+"""
+Skompilowana historia rozgrywek (plik Feather w katalogu cache).
+
+historical_results.json to zagnieżdżony słownik {uczestnik: {"MM.RRRR": {...}}},
+który trzeba przejść w Pythonie, zamienić daty i liczby i policzyć numery
+edycji. Robimy to raz: wynik (z gotowymi kolumnami miesiac, rezultat_numeric,
+edycja_nr) ląduje w kolumnowym pliku Feather, a kolejne odczyty to
+mapowanie pliku w pamięć. Plik jest przebudowywany, gdy zmieni się JSON
+(porównanie rozmiaru i czasu modyfikacji, a przy różnicy - skrótu SHA-1;
+gdy treść jest ta sama, zapisujemy nowy czas, żeby nie liczyć skrótu co raz).
+
+Ręczna kompilacja: python historical_store.py
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from config import CACHE_DIR
+
+HISTORICAL_JSON = 'historical_results.json'
+COMPILED_FILE = 'historical_results.feather'
+
+_META_SHA1 = b'poprzeczka_source_sha1'
+_META_MTIME = b'poprzeczka_source_mtime'
+_META_SIZE = b'poprzeczka_source_size'
+
+
+def build_historical_frame(data):
+    """Zamienia zagnieżdżony JSON historii na płaską ramkę (wiersz = uczestnik w edycji)."""
+    records = []
+    for participant, editions in data.items():
+        for edition_str, values in editions.items():
+            try:
+                month, year = map(int, edition_str.split('.'))
+                date_obj = datetime(year, month, 1)
+            except ValueError:
+                # Pomijamy błędne daty
+                continue
+
+            records.append({
+                'uczestnik': participant,
+                'miesiac_rok_str': edition_str,
+                'miesiac': date_obj,
+                'rok': year,
+                # Zmienne wyniki
+                'miejsce': values.get('miejsce'),
+                'rezultat_uczestnika': values.get('rezultat_uczestnika'),
+                'status': values.get('status', 'Brak')
+            })
+
+    if not records:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(records)
+    # Poprawka na ostrzeżenie o mixed type
+    df.columns = df.columns.astype(str)
+
+    # Konwersja kolumn
+    df['miesiac'] = pd.to_datetime(df['miesiac'])
+    df['miejsce'] = pd.to_numeric(df['miejsce'], errors='coerce').astype('Int64')
+    df['rezultat_numeric'] = pd.to_numeric(df['rezultat_uczestnika'], errors='coerce')
+
+    # Numer edycji = pozycja miesiąca na osi czasu wszystkich edycji
+    df['edycja_nr'] = df['miesiac'].rank(method='dense').astype('int64')
+    return df
+
+
+def _source_signature(source):
+    stat = os.stat(source)
+    return str(stat.st_mtime_ns).encode(), str(stat.st_size).encode()
+
+
+def _source_sha1(source):
+    with open(source, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest().encode()
+
+
+def compile_historical_data(source=HISTORICAL_JSON, target=None):
+    """Kompiluje JSON do pliku Feather (bez kompresji - da się go mapować w pamięć)."""
+    target = target or os.path.join(CACHE_DIR, COMPILED_FILE)
+    with open(source, 'r', encoding='utf-8') as f:
+        df = build_historical_frame(json.load(f))
+
+    mtime, size = _source_signature(source)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        _META_SHA1: _source_sha1(source),
+        _META_MTIME: mtime,
+        _META_SIZE: size,
+    })
+    _write_table(table, target)
+    return df
+
+
+def _write_table(table, target):
+    os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+    tmp_target = f"{target}.{os.getpid()}.tmp"
+    feather.write_feather(table, tmp_target, compression='uncompressed')
+    os.replace(tmp_target, target)  # podmiana atomowa - czytelnicy nie widzą pół zapisanego pliku
+
+
+def _is_current(source, target):
+    """Czy skompilowany plik odpowiada aktualnemu JSON-owi."""
+    try:
+        with pa.memory_map(target) as f:
+            metadata = pa.ipc.open_file(f).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    mtime, size = _source_signature(source)
+    if (metadata.get(_META_MTIME), metadata.get(_META_SIZE)) == (mtime, size):
+        return True
+    # Inny czas modyfikacji (np. checkout z gita) nie musi znaczyć innej treści
+    if metadata.get(_META_SHA1) != _source_sha1(source):
+        return False
+    try:
+        table = feather.read_table(target, memory_map=True)
+        _write_table(table.replace_schema_metadata({**metadata, _META_MTIME: mtime, _META_SIZE: size}), target)
+    except (OSError, pa.ArrowInvalid) as e:
+        print(f"Nie udało się zapisać nowego czasu modyfikacji historii ({target}): {e}")
+    return True
+
+
+def load_historical_frame(source=HISTORICAL_JSON, target=None):
+    """
+    Ramka historii ze skompilowanego pliku; nieaktualny lub brakujący plik
+    jest kompilowany na nowo. FileNotFoundError, gdy nie ma źródłowego JSON-a.
+    """
+    target = target or os.path.join(CACHE_DIR, COMPILED_FILE)
+    if not os.path.exists(source):
+        raise FileNotFoundError(source)
+
+    if _is_current(source, target):
+        return feather.read_table(target, memory_map=True).to_pandas()
+
+    try:
+        return compile_historical_data(source, target)
+    except OSError as e:
+        # Brak zapisu do katalogu cache - liczymy z JSON-a bez zapisywania wyniku
+        print(f"Nie udało się zapisać skompilowanej historii ({target}): {e}")
+        with open(source, 'r', encoding='utf-8') as f:
+            return build_historical_frame(json.load(f))
+
+
+if __name__ == '__main__':
+    compiled = compile_historical_data()
+    print(f"Skompilowano {len(compiled)} wierszy do {os.path.join(CACHE_DIR, COMPILED_FILE)}")
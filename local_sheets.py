@@ -0,0 +1,93 @@
+"""
+Lokalny zamiennik arkusza Google (gspread) - do pracy i testów offline.
+
+Każda zakładka to plik CSV w jednym katalogu (pierwszy wiersz = nagłówki).
+Obsługujemy tylko to, czego używa aplikacja: worksheet(), get_all_records(),
+get_all_values(), append_row(s)() i values_batch_get() z zakresami A1.
+Włączenie: zmienna środowiskowa POPRZECZKA_LOCAL_SHEETS=<katalog>
+(patrz google_connect.connect_to_google_sheets).
+"""
+import csv
+import os
+import threading
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, fill_gaps, numericise_all, to_records
+
+_write_lock = threading.Lock()
+
+
+def _trim(values):
+    """Jak API Google: bez pustych wierszy i komórek na końcu."""
+    rows = []
+    for row in values:
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        rows.append(row)
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+class LocalWorksheet:
+    def __init__(self, path, title):
+        self.path = path
+        self.title = title
+
+    def get_all_values(self):
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return _trim(csv.reader(f))
+
+    def get_all_records(self):
+        values = fill_gaps(self.get_all_values())
+        if len(values) < 2:
+            return []
+        return to_records(values[0], [numericise_all(row) for row in values[1:]])
+
+    def append_rows(self, values, value_input_option=None, **kwargs):
+        with _write_lock, open(self.path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for row in values:
+                writer.writerow(["" if v is None else v for v in row])
+
+    def append_row(self, values, value_input_option=None, **kwargs):
+        self.append_rows([values], value_input_option)
+
+
+class LocalSpreadsheet:
+    """Katalog plików CSV udający arkusz Google."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def worksheet(self, title):
+        path = os.path.join(self.directory, f"{title}.csv")
+        if not os.path.exists(path):
+            raise WorksheetNotFound(title)
+        return LocalWorksheet(path, title)
+
+    def values_batch_get(self, ranges, params=None):
+        value_ranges = []
+        for a1 in ranges:
+            title, cells = a1, None
+            if a1.startswith("'"):
+                closing = a1.rindex("'")
+                title, rest = a1[1:closing].replace("''", "'"), a1[closing + 1:]
+                cells = rest[1:] if rest.startswith("!") else None
+            elif "!" in a1:
+                title, cells = a1.split("!", 1)
+
+            values = self.worksheet(title).get_all_values()
+            if cells:
+                grid = a1_range_to_grid_range(cells)
+                rows = values[grid.get('startRowIndex', 0):grid.get('endRowIndex', len(values))]
+                values = _trim(
+                    row[grid.get('startColumnIndex', 0):grid.get('endColumnIndex')] for row in rows
+                )
+
+            value_range = {'range': a1, 'majorDimension': 'ROWS'}
+            if values:
+                value_range['values'] = values
+            value_ranges.append(value_range)
+        return {'valueRanges': value_ranges}
@@ -0,0 +1,235 @@
+"""
+Wysyłka powiadomień e-mail w tle.
+
+Zapis formularza sprawdzał powiadomienia i wysyłał e-maile w tym samym
+rerunie, a każdy send_email otwierał nowe połączenie SMTP (STARTTLS,
+logowanie, quit) - użytkownik czekał kilka sekund. Tutaj zadanie trafia do
+kolejki w pamięci procesu, a jeden wątek je wykonuje i wysyła wiadomości
+przez jedno połączenie SMTP, używane ponownie dla kolejnych e-maili
+(zamykane po chwili bezczynności). Zadania, które się nie udały, lądują na
+liście dead letters - do podglądu i ponowienia w panelu admina.
+
+Lokalny test bez prawdziwego serwera: python -m aiosmtpd -n -l localhost:8025
+i w secrets [email]: smtp_server = "localhost", smtp_port = 8025,
+use_tls = false, bez password (bez STARTTLS i logowania).
+"""
+import queue
+import smtplib
+import threading
+import time
+from collections import deque
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import streamlit as st
+
+SMTP_TIMEOUT_SECONDS = 30
+# Połączenie czeka na kolejne e-maile tyle sekund, potem je zamykamy (serwery i tak zrywają bezczynne)
+SMTP_IDLE_SECONDS = 30
+SEND_ATTEMPTS = 3
+MAX_DEAD_LETTERS = 200
+
+
+class Email:
+    """
+    Wiadomość do wysłania; sent_message trafia do logu po udanej wysyłce,
+    a on_result(wysłano) - np. do rejestru wysyłek - po wysyłce lub porażce.
+    """
+
+    def __init__(self, recipients, subject, html_content, sent_message=None, on_result=None):
+        self.recipients = recipients
+        self.subject = subject
+        self.html_content = html_content
+        self.sent_message = sent_message or f"Wysłano: {subject}"
+        self.on_result = on_result
+
+    def report(self, sent):
+        if self.on_result is None:
+            return
+        try:
+            self.on_result(sent)
+        except Exception as e:
+            print(f"Nie udało się zapisać wyniku wysyłki ({self.subject}): {e}")
+
+
+class SmtpMailer:
+    """Jedno połączenie SMTP wielokrotnego użytku (otwierane przy pierwszej wiadomości)."""
+
+    def __init__(self, conf):
+        self.conf = conf
+        self._server = None
+        self._lock = threading.Lock()
+        self.last_used_at = None
+
+    def _connect(self):
+        server = smtplib.SMTP(self.conf["smtp_server"], self.conf["smtp_port"], timeout=SMTP_TIMEOUT_SECONDS)
+        if self.conf.get("use_tls", True):
+            server.starttls()
+        if self.conf.get("password"):
+            server.login(self.conf["sender"], self.conf["password"])
+        return server
+
+    def _message(self, email):
+        sender = self.conf["sender"]
+        msg = MIMEMultipart()
+        msg['From'] = f"Poprzeczka App <{sender}>"
+        msg['Subject'] = email.subject
+
+        if isinstance(email.recipients, list):
+            msg['To'] = sender
+            msg['Bcc'] = ", ".join(email.recipients)
+            dest = email.recipients + [sender]
+        else:
+            msg['To'] = email.recipients
+            dest = [email.recipients]
+
+        msg.attach(MIMEText(email.html_content, 'html'))
+        return dest, msg.as_string()
+
+    def send(self, email):
+        """Wysyła wiadomość; zerwane połączenie jest raz otwierane na nowo."""
+        dest, payload = self._message(email)
+        with self._lock:
+            for reconnect in (False, True):
+                if self._server is None:
+                    self._server = self._connect()
+                try:
+                    self._server.sendmail(self.conf["sender"], dest, payload)
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    self._server = None
+                    if reconnect:
+                        raise
+            self.last_used_at = time.time()
+
+    def close(self):
+        with self._lock:
+            if self._server is not None:
+                try:
+                    self._server.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._server = None
+
+    def close_if_idle(self, idle_seconds=SMTP_IDLE_SECONDS):
+        if self._server is not None and self.last_used_at is not None and time.time() - self.last_used_at >= idle_seconds:
+            self.close()
+
+
+class NotificationService:
+    """
+    Kolejka zadań powiadomień i wątek, który je wykonuje. Zadanie to
+    build(log) -> lista Email: sprawdzenie danych dzieje się też w tle.
+    """
+
+    def __init__(self, mailer):
+        self.mailer = mailer
+        self.sent_count = 0
+        self.dead_letters = deque(maxlen=MAX_DEAD_LETTERS)
+        self._jobs = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._jobs.put(None)
+
+    def submit(self, description, build):
+        """Dodaje zadanie do kolejki i od razu wraca."""
+        self._jobs.put((description, build))
+
+    def pending(self):
+        return self._jobs.qsize()
+
+    def _log(self, level, text):
+        print(f"[powiadomienia] {level}: {text}")
+
+    def _dead_letter(self, description, error, email=None):
+        self._log('error', f"{description}: {error}")
+        self.dead_letters.append({
+            'failed_at': time.time(),
+            'description': description,
+            'error': str(error),
+            'email': email,
+        })
+
+    def send_now(self, email):
+        """Wysyła wiadomość w bieżącym wątku (z ponowieniami); błędy przepuszcza dalej."""
+        if self.mailer is None:
+            raise RuntimeError("brak konfiguracji [email] w secrets")
+        for attempt in range(SEND_ATTEMPTS):
+            try:
+                self.mailer.send(email)
+                self.sent_count += 1
+                return
+            except (smtplib.SMTPException, OSError):
+                self.mailer.close()
+                if attempt == SEND_ATTEMPTS - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _deliver(self, description, email):
+        try:
+            self.send_now(email)
+        except Exception as e:
+            self._dead_letter(description, e, email)
+            email.report(False)
+            return
+        self._log('success', email.sent_message)
+        email.report(True)
+
+    def run_job(self, description, build):
+        """Wykonuje zadanie: buduje wiadomości i wysyła je po kolei."""
+        try:
+            emails = build(self._log)
+        except Exception as e:
+            self._dead_letter(description, e)
+            return
+        for email in emails:
+            self._deliver(description, email)
+
+    def retry_dead_letters(self):
+        """Ponawia (w tle) wysyłkę wiadomości z listy dead letters; zwraca ich liczbę."""
+        retried = 0
+        for _ in range(len(self.dead_letters)):
+            letter = self.dead_letters.popleft()
+            if letter['email'] is None:
+                # Nieudane sprawdzenie danych - ponowienie bez danych zadania nie ma sensu
+                self.dead_letters.append(letter)
+                continue
+            email = letter['email']
+            self.submit(letter['description'], lambda _log, email=email: [email])
+            retried += 1
+        return retried
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                job = self._jobs.get(timeout=SMTP_IDLE_SECONDS)
+            except queue.Empty:
+                if self.mailer is not None:
+                    self.mailer.close_if_idle()
+                continue
+            if job is None:
+                break
+            self.run_job(*job)
+        if self.mailer is not None:
+            self.mailer.close()
+
+    def status(self):
+        return {'pending': self.pending(), 'sent_count': self.sent_count, 'dead_letters': len(self.dead_letters)}
+
+
+@st.cache_resource(on_release=lambda service: service.stop())
+def get_notification_service():
+    """Jedna usługa powiadomień na proces (konfiguracja SMTP z secrets [email])."""
+    try:
+        conf = dict(st.secrets["email"])
+    except Exception as e:
+        print(f"Powiadomienia e-mail bez konfiguracji SMTP: {e}")
+        conf = None
+    return NotificationService(SmtpMailer(conf) if conf else None).start()
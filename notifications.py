@@ -1,41 +1,17 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import streamlit as st
 import pandas as pd
 from config import EDITIONS_CONFIG
-from page_current_ranking import calculate_ranking
-from data_loader import load_google_sheet_data, process_raw_data
+from data_loader import load_google_sheet_data
+from derived_cache import get_derived_edition
 from google_connect import connect_to_google_sheets
-
-# --- KONFIGURACJA KOLUMN SUBSKRYPCJI ---
-# Nazwy kolumn w arkuszu 'Emails'
-COL_ALERT_RISK = 'Alert_Risk'     # Dla ostrzeżeń indywidualnych (Ryzyko/Eliminacja)
-COL_ALERT_RESULTS = 'Alert_Results' # Dla rankingu ogólnego
+from notification_service import Email, get_notification_service
+from send_ledger import edition_ledger_key, get_send_ledger
+from subscriber_index import get_subscriber_index
 
 def send_email(recipients, subject, html_content):
-    """Bezpieczne wysyłanie e-maili przez SMTP."""
+    """Wysyła e-mail od razu - przez wspólne połączenie SMTP usługi powiadomień."""
     try:
-        conf = st.secrets["email"]
-        msg = MIMEMultipart()
-        msg['From'] = f"Poprzeczka App <{conf['sender']}>"
-        msg['Subject'] = subject
-        
-        if isinstance(recipients, list):
-            msg['To'] = conf['sender']
-            msg['Bcc'] = ", ".join(recipients)
-            dest = recipients + [conf['sender']]
-        else:
-            msg['To'] = recipients
-            dest = [recipients]
-
-        msg.attach(MIMEText(html_content, 'html'))
-        
-        server = smtplib.SMTP(conf["smtp_server"], conf["smtp_port"])
-        server.starttls()
-        server.login(conf["sender"], conf["password"])
-        server.sendmail(conf["sender"], dest, msg.as_string())
-        server.quit()
+        get_notification_service().send_now(Email(recipients, subject, html_content))
         return True
     except Exception as e:
         st.error(f"❌ SMTP Error: {e}")
@@ -47,27 +23,53 @@ def is_failure(status):
     return str(status).strip().lower() not in ["zaliczone", "completed", "done", "ok", "yes", "tak"]
 
 def check_and_send_notifications(conn, edition_key, current_user, current_day, current_status):
+    """Sprawdza i wysyła powiadomienia od razu, z podglądem w panelu (ręczne wywołanie admina)."""
     debug = st.expander("🕵️ DEBUG POWIADOMIEŃ", expanded=True)
+    log = lambda level, text: getattr(debug, level)(text)
+    for email in collect_notifications(conn, edition_key, current_user, current_day, current_status, log):
+        sent = send_email(email.recipients, email.subject, email.html_content)
+        if sent:
+            debug.success(email.sent_message)
+        email.report(sent)
+
+def queue_notifications(conn, edition_key, current_user, current_day, current_status):
+    """
+    Zleca sprawdzenie i wysyłkę powiadomień wątkowi w tle - zapis formularza
+    nie czeka na SMTP. Dopisany wiersz jest już w pamięci zakładek, więc
+    sprawdzenie go widzi, nawet jeśli kolejka zapisów jeszcze go nie wysłała.
+    """
+    get_notification_service().submit(
+        f"{edition_key}: {current_user}, etap {current_day} ({current_status})",
+        lambda log: collect_notifications(conn, edition_key, current_user, current_day, current_status, log)
+    )
+
+def collect_notifications(conn, edition_key, current_user, current_day, current_status, log):
+    """
+    Sprawdza, jakie powiadomienia należą się po wpisie, i zwraca listę Email
+    (nic nie wysyła). log(poziom, tekst) - poziomy jak w st: error/warning/success.
+    """
+    emails = []
     
     # 0. Zapewnienie połączenia
     if conn is None:
         try: conn = connect_to_google_sheets()
-        except: return
+        except: return emails
 
     cfg = EDITIONS_CONFIG.get(edition_key)
-    if not cfg: return
+    if not cfg: return emails
 
     try:
         # 1. Pobranie danych
         df_raw = load_google_sheet_data(conn, cfg['sheet_name'])
-        sub_df = load_google_sheet_data(conn, "Emails")
+        subscribers = get_subscriber_index(load_google_sheet_data(conn, "Emails"))
         
         expected_cols = ['Participant', 'Day', 'Status', 'Timestamp', 'Notes']
-        processed_data, max_d_raw, success = process_raw_data(df_raw, 'pl', expected_cols, cfg['sheet_name'])
+        edition = get_derived_edition(cfg['sheet_name'], df_raw, cfg['participants'], 'pl', expected_cols)
+        processed_data = edition.current_data
         
-        if not success:
-            debug.error("Błąd przetwarzania danych.")
-            return
+        if not edition.success:
+            log('error', "Błąd przetwarzania danych.")
+            return emails
 
         # ==============================================================================
         # CZĘŚĆ 1: POWIADOMIENIA INDYWIDUALNE (RYZYKO vs ELIMINACJA)
@@ -100,110 +102,90 @@ def check_and_send_notifications(conn, edition_key, current_user, current_day, c
                         is_elimination = True
                     
                     # --- Przygotowanie wysyłki ---
-                    col_nick = next((c for c in sub_df.columns if c.lower() in ['nick', 'participant', 'uczestnik', 'user']), None)
-                    col_email = next((c for c in sub_df.columns if c.lower() in ['email', 'e-mail', 'mail']), None)
-                    col_risk_sub = next((c for c in sub_df.columns if c in [COL_ALERT_RISK, 'Alert_Risk']), None)
-
-                    if col_nick and col_email:
-                        user_row = sub_df[sub_df[col_nick].astype(str).str.strip() == str(current_user).strip()]
-                        
-                        if not user_row.empty:
-                            user_email = user_row.iloc[0][col_email]
-                            
-                            # Sprawdzamy zgodę (domyślnie wysyłamy, chyba że wyraźnie FALSE)
-                            should_send = True
-                            if col_risk_sub:
-                                val = str(user_row.iloc[0][col_risk_sub]).upper()
-                                if val in ['FALSE', 'NO', 'NIE', '0']:
-                                    should_send = False
-                            
-                            if should_send and user_email:
-                                if is_elimination:
-                                    # --- SCENARIUSZ ELIMINACJI (3x Fail) ---
-                                    debug.warning(f"⛔ {current_user}: Wykryto 3 porażki z rzędu. Wysyłam info o eliminacji.")
-                                    subject = f"ℹ️ Poprzeczka: Ważna informacja o statusie ({current_user})"
-                                    html_content = f"""
-                                    <html><body style="font-family: Arial, sans-serif; color: #333;">
-                                        <h2 style="color: #d32f2f;">⛔ Status Uczestnictwa</h2>
-                                        <p>Cześć <b>{current_user}</b>,</p>
-                                        <p>Do bazy danych wpłynął Twój wynik za etap {c_day}. System odnotował <b>3 niezaliczone etapy z rzędu</b>:</p>
-                                        <ul style="color: #555;">
-                                            <li>Etap {prev_prev_day}: ❌ Niezaliczone</li>
-                                            <li>Etap {prev_day}: ❌ Niezaliczone</li>
-                                            <li>Etap {c_day}: ❌ Niezaliczone (Dzisiaj)</li>
-                                        </ul>
-                                        <p>Zgodnie z zasadami, oznacza to zakończenie rywalizacji w bieżącej edycji.</p>
-                                        <p style="background-color: #fff3e0; padding: 15px; border-left: 5px solid #ff9800;">
-                                            <b>⚠️ To pomyłka?</b><br>
-                                            Jeśli wprowadzono błędne dane, możesz je natychmiast skorygować w swoim formularzu na stronie aplikacji. 
-                                            System automatycznie przeliczy Twój status po poprawieniu wyniku.
-                                        </p>
-                                        <p><a href="https://poprzeczka.streamlit.app" style="color: #d32f2f; font-weight: bold;">Przejdź do formularza w aplikacji</a></p>
-                                    </body></html>
-                                    """
-                                else:
-                                    # --- SCENARIUSZ RYZYKA (2x Fail) ---
-                                    debug.warning(f"⚠️ {current_user}: Wykryto 2 porażki z rzędu. Wysyłam ostrzeżenie.")
-                                    subject = f"⚠️ Poprzeczka: Ryzyko braku zaliczenia ({current_user})"
-                                    html_content = f"""
-                                    <html><body style="font-family: Arial, sans-serif; color: #333;">
-                                        <h2 style="color: #f57c00;">⚠️ Ostrzeżenie o wynikach</h2>
-                                        <p>Cześć <b>{current_user}</b>,</p>
-                                        <p>Odnotowaliśmy <b>drugi niezaliczony etap z rzędu</b> (Etapy: {prev_day} i {c_day}).</p>
-                                        <p>To tylko przypomnienie: kolejny niezaliczony etap (trzeci z rzędu) będzie skutkował automatyczną eliminacją.</p>
-                                        <p>Sprawdź, czy wszystko się zgadza w Twoim dzienniku aktywności:</p>
-                                        <p><a href="https://poprzeczka.streamlit.app" style="background-color: #f57c00; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">Sprawdź swoje wyniki</a></p>
-                                    </body></html>
-                                    """
-
-                                if send_email(user_email, subject, html_content):
-                                    debug.success(f"Powiadomienie indywidualne wysłane do: {current_user}")
+                    # Adres z indeksu subskrybentów (domyślnie wysyłamy, chyba że zgoda wyraźnie FALSE)
+                    user_email = subscribers.risk_email(current_user)
+                    
+                    if user_email:
+                        if is_elimination:
+                            # --- SCENARIUSZ ELIMINACJI (3x Fail) ---
+                            log('warning', f"⛔ {current_user}: Wykryto 3 porażki z rzędu. Wysyłam info o eliminacji.")
+                            subject = f"ℹ️ Poprzeczka: Ważna informacja o statusie ({current_user})"
+                            html_content = f"""
+                            <html><body style="font-family: Arial, sans-serif; color: #333;">
+                                <h2 style="color: #d32f2f;">⛔ Status Uczestnictwa</h2>
+                                <p>Cześć <b>{current_user}</b>,</p>
+                                <p>Do bazy danych wpłynął Twój wynik za etap {c_day}. System odnotował <b>3 niezaliczone etapy z rzędu</b>:</p>
+                                <ul style="color: #555;">
+                                    <li>Etap {prev_prev_day}: ❌ Niezaliczone</li>
+                                    <li>Etap {prev_day}: ❌ Niezaliczone</li>
+                                    <li>Etap {c_day}: ❌ Niezaliczone (Dzisiaj)</li>
+                                </ul>
+                                <p>Zgodnie z zasadami, oznacza to zakończenie rywalizacji w bieżącej edycji.</p>
+                                <p style="background-color: #fff3e0; padding: 15px; border-left: 5px solid #ff9800;">
+                                    <b>⚠️ To pomyłka?</b><br>
+                                    Jeśli wprowadzono błędne dane, możesz je natychmiast skorygować w swoim formularzu na stronie aplikacji. 
+                                    System automatycznie przeliczy Twój status po poprawieniu wyniku.
+                                </p>
+                                <p><a href="https://poprzeczka.streamlit.app" style="color: #d32f2f; font-weight: bold;">Przejdź do formularza w aplikacji</a></p>
+                            </body></html>
+                            """
+                        else:
+                            # --- SCENARIUSZ RYZYKA (2x Fail) ---
+                            log('warning', f"⚠️ {current_user}: Wykryto 2 porażki z rzędu. Wysyłam ostrzeżenie.")
+                            subject = f"⚠️ Poprzeczka: Ryzyko braku zaliczenia ({current_user})"
+                            html_content = f"""
+                            <html><body style="font-family: Arial, sans-serif; color: #333;">
+                                <h2 style="color: #f57c00;">⚠️ Ostrzeżenie o wynikach</h2>
+                                <p>Cześć <b>{current_user}</b>,</p>
+                                <p>Odnotowaliśmy <b>drugi niezaliczony etap z rzędu</b> (Etapy: {prev_day} i {c_day}).</p>
+                                <p>To tylko przypomnienie: kolejny niezaliczony etap (trzeci z rzędu) będzie skutkował automatyczną eliminacją.</p>
+                                <p>Sprawdź, czy wszystko się zgadza w Twoim dzienniku aktywności:</p>
+                                <p><a href="https://poprzeczka.streamlit.app" style="background-color: #f57c00; color: white; padding: 10px 20px; text-decoration: none; border-radius: 4px;">Sprawdź swoje wyniki</a></p>
+                            </body></html>
+                            """
+
+                        emails.append(Email(user_email, subject, html_content,
+                                            f"Powiadomienie indywidualne wysłane do: {current_user}"))
 
         # ==============================================================================
         # CZĘŚĆ 2: POWIADOMIENIE O KOMPLECIE (OFICJALNY RANKING)
         # ==============================================================================
         
-        participants = cfg['participants']
-        found_complete_day = None
-        
-        try: start_search = int(max_d_raw)
-        except: start_search = 1
+        # Etapy kompletne liczymy tak samo jak strona rankingu (ten sam wynik z pamięci edycji)
+        complete_stages = edition.complete_stages()
+        found_complete_day = complete_stages[-1] if complete_stages else None
 
-        for d in range(start_search, 0, -1):
-            if d > 1:
-                _, prev_elim_map = calculate_ranking(processed_data, d-1, 'pl', participants, ranking_type='official')
-            else:
-                prev_elim_map = {}
+        # Etapy do ostatniego wysłanego włącznie są już za nami - liczy się tylko nowszy
+        ledger = get_send_ledger()
+        ledger_key = edition_ledger_key(cfg)
+        last_sent_stage = ledger.last_sent_stage(ledger_key)
+        if found_complete_day and found_complete_day <= last_sent_stage:
+            found_complete_day = None
 
-            # Czekamy na aktywnych (nie OUT dzień wcześniej)
-            active_players_in_round = [p for p in participants if not prev_elim_map.get(p, False)]
-            
-            missing_active = []
-            for p in active_players_in_round:
-                if d not in processed_data.get(p, {}):
-                    missing_active.append(p)
-            
-            if len(missing_active) == 0:
-                found_complete_day = d
-                break
-        
-        if found_complete_day:
-            ranking_df, elim_map = calculate_ranking(processed_data, found_complete_day, 'pl', participants, ranking_type='official')
+        # Subskrybenci rankingu - lista gotowa w indeksie
+        recipients = list(subscribers.results_recipients) if found_complete_day else []
+
+        if not found_complete_day:
+            if last_sent_stage:
+                log('info', f"Brak nowego kompletnego etapu (ostatnie wysłane wyniki: etap {last_sent_stage}).")
+        elif recipients and not ledger.claim(ledger_key, found_complete_day):
+            # Każdy etap wychodzi raz: wysłany albo właśnie wysyłany przy innym zapisie
+            log('info', f"Wyniki etapu {found_complete_day} już wysłane lub w trakcie wysyłki.")
+        elif recipients:
+            ranking_df, elim_map = edition.ranking(found_complete_day, ranking_type='official')
             
             rows = ""
-            c = ranking_df.columns
-            col_rank, col_part, col_score = c[0], c[1], c[2]
             
             for _, row in ranking_df.iterrows():
-                p_name = row[col_part]
+                p_name = row['participant']
                 is_out = elim_map.get(p_name, False)
                 style = "color: #999; text-decoration: line-through;" if is_out else "color: #333;"
                 status_txt = " <span style='color:red; font-size:0.8em;'>(OUT)</span>" if is_out else ""
                 
                 rows += f"""<tr>
-                    <td style='padding:8px; border-bottom:1px solid #ddd;'>{row[col_rank]}.</td>
+                    <td style='padding:8px; border-bottom:1px solid #ddd;'>{row['rank']}.</td>
                     <td style='padding:8px; border-bottom:1px solid #ddd; {style}'>{p_name}{status_txt}</td>
-                    <td style='padding:8px; border-bottom:1px solid #ddd; text-align:center;'>{row[col_score]}</td>
+                    <td style='padding:8px; border-bottom:1px solid #ddd; text-align:center;'>{row['highest_pass']}</td>
                 </tr>"""
 
             html_ranking = f"""
@@ -225,20 +207,12 @@ def check_and_send_notifications(conn, edition_key, current_user, current_day, c
             </body></html>
             """
             
-            # Pobieramy subskrybentów rankingu
-            col_res_sub = next((c for c in sub_df.columns if c in [COL_ALERT_RESULTS, 'Alert_Results']), None)
-            col_email = next((c for c in sub_df.columns if c.lower() in ['email', 'e-mail', 'mail']), None)
-            
-            if col_res_sub and col_email:
-                emails_to_send = sub_df[sub_df[col_res_sub].astype(str).str.upper().isin(['TRUE', 'YES', 'TAK', '1'])]
-                recipients = emails_to_send[col_email].dropna().tolist()
-                
-                if recipients:
-                    # Tutaj logika: zazwyczaj nie chcemy wysyłać tego samego maila wiele razy
-                    # Ale w trybie prostym wysyłamy przy każdym "dotknięciu" kompletu.
-                    # Możesz to ograniczyć w przyszłości.
-                    if send_email(recipients, f"🏁 Poprzeczka: Wyniki Etapu {found_complete_day}", html_ranking):
-                        debug.success(f"Newsletter ogólny wysłany do {len(recipients)} osób.")
+            stage = found_complete_day
+            emails.append(Email(recipients, f"🏁 Poprzeczka: Wyniki Etapu {stage}", html_ranking,
+                                f"Newsletter ogólny wysłany do {len(recipients)} osób.",
+                                on_result=lambda sent: ledger.mark(ledger_key, stage, sent)))
 
     except Exception as e:
-        debug.error(f"Błąd krytyczny: {e}")
+        log('error', f"Błąd krytyczny: {e}")
+
+    return emails
@@ -3,59 +3,15 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 from translations import _t
+from historical_records import get_records_history
 
 def calculate_records_history(df):
     """
-    Analizuje historię chronologicznie, aby ustalić, kto i kiedy pobił rekord.
-    Zwraca słowniki z informacjami o rekordach dla konkretnych edycji.
+    Zwraca słownik odznak {(user, edycja_str): [lista_odznak]} i aktualny rekord
+    rozgrywek - z jednego chronologicznego przejścia (historical_records).
     """
-    # Sortujemy od najstarszej do najnowszej
-    df_sorted = df.sort_values('miesiac')
-    
-    # Słowniki do przechowywania stanu
-    user_pbs = {} # {user: current_best_score}
-    overall_record = 0
-    
-    # Słownik wynikowy: {(user, edycja_str): [lista_odznak]}
-    badges_map = {}
-    
-    # Iterujemy po unikalnych edycjach
-    unique_editions = df_sorted['miesiac_rok_str'].unique()
-    # Sortujemy edycje po dacie, bo unique() bierze w kolejności występowania
-    unique_editions = sorted(unique_editions, key=lambda x: datetime.strptime(x, '%m.%Y'))
-
-    for edition in unique_editions:
-        edition_df = df_sorted[df_sorted['miesiac_rok_str'] == edition]
-        
-        # Sprawdzamy wyniki w tej edycji
-        for idx, row in edition_df.iterrows():
-            user = row['uczestnik']
-            score = row['rezultat_numeric']
-            
-            if pd.isna(score):
-                continue
-                
-            badges = []
-            
-            # 1. Sprawdzenie Rekordu Życiowego (PB)
-            current_pb = user_pbs.get(user, 0)
-            if score > current_pb:
-                user_pbs[user] = score
-                # Jeśli to nie jest pierwszy wynik (0), to jest to nowe PB
-                # (opcjonalnie można uznać pierwszy wynik za PB, tu uznajemy pobicie)
-                if current_pb > 0:
-                    badges.append("PB")
-            
-            # 2. Sprawdzenie Rekordu Rozgrywek (WR)
-            if score > overall_record:
-                overall_record = score
-                badges.append("WR")
-            
-            # Zapisujemy odznaki dla tego wpisu
-            if badges:
-                badges_map[(user, edition)] = badges
-
-    return badges_map, overall_record
+    records = get_records_history(df)
+    return records.badges, records.overall_record
 
 def render_edition_table(edition_df, badges_map, edition_str, lang):
     """Wyświetla tabelę wyników dla konkretnej edycji."""
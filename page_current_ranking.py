@@ -2,14 +2,17 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
-import time
 import numpy as np
 from datetime import datetime, timedelta
 from streamlit_extras.mention import mention
 from translations import _t
 from config import EDITIONS_CONFIG, MONTH_NAMES
 from google_connect import connect_to_google_sheets
-from data_loader import load_google_sheet_data, load_historical_data_from_json, process_raw_data
+from data_loader import load_google_sheet_data, load_historical_data_from_json
+from edition_matrix import STATUS_PASSED, STATUS_FAILED, STATUS_MISSING
+from derived_cache import get_derived_edition
+from historical_index import fmt_stat, get_historical_index
+from chart_cache import show_animation, show_chart
 
 # === Funkcje Pomocnicze ===
 
@@ -30,158 +33,86 @@ def fmt_user(username, lang):
         return f"@{username}"
     return f"**{username}**"
 
-def calculate_ranking(data, max_day_reported, lang, participants_list, ranking_type='live', complete_stages=None):
-    """Oblicza ranking na podstawie zasad gry."""
-    ranking_data = []
-    elimination_map = {} 
-
-    for participant in participants_list:
-        days_data = data.get(participant, {})
-        failed_stages = []
-        completed_stages = []
-        consecutive_fails = 0
-        eliminated_on_day = None
-        
-        for day in range(1, max_day_reported + 1):
-            if eliminated_on_day: 
-                break
-            
-            if day in days_data:
-                status = days_data[day]["status"]
-                
-                if status == "Zaliczone":
-                    completed_stages.append(day)
-                    consecutive_fails = 0 
-                else: 
-                    failed_stages.append(day)
-                    consecutive_fails += 1
-            else:
-                failed_stages.append(day)
-                consecutive_fails += 1
-            
-            if consecutive_fails >= 3:
-                eliminated_on_day = day
-                break 
+# Stałe nazwy kolumn rankingu -> klucze tłumaczeń nagłówków (tłumaczone dopiero przy wyświetlaniu)
+RANKING_COLUMN_LABELS = {
+    'rank': 'ranking_col_rank',
+    'participant': 'ranking_col_participant',
+    'highest_pass': 'ranking_col_highest_pass',
+    'failed_days': {'live': 'ranking_col_failed_list_live', 'official': 'ranking_col_failed_list_official'},
+    'missing_days': 'ranking_col_missing_data',
+}
 
-        highest_completed = max(completed_stages) if completed_stages else 0
-        
-        # --- LOGIKA: NIEZALICZONE vs BRAK DANYCH ---
-        last_official_day = complete_stages[-1] if complete_stages else 0
-        
-        confirmed_failed_stages = []
-        all_missing_data_days = []
-        
-        max_day_for_this_user = max((int(k) for k in days_data.keys()), default=0)
-        check_until_day = max(last_official_day, max_day_for_this_user)
+def compute_ranking(matrix, max_day_reported, ranking_type='live', complete_stages=None):
+    """
+    Oblicza ranking na podstawie zasad gry - niezależnie od języka.
+    Stan gry (zaliczenia, porażki, eliminacje) pochodzi z silnika rankingu macierzy -
+    wszystkie rankingi tej samej edycji liczą się w jednym przejściu.
 
-        for day in range(1, check_until_day + 1):
-            if day in days_data:
-                if days_data[day]["status"] == "Niezaliczone":
-                    confirmed_failed_stages.append(day)
-            else:
-                if day <= last_official_day:
-                    all_missing_data_days.append(day)
-        
-        if eliminated_on_day and eliminated_on_day > last_official_day:
-            for day in range(last_official_day + 1, eliminated_on_day + 1):
-                if day not in days_data:
-                    all_missing_data_days.append(day)
-        
-        confirmed_failed_stages.sort()
-        all_missing_data_days.sort()
-        
-        confirmed_failed_str = ", ".join(map(str, confirmed_failed_stages[:10])) + ("..." if len(confirmed_failed_stages) > 10 else "")
-        missing_data_str = ", ".join(map(str, all_missing_data_days)) if all_missing_data_days else ""
-        
-        def get_failure_tuple(p_failures, p_highest):
-            start_day = max(p_highest, max_day_reported) if not eliminated_on_day else p_highest
-            if eliminated_on_day:
-                start_day = eliminated_on_day
-            return tuple(1 if d in p_failures else 0 for d in range(start_day, 0, -1))
+    Zwraca (DataFrame, mapa eliminacji). Kolumny mają stałe nazwy:
+    rank, participant, highest_pass, failed_days oraz missing_days (tylko live);
+    nagłówki w języku użytkownika nadaje localize_ranking.
+    """
+    snapshot = matrix.engine.snapshot(max_day_reported)
+    elimination_map = snapshot.elimination_map()
+
+    # --- LOGIKA: NIEZALICZONE vs BRAK DANYCH ---
+    last_official_day = complete_stages[-1] if complete_stages else 0
+
+    failed_days = []
+    missing_days = []
+    for i in range(len(snapshot.participants)):
+        eliminated_on_day = snapshot.eliminated_on(i)
 
         if ranking_type == 'live':
-            failed_col_key = 'ranking_col_failed_list_live'
-            if not eliminated_on_day and consecutive_fails == 2:
+            check_until_day = max(last_official_day, int(matrix.max_reported_day[i]))
+            missing_until_day = max(last_official_day, eliminated_on_day or 0)
+            codes = matrix.window(max(check_until_day, missing_until_day))[:, i]
+
+            confirmed_failed_stages = (np.flatnonzero(codes[:check_until_day] == STATUS_FAILED) + 1).tolist()
+            all_missing_data_days = (np.flatnonzero(codes[:missing_until_day] == STATUS_MISSING) + 1).tolist()
+
+            confirmed_failed_str = ", ".join(map(str, confirmed_failed_stages[:10])) + ("..." if len(confirmed_failed_stages) > 10 else "")
+            if not eliminated_on_day and snapshot.consecutive_fails[i] == 2:
                 confirmed_failed_str += "❗"
+            missing_days.append(", ".join(map(str, all_missing_data_days)))
         else: # 'official'
-            failed_col_key = 'ranking_col_failed_list_official'
-            confirmed_failed_str = ", ".join(map(str, sorted(failed_stages)))
-
-        ranking_data.append({
-            _t('ranking_col_participant', lang): participant,
-            _t('ranking_col_highest_pass', lang): highest_completed,
-            "sort_key_failure_tuple": get_failure_tuple(failed_stages, highest_completed),
-            _t(failed_col_key, lang): confirmed_failed_str,
-            "missing_data_days": missing_data_str,
-            "eliminated_on_day": eliminated_on_day 
-        })
-        elimination_map[participant] = eliminated_on_day  
-
-    def sort_key(entry):
-        return (
-            -entry[_t('ranking_col_highest_pass', lang)], 
-            entry["sort_key_failure_tuple"]               
-        )
-
-    ranking_data.sort(key=sort_key)
-    
-    rank_col_name = _t('ranking_col_rank', lang)
-    last_sort_key = None
-    for i, entry in enumerate(ranking_data):
-        current_sort_key = (
-            entry[_t('ranking_col_highest_pass', lang)], 
-            entry["sort_key_failure_tuple"]
-        )
-        
-        if i > 0 and current_sort_key == last_sort_key:
-            entry[rank_col_name] = ranking_data[i-1][rank_col_name] 
-        else:
-            entry[rank_col_name] = i + 1 
-        
-        last_sort_key = current_sort_key
-    
-    df_ranking = pd.DataFrame(ranking_data)
-    
-    if not df_ranking.empty:
-        df_ranking[rank_col_name] = df_ranking[rank_col_name].astype(int)
-    
-    if ranking_type == 'live':
-        failed_col_name = _t('ranking_col_failed_list_live', lang)
-    else:
-        failed_col_name = _t('ranking_col_failed_list_official', lang)
-    
-    cols_to_return = [
-        rank_col_name, 
-        _t('ranking_col_participant', lang), 
-        _t('ranking_col_highest_pass', lang)
-    ]
-    if failed_col_name in df_ranking.columns:
-        cols_to_return.append(failed_col_name)
-    
+            confirmed_failed_str = ", ".join(map(str, snapshot.failed_days(i)))
+        failed_days.append(confirmed_failed_str)
+
+    order = snapshot.ordered()
+    rows = [i for i, _ in order]
+    df_ranking = pd.DataFrame({
+        'rank': pd.Series([rank for _, rank in order], dtype=int),
+        'participant': [snapshot.participants[i] for i in rows],
+        'highest_pass': pd.Series(snapshot.highest_pass[rows], dtype=int),
+        'failed_days': [failed_days[i] for i in rows],
+    })
     if ranking_type == 'live':
-        missing_col_name = _t('ranking_col_missing_data', lang)
-        df_ranking = df_ranking.rename(columns={"missing_data_days": missing_col_name})
-        cols_to_return.append(missing_col_name)
-    
-    return df_ranking[cols_to_return], elimination_map
-
-def calculate_current_stats(data, max_day, lang, participants_list):
+        df_ranking['missing_days'] = [missing_days[i] for i in rows]
+
+    return df_ranking, elimination_map
+
+def localize_ranking(ranking_df, lang, ranking_type='live'):
+    """Kopia rankingu z nagłówkami kolumn w danym języku (do wyświetlenia)."""
+    labels = {}
+    for col in ranking_df.columns:
+        key = RANKING_COLUMN_LABELS.get(col, col)
+        if isinstance(key, dict):
+            key = key[ranking_type]
+        labels[col] = _t(key, lang)
+    return ranking_df.rename(columns=labels)
+
+def calculate_ranking(matrix, max_day_reported, lang, ranking_type='live', complete_stages=None):
+    """Ranking z nagłówkami w danym języku (compute_ranking + localize_ranking)."""
+    ranking_df, elimination_map = compute_ranking(matrix, max_day_reported, ranking_type, complete_stages)
+    return localize_ranking(ranking_df, lang, ranking_type), elimination_map
+
+def calculate_current_stats(matrix, max_day, lang):
     """Oblicza najdłuższe serie zaliczeń."""
-    streaks = []
-    for participant in participants_list:
-        days_data = data.get(participant, {})
-        current_streak = 0
-        max_streak = 0
-        
-        for day in range(1, max_day + 1):
-            if day in days_data and days_data[day]["status"] == "Zaliczone":
-                current_streak += 1
-            else:
-                max_streak = max(max_streak, current_streak)
-                current_streak = 0
-        max_streak = max(max_streak, current_streak) 
-        
-        streaks.append({"Uczestnik": participant, "Seria": max_streak})
+    streaks = [
+        {"Uczestnik": participant, "Seria": int(streak)}
+        for participant, streak in zip(matrix.participants, matrix.longest_pass_streaks(max_day))
+    ]
 
     df_streaks = pd.DataFrame(streaks).sort_values(by="Seria", ascending=False)
     
@@ -193,21 +124,16 @@ def calculate_current_stats(data, max_day, lang, participants_list):
     
     return df_streaks[df_streaks["Seria"].isin(top_3_values) & (df_streaks["Seria"] > 0)] 
 
-def calculate_rabbit_stats(data, max_day, elimination_map, lang, participants_list):
+def calculate_rabbit_stats(matrix, max_day, elimination_map, lang):
     """Oblicza 'Zajęce' - aktywni uczestnicy z największą liczbą potknięć."""
-    stumbles = []
-    for participant in participants_list:
-        is_active = elimination_map.get(participant) is None or elimination_map.get(participant) > max_day
-        
-        if is_active:
-            days_data = data.get(participant, {})
-            fails_count = 0
-            for day in range(1, max_day + 1):
-                if day not in days_data or days_data[day]["status"] != "Zaliczone":
-                    fails_count += 1
-            
-            if fails_count > 0:
-                stumbles.append({"Uczestnik": participant, "Potknięcia": fails_count})
+    fails_counts = matrix.fail_counts(max_day)
+    is_active = matrix.active_mask([max_day + 1], elimination_map)[0]
+
+    stumbles = [
+        {"Uczestnik": participant, "Potknięcia": int(fails_count)}
+        for participant, active, fails_count in zip(matrix.participants, is_active, fails_counts)
+        if active and fails_count > 0
+    ]
     
     if not stumbles:
         return pd.DataFrame(columns=["Uczestnik", "Potknięcia"])
@@ -217,99 +143,35 @@ def calculate_rabbit_stats(data, max_day, elimination_map, lang, participants_li
     top_values = sorted(df_stumbles["Potknięcia"].unique(), reverse=True)[:3]
     return df_stumbles[df_stumbles["Potknięcia"].isin(top_values)]
 
-def find_last_complete_stage(data, elimination_map, max_day, participants_list):
+def find_last_complete_stage(matrix, elimination_map, max_day):
     """Znajduje ostatni dzień z kompletnymi danymi."""
-    participant_max_days = {
-        p: max((int(k) for k in data.get(p, {}).keys()), default=0)
-        for p in participants_list
-    }
-
-    complete_stages = []
-    for day in range(1, max_day + 1): 
-        is_complete_for_all = True
-        active_participants_on_this_day = []
-
-        for p in participants_list:
-            elim_day = elimination_map.get(p)
-            if elim_day is None or elim_day >= day: 
-                active_participants_on_this_day.append(p)
-        
-        if not active_participants_on_this_day and max_day > 0:
-            continue 
+    return matrix.complete_days(elimination_map, max_day)
 
-        for p in active_participants_on_this_day:
-            max_day_for_participant = participant_max_days.get(p, 0)
-            
-            if max_day_for_participant < day:
-                is_complete_for_all = False
-                break 
-        
-        if is_complete_for_all:
-            complete_stages.append(day) 
-            
-    return complete_stages 
-
-def get_race_data_for_day(data, day_to_show, lang, participants_list):
+def get_race_data_for_day(matrix, day_to_show, lang):
     """Oblicza dane do wyścigu."""
-    scores = {p: 0 for p in participants_list} 
-    for day in range(1, day_to_show + 1):
-        for p in participants_list:
-            if p in data and day in data.get(p, {}) and data[p][day]["status"] == "Zaliczone":
-                scores[p] = day 
-    
-    return pd.DataFrame.from_dict(
-        scores, orient='index', columns=[_t('current_stats_race_total', lang)]
-    ).reindex(participants_list)
+    return pd.DataFrame(
+        {_t('current_stats_race_total', lang): matrix.race_scores(day_to_show)},
+        index=matrix.participants
+    )
 
 def show_historical_context(df_historical, lang, participants_list):
     """Wyświetla tabelę kontekstu historycznego."""
-    hist_data = df_historical[df_historical['uczestnik'].isin(participants_list)].copy()
+    index = get_historical_index(df_historical)
     
-    if hist_data.empty:
+    if not index.has_any(participants_list):
         st.info(_t('current_ranking_historical_no_data', lang))
         return
 
-    stats = hist_data.groupby('uczestnik').agg(
-        pb_result=pd.NamedAgg(column='rezultat_numeric', aggfunc='max'),
-        avg_result=pd.NamedAgg(column='rezultat_numeric', aggfunc='mean'),
-        best_position=pd.NamedAgg(column='miejsce', aggfunc='min'),
-        medals_top3=pd.NamedAgg(column='miejsce', aggfunc=lambda x: (x <= 3).sum())
-    )
-
-    real_editions_count = hist_data.dropna(subset=['rezultat_numeric']).groupby('uczestnik')['edycja_nr'].nunique()
-    stats['editions_count'] = real_editions_count
-    
-    last_3_editions_nr = sorted(df_historical['edycja_nr'].unique())[-3:]
-    hist_last_3 = hist_data[hist_data['edycja_nr'].isin(last_3_editions_nr)]
-    
-    if not hist_last_3.empty:
-        avg_last_3 = hist_last_3.groupby('uczestnik')['rezultat_numeric'].mean().reset_index(name='avg_last_3')
-        stats = stats.reset_index().merge(avg_last_3, on='uczestnik', how='left').set_index('uczestnik')
-    else:
-        stats['avg_last_3'] = np.nan
-
-    stats = stats.reindex(participants_list)
-    
-    participant_col_name = _t('ranking_col_participant', lang)
+    stats = index.context_stats(participants_list)
     
-    stats = stats.reset_index()
-    if 'uczestnik' in stats.columns:
-        stats = stats.rename(columns={'uczestnik': 'uczestnik_raw'})
-    elif 'index' in stats.columns:
-        stats = stats.rename(columns={'index': 'uczestnik_raw'})
-
     stats_display = pd.DataFrame()
-    if 'uczestnik_raw' in stats.columns:
-        stats_display[participant_col_name] = stats['uczestnik_raw']
-    else:
-        stats_display[participant_col_name] = stats.iloc[:, 0] if not stats.empty else []
-    
-    stats_display[_t('hist_context_pb', lang)] = stats['pb_result'].apply(lambda x: f"{x:.0f}" if pd.notna(x) else "—")
-    stats_display[_t('hist_context_avg', lang)] = stats['avg_result'].apply(lambda x: f"{x:.0f}" if pd.notna(x) else "—")
-    stats_display[_t('hist_context_avg_last_3', lang)] = stats['avg_last_3'].apply(lambda x: f"{x:.0f}" if pd.notna(x) else "—")
-    stats_display[_t('hist_context_best_pos', lang)] = stats['best_position'].apply(lambda x: f"{x:.0f}" if pd.notna(x) else "—")
-    stats_display[_t('hist_context_medals', lang)] = stats['medals_top3'].apply(lambda x: f"{x:.0f}" if pd.notna(x) and x > 0 else "—")
-    stats_display[_t('hist_context_editions', lang)] = stats['editions_count'].apply(lambda x: f"{x:.0f}" if pd.notna(x) and x > 0 else "—")
+    stats_display[_t('ranking_col_participant', lang)] = list(participants_list)
+    stats_display[_t('hist_context_pb', lang)] = [fmt_stat(x, "{:.0f}") for x in stats['pb_result']]
+    stats_display[_t('hist_context_avg', lang)] = [fmt_stat(x, "{:.0f}") for x in stats['avg_result']]
+    stats_display[_t('hist_context_avg_last_3', lang)] = [fmt_stat(x, "{:.0f}") for x in stats['avg_result_last_3']]
+    stats_display[_t('hist_context_best_pos', lang)] = [fmt_stat(x, "{:.0f}") for x in stats['best_position']]
+    stats_display[_t('hist_context_medals', lang)] = [fmt_stat(x, "{:.0f}") if x else "—" for x in stats['medals']]
+    stats_display[_t('hist_context_editions', lang)] = [fmt_stat(x, "{:.0f}") if x else "—" for x in stats['editions_count']]
 
     st.dataframe(
         stats_display.sort_values(by=_t('hist_context_avg', lang), ascending=False), 
@@ -323,26 +185,14 @@ def show_selected_participant_details(participant, rank, df_historical, current_
     wins, medals, prev_rank_str = 0, 0, _t('summary_no_hist_data', lang)
     avg_res_all, avg_res_l3, avg_pos_all = "—", "—", "—"
 
-    if not df_historical.empty and participant in df_historical['uczestnik'].values:
-        p_hist = df_historical[df_historical['uczestnik'] == participant]
-        wins = (p_hist['miejsce'] == 1).sum()
-        medals = (p_hist['miejsce'] <= 3).sum()
-        
-        last_edition_nr = p_hist['edycja_nr'].max()
-        last_rank = p_hist[p_hist['edycja_nr'] == last_edition_nr]['miejsce'].min()
-        if pd.notna(last_rank):
-            prev_rank_str = str(int(last_rank))
-            
-        if not p_hist['rezultat_numeric'].isnull().all():
-            avg_res_all = f"{p_hist['rezultat_numeric'].mean():.1f}"
-            
-        last_3_ed = sorted(df_historical['edycja_nr'].unique())[-3:]
-        p_hist_l3 = p_hist[p_hist['edycja_nr'].isin(last_3_ed)]
-        if not p_hist_l3['rezultat_numeric'].isnull().all():
-            avg_res_l3 = f"{p_hist_l3['rezultat_numeric'].mean():.1f}"
-            
-        if not p_hist['miejsce'].isnull().all():
-            avg_pos_all = f"{p_hist['miejsce'].mean():.1f}"
+    p = get_historical_index(df_historical).participant(participant) if not df_historical.empty else None
+    if p is not None:
+        wins, medals = p.wins, p.medals
+        if pd.notna(p.last_edition_rank):
+            prev_rank_str = str(int(p.last_edition_rank))
+        avg_res_all = fmt_stat(p.avg_result)
+        avg_res_l3 = fmt_stat(p.avg_result_last_3)
+        avg_pos_all = fmt_stat(p.avg_position)
 
     last_5_results_icons = []
     participant_days = current_data.get(participant, {})
@@ -384,7 +234,34 @@ def show_selected_participant_details(participant, rank, df_historical, current_
             st.write("")
             st.link_button(f"Hive\n@{participant}", f"https://hive.blog/@{participant}", use_container_width=True)
 
-def show_daily_rank_progression(current_data, complete_stages, lang, participants_list):
+def _draw_rank_progression(df_progress, max_day_to_show, title, xlabel, ylabel):
+    fig, ax = plt.subplots(figsize=(12, 8))
+    ax.set_facecolor('#0e1117')
+    fig.patch.set_facecolor('#0e1117')
+    
+    colors = plt.cm.tab20(np.linspace(0, 1, len(df_progress.columns)))
+    
+    for i, participant in enumerate(df_progress.columns):
+        ax.plot(df_progress.index, df_progress[participant], marker='o', markersize=4, label=participant, color=colors[i], linewidth=1.5)
+        last_val = df_progress[participant].iloc[-1]
+        if pd.notna(last_val):
+            ax.text(max_day_to_show + 0.2, last_val, f" {participant}", verticalalignment='center', fontsize=9, color=colors[i], fontweight='bold')
+
+    ax.invert_yaxis()
+    ax.set_title(clean_title_for_chart(title), color='white')
+    ax.set_xlabel(xlabel, color='white')
+    ax.set_ylabel(ylabel, color='white')
+    ax.grid(True, which='both', linestyle='--', linewidth=0.3, alpha=0.5)
+    ax.set_xticks(df_progress.index)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    for spine in ax.spines.values():
+        spine.set_color('#444444')
+    return fig
+
+def show_daily_rank_progression(matrix, complete_stages, lang):
     """Generuje wykres liniowy pokazujący zmiany miejsca w rankingu dzień po dniu."""
     labels = {
         'pl': {'loading': "Generowanie wykresu historycznego...", 'title': "Przebieg rywalizacji (Zmiana miejsc)", 'day': "Dzień", 'rank': "Miejsce"},
@@ -398,12 +275,7 @@ def show_daily_rank_progression(current_data, complete_stages, lang, participant
         return
 
     with st.spinner(txt['loading']):
-        progress_data = {}
-        for day in range(1, max_day_to_show + 1):
-            df_daily, _ = calculate_ranking(current_data, day, lang, participants_list, ranking_type='live')
-            part_col = _t('ranking_col_participant', lang)
-            rank_col = _t('ranking_col_rank', lang)
-            progress_data[day] = df_daily.set_index(part_col)[rank_col].to_dict()
+        progress_data = matrix.engine.rank_history(max_day_to_show)
             
         df_progress = pd.DataFrame.from_dict(progress_data, orient='index')
         
@@ -411,35 +283,31 @@ def show_daily_rank_progression(current_data, complete_stages, lang, participant
             st.info("Brak danych do wyświetlenia wykresu.")
             return
 
-        fig, ax = plt.subplots(figsize=(12, 8))
-        plt.style.use('dark_background')
-        ax.set_facecolor('#0e1117')
-        fig.patch.set_facecolor('#0e1117')
-        
-        colors = plt.cm.tab20(np.linspace(0, 1, len(df_progress.columns)))
-        
-        for i, participant in enumerate(df_progress.columns):
-            ax.plot(df_progress.index, df_progress[participant], marker='o', markersize=4, label=participant, color=colors[i], linewidth=1.5)
-            last_val = df_progress[participant].iloc[-1]
-            if pd.notna(last_val):
-                ax.text(max_day_to_show + 0.2, last_val, f" {participant}", verticalalignment='center', fontsize=9, color=colors[i], fontweight='bold')
-
-        ax.invert_yaxis()
-        ax.set_title(clean_title_for_chart(txt['title']), color='white')
-        ax.set_xlabel(txt['day'], color='white')
-        ax.set_ylabel(txt['rank'], color='white')
-        ax.grid(True, which='both', linestyle='--', linewidth=0.3, alpha=0.5)
-        ax.set_xticks(df_progress.index)
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-        for spine in ax.spines.values():
-            spine.set_color('#444444')
+        show_chart(_draw_rank_progression, df_progress, max_day_to_show, txt['title'], txt['day'], txt['rank'])
 
-        st.pyplot(fig)
+def _draw_stage_difficulty(days, rates, title, ylabel):
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.set_facecolor('#0e1117')
+    fig.patch.set_facecolor('#0e1117')
+    
+    ax.plot(days, rates, marker='o', color='#ff4b4b', linewidth=2)
+    ax.fill_between(days, rates, color='#ff4b4b', alpha=0.2)
+    
+    ax.set_title(clean_title_for_chart(title), color='white')
+    ax.set_ylabel(ylabel, color='white')
+    ax.set_xlabel("Dzień / Stage", color='white')
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.set_ylim(0, 105)
+    ax.set_xticks(days)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    
+    for spine in ax.spines.values():
+        spine.set_color('#444444')
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    return fig
 
-def show_stage_analysis(current_data, max_day_reported, elimination_map, complete_stages, lang, participants_list):
+def show_stage_analysis(matrix, max_day_reported, elimination_map, complete_stages, lang):
     """Wyświetla statystyki trudności etapów."""
     
     if 'stage_analysis_expanded' not in st.session_state:
@@ -475,30 +343,15 @@ def show_stage_analysis(current_data, max_day_reported, elimination_map, complet
         st.session_state.stage_analysis_expanded = True
 
     with st.expander(txt['expander'], expanded=st.session_state.stage_analysis_expanded):
-        stage_fail_rates = {}
+        rates_array = matrix.stage_fail_rates(complete_stages, elimination_map)
+        stage_fail_rates = {day: float(rate) for day, rate in zip(complete_stages, rates_array)}
         max_fail_rate = -1
         hardest_stage_num = -1
         
-        for day in complete_stages:
-            fails = 0
-            total_active = 0
-            
-            for p in participants_list:
-                elim_day = elimination_map.get(p)
-                if elim_day is not None and elim_day < day:
-                    continue 
-                
-                total_active += 1
-                p_data = current_data.get(p, {})
-                if day not in p_data or p_data[day]['status'] != "Zaliczone":
-                    fails += 1
-            
-            rate = (fails / total_active * 100) if total_active > 0 else 0
-            stage_fail_rates[day] = rate
-            
-            if rate > max_fail_rate:
-                max_fail_rate = rate
-                hardest_stage_num = day
+        if stage_fail_rates:
+            hardest_idx = int(np.argmax(rates_array))
+            hardest_stage_num = complete_stages[hardest_idx]
+            max_fail_rate = stage_fail_rates[hardest_stage_num]
         
         if hardest_stage_num != -1:
             st.markdown(_t('stage_analysis_hardest', lang, hardest_stage_num, max_fail_rate))
@@ -507,28 +360,7 @@ def show_stage_analysis(current_data, max_day_reported, elimination_map, complet
             days = list(stage_fail_rates.keys())
             rates = list(stage_fail_rates.values())
             
-            fig, ax = plt.subplots(figsize=(10, 4))
-            plt.style.use('dark_background')
-            ax.set_facecolor('#0e1117')
-            fig.patch.set_facecolor('#0e1117')
-            
-            ax.plot(days, rates, marker='o', color='#ff4b4b', linewidth=2)
-            ax.fill_between(days, rates, color='#ff4b4b', alpha=0.2)
-            
-            ax.set_title(clean_title_for_chart(_t('stage_analysis_title', lang)), color='white')
-            ax.set_ylabel(_t('stage_analysis_y_axis', lang), color='white')
-            ax.set_xlabel("Dzień / Stage", color='white')
-            ax.grid(True, linestyle='--', alpha=0.3)
-            ax.set_ylim(0, 105)
-            ax.set_xticks(days)
-            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-            
-            for spine in ax.spines.values():
-                spine.set_color('#444444')
-            ax.tick_params(axis='x', colors='white')
-            ax.tick_params(axis='y', colors='white')
-            
-            st.pyplot(fig)
+            show_chart(_draw_stage_difficulty, days, rates, _t('stage_analysis_title', lang), _t('stage_analysis_y_axis', lang))
             
         st.divider()
         st.markdown(f"**{txt['tool_header']}**")
@@ -542,19 +374,10 @@ def show_stage_analysis(current_data, max_day_reported, elimination_map, complet
             check_clicked = st.button(txt['check_btn'], on_click=toggle_stage_analysis)
 
         if selected_day_check:
-            passed_list = []
-            failed_list = []
-            
-            for p in participants_list:
-                elim_day = elimination_map.get(p)
-                if elim_day is not None and elim_day < selected_day_check:
-                    continue
-                
-                p_data = current_data.get(p, {})
-                if selected_day_check in p_data and p_data[selected_day_check]['status'] == "Zaliczone":
-                    passed_list.append(f"@{p}")
-                else:
-                    failed_list.append(f"@{p}")
+            active = matrix.active_mask([selected_day_check], elimination_map)[0]
+            passed = matrix.day_codes(selected_day_check) == STATUS_PASSED
+            passed_list = [f"@{p}" for p, a, ok in zip(matrix.participants, active, passed) if a and ok]
+            failed_list = [f"@{p}" for p, a, ok in zip(matrix.participants, active, passed) if a and not ok]
             
             c_pass, c_fail = st.columns(2)
             with c_pass:
@@ -571,22 +394,42 @@ def show_stage_analysis(current_data, max_day_reported, elimination_map, complet
                 else:
                     st.write(f"_{txt['everyone_passed']}_")
 
-def show_survival_comparison(current_data, max_day_reported, df_historical, lang, elimination_map, complete_stages, participants_list):
+def _draw_survival_comparison(hist_data, current_days_axis, current_percentages, global_max_x, title, ylabel, current_label):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.set_facecolor('#0e1117')
+    fig.patch.set_facecolor('#0e1117')
+    
+    for ed_name, pct_list in hist_data.items():
+        x_hist = range(1, len(pct_list) + 1)
+        ax.plot(x_hist, pct_list, linestyle='--', alpha=0.6, label=ed_name)
+        
+    ax.plot(current_days_axis, current_percentages, color='#00ff00', linewidth=3, marker='o', label=current_label)
+    
+    ax.set_title(clean_title_for_chart(title), color='white')
+    ax.set_xlabel("Dzień / Stage", color='white')
+    ax.set_ylabel(ylabel, color='white')
+    ax.set_ylim(0, 105)
+    ax.set_xlim(1, global_max_x + 1)
+    
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.legend()
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    
+    for spine in ax.spines.values():
+        spine.set_color('#444444')
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    return fig
+
+def show_survival_comparison(matrix, max_day_reported, df_historical, lang, elimination_map, complete_stages):
     """Porównuje krzywą przetrwania obecnej edycji z 3 ostatnimi."""
     
     current_limit_day = complete_stages[-1] if complete_stages else 1
     current_days_axis = range(1, current_limit_day + 1)
     
-    total_participants = len(participants_list)
-    current_percentages = []
-    
-    for d in current_days_axis:
-        active_count = 0
-        for p in participants_list:
-            e_day = elimination_map.get(p)
-            if e_day is None or e_day >= d:
-                active_count += 1
-        current_percentages.append((active_count / total_participants) * 100)
+    total_participants = len(matrix.participants)
+    active_counts = matrix.active_mask(list(current_days_axis), elimination_map).sum(axis=1)
+    current_percentages = ((active_counts / total_participants) * 100).tolist()
 
     hist_data = {}
     max_hist_day = 0
@@ -619,37 +462,13 @@ def show_survival_comparison(current_data, max_day_reported, df_historical, lang
             hist_data[ed] = percentages
 
     with st.expander(_t('survival_chart_header', lang)):
-        fig, ax = plt.subplots(figsize=(10, 6))
-        plt.style.use('dark_background')
-        ax.set_facecolor('#0e1117')
-        fig.patch.set_facecolor('#0e1117')
-        
-        for ed_name, pct_list in hist_data.items():
-            x_hist = range(1, len(pct_list) + 1)
-            ax.plot(x_hist, pct_list, linestyle='--', alpha=0.6, label=ed_name)
-            
-        ax.plot(current_days_axis, current_percentages, color='#00ff00', linewidth=3, marker='o', label=_t('survival_current_legend', lang))
-        
-        ax.set_title(clean_title_for_chart(_t('survival_chart_title', lang)), color='white')
-        ax.set_xlabel("Dzień / Stage", color='white')
-        ax.set_ylabel(_t('survival_y_axis', lang), color='white')
-        ax.set_ylim(0, 105)
-        
         global_max_x = max(max_hist_day, current_limit_day)
-        ax.set_xlim(1, global_max_x + 1)
-        
-        ax.grid(True, linestyle='--', alpha=0.3)
-        ax.legend()
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        
-        for spine in ax.spines.values():
-            spine.set_color('#444444')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-
-        st.pyplot(fig)
+        show_chart(
+            _draw_survival_comparison, hist_data, current_days_axis, current_percentages, global_max_x,
+            _t('survival_chart_title', lang), _t('survival_y_axis', lang), _t('survival_current_legend', lang)
+        )
 
-def generate_milestone_summary(milestone_day, current_data, df_historical, df_logs, lang, participants_list, elimination_map):
+def generate_milestone_summary(milestone_day, matrix, df_historical, df_logs, lang, elimination_map):
     """
     Generuje raporty bez użycia zewnętrznego pliku tłumaczeń (unika MISSING_KEY).
     """
@@ -694,11 +513,11 @@ def generate_milestone_summary(milestone_day, current_data, df_historical, df_lo
     # DZIEŃ 25 - TAKTYCY
     elif milestone_day == 25:
         md += "Czas na taktykę! Na tym etapie liczy się nie tylko siła, ale i umiejętne zarządzanie potknięciami.\n\n" if lang == 'pl' else "Tactics time! At this stage, it's not just strength, but smart management of stumbles.\n\n"
-        tacticians = []
-        for p in participants_list:
-            if elimination_map.get(p) is None or elimination_map.get(p) > 25:
-                fails = sum(1 for d in range(1, 26) if current_data.get(p, {}).get(d, {}).get('status') != "Zaliczone")
-                if fails > 0: tacticians.append((p, fails))
+        is_active = matrix.active_mask([26], elimination_map)[0]
+        tacticians = [
+            (p, int(fails)) for p, active, fails in zip(matrix.participants, is_active, matrix.fail_counts(25))
+            if active and fails > 0
+        ]
         tacticians.sort(key=lambda x: x[1], reverse=True)
         txt = "Aktywni z największą liczbą 'luk' w zaliczeniach: " if lang == 'pl' else "Active with most 'gaps': "
         if tacticians:
@@ -706,13 +525,29 @@ def generate_milestone_summary(milestone_day, current_data, df_historical, df_lo
 
     # DZIEŃ 30 - SERIE
     elif milestone_day == 30:
-        df_streaks = calculate_current_stats(current_data, 30, lang, participants_list)
+        df_streaks = calculate_current_stats(matrix, 30, lang)
         txt = "Liderzy serii zaliczeń: " if lang == 'pl' else "Streak leaders: "
         if not df_streaks.empty:
             md += txt + ", ".join([f"{fmt_user(row['Uczestnik'], lang)} ({row['Seria']})" for _, row in df_streaks.head(3).iterrows()])
 
     return md
 
+def _draw_race_chart(totals, title, names, bar_colors, participants_count, max_axis_day):
+    fig, ax = plt.subplots(figsize=(10, max(6, participants_count*0.3)))
+    ax.set_facecolor('#0e1117')
+    fig.patch.set_facecolor('#0e1117')
+    bars = ax.barh(names, totals, color=bar_colors)
+    ax.set_xlim(0, max_axis_day) 
+    ax.set_title(clean_title_for_chart(title), color='white')
+    ax.tick_params(axis='x', colors='white')
+    ax.tick_params(axis='y', colors='white')
+    for spine in ax.spines.values(): spine.set_color('#444444')
+    for bar in bars:
+        width = bar.get_width()
+        ax.text(width + 0.5, bar.get_y() + bar.get_height()/2, f'{int(width)}', ha='left', va='center', color='white', fontsize=8)
+    fig.tight_layout()
+    return fig
+
 def show_current_edition_dashboard(lang, edition_key="december"):
     cfg = EDITIONS_CONFIG.get(edition_key)
     if not cfg:
@@ -742,27 +577,27 @@ def show_current_edition_dashboard(lang, edition_key="december"):
         return
 
     expected_data_cols = ['Participant', 'Day', 'Status', 'Timestamp', 'Notes']
-    current_data, max_day_reported, success_data = process_raw_data(df_raw_data, lang, expected_data_cols, sheet_name)
+    # Przetworzone dane, etapy i rankingi z pamięci podręcznej - rerun bez zmian w arkuszu ich nie przelicza
+    edition = get_derived_edition(sheet_name, df_raw_data, participants_list, lang, expected_data_cols)
+    current_data, max_day_reported = edition.current_data, edition.max_day_reported
     
-    if not success_data or max_day_reported == 0:
+    if not edition.success or max_day_reported == 0:
         return
 
     # --- Ranking Live ---
     st.subheader(_t('current_ranking_header', lang))
     
+    # Macierz budowana raz na wersję danych - z niej korzystają ranking, statystyki i wykresy
+    matrix = edition.matrix
     elimination_map = {}
-    complete_stages = find_last_complete_stage(current_data, elimination_map, max_day_reported, participants_list)
+    complete_stages = edition.complete_stages(with_eliminations=False)
     
     try:
-        ranking_df, elimination_map = calculate_ranking(current_data, max_day_reported, lang, participants_list, ranking_type='live', complete_stages=complete_stages)
+        ranking_df, elimination_map = edition.ranking(max_day_reported, ranking_type='live', complete_stages=complete_stages)
 
         # --- OSTRZEŻENIE O NIERÓWNYCH DANYCH ---
-        participant_max_days = {
-            p: max((int(k) for k in current_data.get(p, {}).keys()), default=0)
-            for p in participants_list
-        }
-        days_values = list(participant_max_days.values())
-        if days_values and (max(days_values) - min(days_values)) >= 2:
+        days_values = matrix.max_reported_day
+        if len(days_values) and (days_values.max() - days_values.min()) >= 2:
             if lang == 'pl':
                 st.warning(
                     "⚠️ **Klasyfikacja nieoficjalna — dane niekompletne.** "
@@ -778,7 +613,7 @@ def show_current_edition_dashboard(lang, edition_key="december"):
                     "Only the **Official Ranking** below is reliable, as it only counts days with complete data for everyone."
                 )
 
-        ranking_df_display = ranking_df.copy()
+        ranking_df_display = localize_ranking(ranking_df, lang, 'live')
         ranking_df_display.columns = ranking_df_display.columns.astype(str)
 
         selection = st.dataframe(
@@ -790,11 +625,9 @@ def show_current_edition_dashboard(lang, edition_key="december"):
         )
         
         if selection.selection.rows:
-            selected_index = selection.selection.rows[0]
-            participant_col = _t('ranking_col_participant', lang)
-            rank_col = _t('ranking_col_rank', lang)
-            selected_participant = ranking_df_display.iloc[selected_index][participant_col]
-            selected_rank = ranking_df_display.iloc[selected_index][rank_col]
+            selected_row = ranking_df.iloc[selection.selection.rows[0]]
+            selected_participant = selected_row['participant']
+            selected_rank = selected_row['rank']
             
             show_selected_participant_details(selected_participant, selected_rank, df_historical, current_data, max_day_reported, lang)
         
@@ -806,7 +639,7 @@ def show_current_edition_dashboard(lang, edition_key="december"):
 
     # --- Ranking Oficjalny ---
     st.subheader(_t('current_official_ranking_header', lang))
-    complete_stages = find_last_complete_stage(current_data, elimination_map, max_day_reported, participants_list)
+    complete_stages = edition.complete_stages(with_eliminations=bool(elimination_map))
     
     if complete_stages:
         default_stage = complete_stages[-1]
@@ -817,7 +650,8 @@ def show_current_edition_dashboard(lang, edition_key="december"):
         
         st.info(_t('current_official_ranking_desc', lang, selected_stage))
         try:
-            official_ranking_df, _ = calculate_ranking(current_data, selected_stage, lang, participants_list, ranking_type='official')
+            official_ranking_df, _ = edition.ranking(selected_stage, ranking_type='official')
+            official_ranking_df = localize_ranking(official_ranking_df, lang, 'official')
             official_ranking_df.columns = official_ranking_df.columns.astype(str)
             st.dataframe(official_ranking_df, width="stretch", hide_index=True)
         except Exception as e:
@@ -848,7 +682,7 @@ def show_current_edition_dashboard(lang, edition_key="december"):
         st.subheader("📅 " + (_t('weekly_summary_header', lang) if 'weekly_summary_header' in _t.__globals__ else "Podsumowania Okresowe / Periodic Summaries"))
         for w in range(1, weeks_completed + 1):
             with st.expander(_t('weekly_summary_title', lang, w, w*7), expanded=False):
-                st.markdown(generate_weekly_summary_markdown(w, current_data, df_historical, df_raw_logs, lang, participants_list))
+                st.markdown(generate_weekly_summary_markdown(w, matrix, df_historical, df_raw_logs, lang))
 
     # 2. Kamienie Milowe (Milestones: 5, 10, 15, 20, 25, 30) - ODWRÓCONA CHRONOLOGIA
     all_milestones = [5, 10, 15, 20, 25, 30]
@@ -861,7 +695,7 @@ def show_current_edition_dashboard(lang, edition_key="december"):
         for i, m in enumerate(achieved_milestones):
             # Pierwszy (najnowszy) jest rozwinięty domyślnie
             with st.expander(f"Dzień/Day {m}", expanded=(i == 0)):
-                st.markdown(generate_milestone_summary(m, current_data, df_historical, df_raw_logs, lang, participants_list, elimination_map))
+                st.markdown(generate_milestone_summary(m, matrix, df_historical, df_raw_logs, lang, elimination_map))
                 
     st.markdown("---")
 
@@ -874,38 +708,15 @@ def show_current_edition_dashboard(lang, edition_key="december"):
     else:
         st.caption("✅ Passed &nbsp;|&nbsp; ❌ Failed &nbsp;|&nbsp; ⬜ No report (entered) &nbsp;|&nbsp; ❓ No data (inferred — stage skipped or not entered)")
     
-    pivot_data = []
     completeness_participant_col = _t('completeness_col_participant', lang) 
-    for participant in participants_list:
-        days_data = current_data.get(participant, {})
-        eliminated_on = elimination_map.get(participant)
-        for day in range(1, max_day_reported + 1):
-            if eliminated_on and day > eliminated_on:
-                status_icon = "" 
-            elif day in days_data:
-                status_key = days_data[day].get("status", "Brak raportu")
-                if status_key == "Zaliczone":
-                    status_icon = "✅"
-                elif status_key == "Niezaliczone":
-                    status_icon = "❌"
-                else:
-                    status_icon = "⬜"  # Jawny "Brak raportu" wpisany przez formularz
-            else:
-                status_icon = "❓"  # Brak wpisu — wydedukowany (etap pominięty)
-            pivot_data.append({
-                completeness_participant_col: participant, 
-                _t('completeness_col_day', lang): day,
-                "Status": status_icon
-            })
             
-    if pivot_data:
-        df_pivot = pd.DataFrame(pivot_data)
-        days_to_show = [day for day in range(1, max_day_reported + 1)]
-        completeness_pivot = df_pivot.pivot(
-            index=completeness_participant_col, 
-            columns=_t('completeness_col_day', lang),
-            values="Status"
-        ).reindex(columns=days_to_show, fill_value="").reindex(index=sorted(participants_list))
+    if participants_list:
+        # ✅ Zaliczone, ❌ Niezaliczone, ⬜ jawny "Brak raportu", ❓ brak wpisu (wydedukowany), "" po eliminacji
+        completeness_pivot = pd.DataFrame(
+            matrix.completeness_icons(elimination_map).T,
+            index=pd.Index(matrix.participants, name=completeness_participant_col),
+            columns=pd.Index(range(1, max_day_reported + 1), name=_t('completeness_col_day', lang))
+        ).reindex(index=sorted(participants_list))
         
         completeness_pivot_display = completeness_pivot.reset_index()
         completeness_pivot_display.columns = completeness_pivot_display.columns.astype(str)
@@ -917,7 +728,7 @@ def show_current_edition_dashboard(lang, edition_key="december"):
     col1, col2 = st.columns(2)
     with col1:
         st.markdown(f"**{_t('current_stats_streaks', lang)}**")
-        df_streaks = calculate_current_stats(current_data, max_day_reported, lang, participants_list)
+        df_streaks = calculate_current_stats(matrix, max_day_reported, lang)
         if not df_streaks.empty:
             for _, row in df_streaks.iterrows():
                 mention(label=f"**{row['Uczestnik']}** ({row['Seria']} {_t('current_stats_streaks_days', lang)})", icon="🔥", url=f"https://hive.blog/@{row['Uczestnik']}")
@@ -925,7 +736,7 @@ def show_current_edition_dashboard(lang, edition_key="december"):
             st.info("Brak znaczących serii.")
     with col2:
         st.markdown(f"**{_t('stats_rabbits_title', lang)}**")
-        df_rabbits = calculate_rabbit_stats(current_data, max_day_reported, elimination_map, lang, participants_list)
+        df_rabbits = calculate_rabbit_stats(matrix, max_day_reported, elimination_map, lang)
         if not df_rabbits.empty:
             for _, row in df_rabbits.iterrows():
                 mention(label=f"**{row['Uczestnik']}** ({row['Potknięcia']} wpadek)", icon="🐰", url=f"https://hive.blog/@{row['Uczestnik']}")
@@ -956,45 +767,38 @@ def show_current_edition_dashboard(lang, edition_key="december"):
     colors = plt.cm.tab20(np.linspace(0, 1, len(participants_list)))
     color_map = {p: colors[i] for i, p in enumerate(sorted(participants_list))}
 
-    def draw_chart(day):
-        df_race = get_race_data_for_day(current_data, day, lang, participants_list)
+    def show_race_chart(day):
+        df_race = get_race_data_for_day(matrix, day, lang)
         df_race = df_race.sort_index(ascending=False)
-        fig, ax = plt.subplots(figsize=(10, max(6, len(participants_list)*0.3)))
-        plt.style.use('dark_background')
-        ax.set_facecolor('#0e1117')
-        fig.patch.set_facecolor('#0e1117')
-        bars = ax.barh(df_race.index, df_race[_t('current_stats_race_total', lang)], color=[color_map.get(p, 'gray') for p in df_race.index])
-        ax.set_xlim(0, max_axis_day) 
-        ax.set_title(clean_title_for_chart(f"{_t('current_stats_race_day', lang)}: {day}"), color='white')
-        ax.tick_params(axis='x', colors='white')
-        ax.tick_params(axis='y', colors='white')
-        for spine in ax.spines.values(): spine.set_color('#444444')
-        for bar in bars:
-            width = bar.get_width()
-            ax.text(width + 0.5, bar.get_y() + bar.get_height()/2, f'{int(width)}', ha='left', va='center', color='white', fontsize=8)
-        plt.tight_layout()
-        return fig
+        show_chart(
+            _draw_race_chart, df_race[_t('current_stats_race_total', lang)].to_numpy(), f"{_t('current_stats_race_day', lang)}: {day}",
+            list(df_race.index), [color_map.get(p, 'gray') for p in df_race.index], len(participants_list), max_axis_day
+        )
+
+    def show_race_animation():
+        # Wszystkie dni naraz z jednej macierzy wyników; klatki w kolejności słupków wykresu ręcznego
+        names = sorted(matrix.participants, reverse=True)
+        history = matrix.race_history(max_day_reported)[:, [matrix.participant_index[p] for p in names]]
+        frames = [(history[day - 1], f"{_t('current_stats_race_day', lang)}: {day}") for day in range(1, max_day_reported + 1)]
+        show_animation(
+            _draw_race_chart, frames,
+            names, [color_map.get(p, 'gray') for p in names], len(participants_list), max_axis_day
+        )
 
     if mode == _t('current_stats_race_mode_anim', lang):
         with c_anim:
             if st.button(_t('current_stats_race_button', lang), type="primary", use_container_width=True):
-                for day in range(1, max_day_reported + 1):
-                    fig = draw_chart(day)
-                    with chart_placeholder.container(): st.pyplot(fig)
-                    plt.close(fig)
-                    time.sleep(0.1)
+                with chart_placeholder.container(): show_race_animation()
     else:
-        fig = draw_chart(st.session_state.race_current_day)
-        with chart_placeholder.container(): st.pyplot(fig)
-        plt.close(fig)
+        with chart_placeholder.container(): show_race_chart(st.session_state.race_current_day)
 
     st.markdown("---")
     
     with st.expander("📉 " + (_t('rank_history_expander', lang) if 'rank_history_expander' in _t.__globals__ else "Historia Miejsc")):
-        show_daily_rank_progression(current_data, complete_stages, lang, participants_list)
+        show_daily_rank_progression(matrix, complete_stages, lang)
         
-    show_survival_comparison(current_data, max_day_reported, df_historical, lang, elimination_map, complete_stages, participants_list)
-    show_stage_analysis(current_data, max_day_reported, elimination_map, complete_stages, lang, participants_list)
+    show_survival_comparison(matrix, max_day_reported, df_historical, lang, elimination_map, complete_stages)
+    show_stage_analysis(matrix, max_day_reported, elimination_map, complete_stages, lang)
 
     with st.expander(_t('current_ranking_rules_expander_label', lang)):
         st.markdown(_t('current_ranking_rules', lang, max_day_reported))
@@ -1004,34 +808,27 @@ def show_current_edition_dashboard(lang, edition_key="december"):
             show_historical_context(df_historical, lang, participants_list)
 
 def get_past_winners_positions(df_historical, current_ranking_df, lang):
-    """Znajduje obecne pozycje zwycięzców poprzednich 3 edycji."""
+    """Znajduje obecne pozycje zwycięzców poprzednich 3 edycji (ranking z compute_ranking)."""
     if df_historical.empty:
         return []
     
-    all_editions = sorted(df_historical['miesiac_rok_str'].unique(), key=lambda x: datetime.strptime(x, '%m.%Y'), reverse=True)
-    last_3_editions = all_editions[:3]
-    recent_hist = df_historical[df_historical['miesiac_rok_str'].isin(last_3_editions)]
-    past_winners = recent_hist[recent_hist['miejsce'] == 1]['uczestnik'].unique().tolist()
+    past_winners = get_historical_index(df_historical).recent_winners(3)
     
     current_positions = []
-    participant_col = _t('ranking_col_participant', lang)
-    rank_col = _t('ranking_col_rank', lang)
     
     for winner in past_winners:
-        if winner in current_ranking_df[participant_col].values:
-            rank = current_ranking_df[current_ranking_df[participant_col] == winner][rank_col].values[0]
+        if winner in current_ranking_df['participant'].values:
+            rank = current_ranking_df[current_ranking_df['participant'] == winner]['rank'].values[0]
             current_positions.append(f"@{winner} ({rank})")
             
     return current_positions
 
-def generate_weekly_summary_markdown(week_num, current_data, df_historical, df_logs, lang, participants_list):
+def generate_weekly_summary_markdown(week_num, matrix, df_historical, df_logs, lang):
     """Generuje tekst podsumowania dla konkretnego tygodnia."""
     day_limit = week_num * 7
-    ranking_df, elimination_map = calculate_ranking(current_data, day_limit, lang, participants_list, ranking_type='live')
-    participant_col = _t('ranking_col_participant', lang)
-    rank_col = _t('ranking_col_rank', lang)
+    ranking_df, elimination_map = compute_ranking(matrix, day_limit, ranking_type='live')
     
-    leaders = ranking_df[ranking_df[rank_col] == 1][participant_col].tolist()
+    leaders = ranking_df[ranking_df['rank'] == 1]['participant'].tolist()
     leaders_str = ", ".join([fmt_user(l, lang) for l in leaders])
     
     leader_text = _t('weekly_leader_sg', lang, leaders_str) if len(leaders) == 1 else _t('weekly_leader_pl', lang, leaders_str)
@@ -1039,7 +836,7 @@ def generate_weekly_summary_markdown(week_num, current_data, df_historical, df_l
     chasing_str = ""
     chasers_md = ""
     if len(leaders) < 5:
-        chasers = ranking_df[(ranking_df[rank_col] > 1) & (ranking_df[rank_col] <= 5)][participant_col].tolist()
+        chasers = ranking_df[(ranking_df['rank'] > 1) & (ranking_df['rank'] <= 5)]['participant'].tolist()
         if chasers:
             chasing_str = ", ".join([fmt_user(c, lang) for c in chasers])
             chasers_md = _t('weekly_chasers', lang, chasing_str)
@@ -1047,12 +844,8 @@ def generate_weekly_summary_markdown(week_num, current_data, df_historical, df_l
     past_winners_info = get_past_winners_positions(df_historical, ranking_df, lang)
     past_winners_str = ", ".join(past_winners_info) if past_winners_info else "brak danych"
     
-    started_count = len(participants_list)
-    active_count = 0
-    for p in participants_list:
-        elim_day = elimination_map.get(p)
-        if elim_day is None or elim_day > day_limit:
-            active_count += 1
+    started_count = len(matrix.participants)
+    active_count = int(matrix.active_mask([day_limit + 1], elimination_map)[0].sum())
             
     status_word = "nadal" if active_count == started_count else ("już tylko" if lang == 'pl' else "only")
     
@@ -1098,7 +891,7 @@ def generate_weekly_summary_markdown(week_num, current_data, df_historical, df_l
                 for user, count in helper_counts.items():
                     share = (count / total_helper_entries) * helper_pool
                     user_rewards[user] = user_rewards.get(user, 0) + share
-                top_leaders = ranking_df[(ranking_df[rank_col] <= 5)][participant_col].unique()
+                top_leaders = ranking_df[(ranking_df['rank'] <= 5)]['participant'].unique()
                 top_leaders = top_leaders[:5] 
                 if len(top_leaders) > 0:
                     share_per_leader = leader_pool / len(top_leaders)
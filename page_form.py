@@ -5,13 +5,20 @@ from streamlit_extras.mention import mention
 from translations import _t
 from config import ALL_POSSIBLE_PARTICIPANTS, SUBMITTER_LIST, EDITIONS_CONFIG, MONTH_NAMES, save_config_to_json
 from google_connect import connect_to_google_sheets, upload_file_to_hosting, append_to_sheet_dual
-from page_current_ranking import calculate_ranking, find_last_complete_stage
-from data_loader import load_google_sheet_data, process_raw_data, load_historical_data_from_json
+from derived_cache import DerivedEdition, get_derived_edition, invalidate_derived_edition
+from write_queue import queue_rows
+from historical_index import fmt_stat, get_historical_index
+from data_loader import load_google_sheet_data, load_historical_data_from_json
 
 try:
-    from notifications import check_and_send_notifications
+    from notifications import check_and_send_notifications, queue_notifications
+    from notification_service import get_notification_service
+    from send_ledger import edition_ledger_key, get_send_ledger
 except ImportError:
     def check_and_send_notifications(*args, **kwargs): pass
+    def queue_notifications(*args, **kwargs): pass
+    get_notification_service = None
+    get_send_ledger = None
 
 
 # Uczestnicy którzy preferują język polski
@@ -32,7 +39,7 @@ def _get_lang_for_participant(participant, current_lang):
 # ===========================================================
 
 def show_participant_profile(participant, lang, current_data, max_day_reported,
-                              elimination_map, complete_stages, participants_list,
+                              elimination_map, complete_stages, edition,
                               df_historical, edition_key, current_edition_day):
     """Wyświetla profil uczestnika."""
 
@@ -43,30 +50,26 @@ def show_participant_profile(participant, lang, current_data, max_day_reported,
     try:
         if complete_stages:
             official_stage = complete_stages[-1]
-            ranking_off, _ = calculate_ranking(
-                current_data, official_stage, lang, participants_list,
+            ranking_off, _ = edition.ranking(
+                official_stage,
                 ranking_type='official'
             )
-            part_col = _t('ranking_col_participant', lang)
-            rank_col = _t('ranking_col_rank', lang)
-            row = ranking_off[ranking_off[part_col] == participant]
+            row = ranking_off[ranking_off['participant'] == participant]
             if not row.empty:
-                official_rank = int(row.iloc[0][rank_col])
+                official_rank = int(row.iloc[0]['rank'])
     except Exception:
         pass
 
     # --- Ranking live (nieoficjalny) ---
     live_rank = "?"
     try:
-        ranking_live, _ = calculate_ranking(
-            current_data, max_day_reported, lang, participants_list,
+        ranking_live, _ = edition.ranking(
+            max_day_reported,
             ranking_type='live', complete_stages=complete_stages
         )
-        part_col = _t('ranking_col_participant', lang)
-        rank_col = _t('ranking_col_rank', lang)
-        row = ranking_live[ranking_live[part_col] == participant]
+        row = ranking_live[ranking_live['participant'] == participant]
         if not row.empty:
-            live_rank = int(row.iloc[0][rank_col])
+            live_rank = int(row.iloc[0]['rank'])
     except Exception:
         pass
 
@@ -80,31 +83,23 @@ def show_participant_profile(participant, lang, current_data, max_day_reported,
     avg_res_all = "—"
     medals = 0
 
-    if not df_historical.empty and participant in df_historical['uczestnik'].values:
-        p_hist = df_historical[df_historical['uczestnik'] == participant]
-        wins = int((p_hist['miejsce'] == 1).sum())
-        medals = int((p_hist['miejsce'] <= 3).sum())
+    p = get_historical_index(df_historical).participant(participant) if not df_historical.empty else None
+    if p is not None:
+        wins = int(p.wins)
+        medals = int(p.medals)
 
-        if not p_hist['rezultat_numeric'].isnull().all():
-            pb_val = int(p_hist['rezultat_numeric'].max())
-            pb_row = p_hist[p_hist['rezultat_numeric'] == pb_val].iloc[0]
-            pb_edition = str(pb_row.get('miesiac_rok_str', '—'))
-            avg_res_all = f"{p_hist['rezultat_numeric'].mean():.1f}"
+        if pd.notna(p.pb_result):
+            pb_val = int(p.pb_result)
+            pb_edition = str(p.pb_edition)
+            avg_res_all = fmt_stat(p.avg_result)
 
         # Średnia z ostatnich 3 edycji
-        last_3_ed = sorted(df_historical['edycja_nr'].unique())[-3:]
-        p_hist_l3 = p_hist[p_hist['edycja_nr'].isin(last_3_ed)]
-        if not p_hist_l3['rezultat_numeric'].isnull().all():
-            avg_res_l3 = f"{p_hist_l3['rezultat_numeric'].mean():.1f}"
+        avg_res_l3 = fmt_stat(p.avg_result_last_3)
 
         # Wynik w ostatniej edycji
-        last_ed_nr = p_hist['edycja_nr'].max()
-        last_ed_row = p_hist[p_hist['edycja_nr'] == last_ed_nr]
-        if not last_ed_row['rezultat_numeric'].isnull().all():
-            last_result_val = int(last_ed_row['rezultat_numeric'].max())
-            last_rank_val = int(last_ed_row['miejsce'].min()) if not last_ed_row['miejsce'].isnull().all() else "?"
-            last_edition_result = str(last_result_val)
-            last_edition_rank = str(last_rank_val)
+        if pd.notna(p.last_edition_result):
+            last_edition_result = str(int(p.last_edition_result))
+            last_edition_rank = fmt_stat(p.last_edition_rank, "{:.0f}", empty="?")
 
     # --- Status: odpadł / komunikaty motywacyjne w oparciu o historię ---
     eliminated_on = elimination_map.get(participant)
@@ -359,19 +354,17 @@ def show_submission_form(lang, edition_key="december", is_active=True):
     max_day_reported = 0
     elimination_map = {}
     complete_stages = []
+    edition = DerivedEdition({}, 0, True, participants_list)
     df_historical = load_historical_data_from_json()
 
     try:
         df_raw = load_google_sheet_data(sheet, sheet_name)
         if not df_raw.empty:
             expected_cols = ['Participant', 'Day', 'Status', 'Timestamp', 'Notes']
-            current_data, max_day_reported, _ = process_raw_data(df_raw, effective_lang, expected_cols, sheet_name)
-            elim_temp = {}
-            complete_stages = find_last_complete_stage(current_data, elim_temp, max_day_reported, participants_list)
-            _, elimination_map = calculate_ranking(
-                current_data, max_day_reported, effective_lang, participants_list,
-                ranking_type='live', complete_stages=complete_stages
-            )
+            edition = get_derived_edition(sheet_name, df_raw, participants_list, effective_lang, expected_cols)
+            current_data, max_day_reported = edition.current_data, edition.max_day_reported
+            complete_stages = edition.complete_stages(with_eliminations=False)
+            elimination_map = edition.elimination_map()
     except Exception as e:
         st.warning(f"Nie udało się załadować danych edycji: {e}")
 
@@ -384,7 +377,7 @@ def show_submission_form(lang, edition_key="december", is_active=True):
             max_day_reported=max_day_reported,
             elimination_map=elimination_map,
             complete_stages=complete_stages,
-            participants_list=participants_list,
+            edition=edition,
             df_historical=df_historical,
             edition_key=edition_key,
             current_edition_day=current_edition_day
@@ -547,18 +540,19 @@ def show_submission_form(lang, edition_key="december", is_active=True):
             status_key = map_status(status_val)
 
             try:
-                ws = sheet.worksheet(sheet_name)
-                ws.append_row([participant, day_input, status_key, full_notes, timestamp])
-                ws_log = sheet.worksheet("LogWpisow")
-                ws_log.append_row([submitter, participant, day_input, status_key, timestamp, edition_key, full_notes])
-                with st.spinner("📧 Sprawdzam powiadomienia..."):
-                    check_and_send_notifications(
-                        conn=sheet,
-                        edition_key=edition_key,
-                        current_user=participant,
-                        current_day=day_input,
-                        current_status=status_key
-                    )
+                row = [participant, day_input, status_key, full_notes, timestamp]
+                log_row = [submitter, participant, day_input, status_key, timestamp, edition_key, full_notes]
+                # Wiersze idą do trwałej kolejki i od razu do pamięci zakładek;
+                # do arkusza wysyła je w tle jedno append_rows na zakładkę
+                queue_rows(sheet, [(sheet_name, row), ("LogWpisow", log_row)])
+                # Powiadomienia sprawdza i wysyła wątek w tle - nie czekamy na SMTP
+                queue_notifications(
+                    conn=sheet,
+                    edition_key=edition_key,
+                    current_user=participant,
+                    current_day=day_input,
+                    current_status=status_key
+                )
                 st.session_state.last_submission = {
                     'participant': participant,
                     'day': day_input,
@@ -568,7 +562,9 @@ def show_submission_form(lang, edition_key="december", is_active=True):
                 }
                 st.session_state.last_day_entered = day_input + 1
                 st.session_state[f"saving_{edition_key}"] = False
-                st.cache_data.clear()
+                # Zamiast st.cache_data.clear(): zakładki edycji i logu są już załatane
+                # dopisanym wierszem, pozostałe dane (historia, inne edycje) zostają w pamięci
+                invalidate_derived_edition(sheet_name)
                 st.rerun()
             except Exception as e:
                 st.session_state[f"saving_{edition_key}"] = False
@@ -657,21 +653,18 @@ def show_submission_form(lang, edition_key="december", is_active=True):
         leader_pool = P * 0.20
 
         all_leaders = set()
-        part_col = _t('ranking_col_participant', effective_lang)
-        rank_col = _t('ranking_col_rank', effective_lang)
 
         try:
             df_ed_results = load_google_sheet_data(sheet, sheet_name)
             if not df_ed_results.empty:
                 expected_data_cols = ['Participant', 'Day', 'Status', 'Timestamp', 'Notes']
-                current_data_proc, max_day_proc, _ = process_raw_data(df_ed_results, effective_lang, expected_data_cols, sheet_name)
-                ranking_live2, elim_map_live = calculate_ranking(current_data_proc, max_day_proc, effective_lang, participants_list, ranking_type='live')
-                complete_stages_curr = find_last_complete_stage(current_data_proc, elim_map_live, max_day_proc, participants_list)
+                edition_proc = get_derived_edition(sheet_name, df_ed_results, participants_list, effective_lang, expected_data_cols)
+                complete_stages_curr = edition_proc.complete_stages()
                 if complete_stages_curr:
-                    ranking_official2, _ = calculate_ranking(current_data_proc, complete_stages_curr[-1], effective_lang, participants_list, ranking_type='official')
+                    ranking_official2, _ = edition_proc.ranking(complete_stages_curr[-1], ranking_type='official')
                     if not ranking_official2.empty:
-                        min_rank = ranking_official2[rank_col].min()
-                        all_leaders.update(ranking_official2[ranking_official2[rank_col] == min_rank][part_col].tolist())
+                        min_rank = ranking_official2['rank'].min()
+                        all_leaders.update(ranking_official2[ranking_official2['rank'] == min_rank]['participant'].tolist())
         except Exception:
             pass
 
@@ -822,6 +815,20 @@ def _show_organizer_panel(lang, edition_key, sheet):
 
             st.divider()
             st.subheader("5. Powiadomienia")
+            if get_notification_service is not None:
+                service = get_notification_service()
+                notif_status = service.status()
+                st.caption(f"📧 W kolejce: {notif_status['pending']} | wysłane: {notif_status['sent_count']} | nieudane (dead letters): {notif_status['dead_letters']}")
+                if get_send_ledger is not None:
+                    last_sent_stage = get_send_ledger().last_sent_stage(edition_ledger_key(target_cfg))
+                    st.caption(f"🏁 Ostatnie wysłane wyniki ({target_edition}): " + (f"etap {last_sent_stage}" if last_sent_stage else "brak"))
+                if service.dead_letters:
+                    st.dataframe(pd.DataFrame([
+                        {'Czas': datetime.fromtimestamp(d['failed_at']).strftime('%H:%M %d-%m'), 'Zadanie': d['description'], 'Błąd': d['error']}
+                        for d in service.dead_letters
+                    ]), hide_index=True, width="stretch")
+                    if st.button("📨 Ponów nieudane wysyłki"):
+                        st.info(f"Ponowiono {service.retry_dead_letters()} wiadomości.")
             if st.button("🔄 Sprawdź i wyślij newsletter"):
                 try:
                     check_and_send_notifications(None, target_edition, "Admin", 0, "Manual")
@@ -0,0 +1,137 @@
+"""
+Przyrostowy silnik rankingu.
+
+Zamiast liczyć ranking od zera dla każdego dnia (O(D²·P)), silnik przetwarza
+dni po kolei i trzyma stan każdego uczestnika (seria porażek, najwyższe
+zaliczenie, maska porażek, dzień eliminacji). Po każdym dniu zapamiętuje
+migawkę, więc ranking na dowolny dzień 1..D kosztuje jedno przejście O(D·P).
+Dane dnia to jeden wiersz EditionMatrix, więc krok silnika to kilka operacji
+na tablicach zamiast przeglądania słowników.
+
+Macierz edycji (a z nią silnik) jest współdzielona przez sesje Streamlit
+w derived_cache, więc przesuwanie silnika o kolejne dni odbywa się pod blokadą.
+"""
+import threading
+
+import numpy as np
+
+from edition_matrix import STATUS_PASSED, ELIMINATION_STREAK
+
+
+class RankingSnapshot:
+    """Stan wszystkich uczestników po zakończeniu danego dnia."""
+
+    def __init__(self, day, participants, highest_pass, consecutive_fails, failure_mask, eliminated_on_day):
+        self.day = day
+        self.participants = participants
+        self.highest_pass = highest_pass
+        self.consecutive_fails = consecutive_fails
+        self.failure_mask = failure_mask
+        self.eliminated_on_day = eliminated_on_day
+        self._order = None
+
+    def sort_keys(self):
+        """
+        Klucze sortowania wszystkich uczestników, zgodne z dawną krotką porażek.
+
+        Krotka (1/0 dla dni od dnia startowego w dół do 1) porównywana
+        leksykograficznie to to samo, co maska porażek dosunięta do lewej
+        (do długości `day`) plus długość krotki jako rozstrzygnięcie.
+        Trzy pola mają ograniczone zakresy, więc składamy je w jedną liczbę:
+        [day - najwyższe zaliczenie][maska << przesunięcie][dzień startowy] -
+        porównanie dwóch kluczy to jedno porównanie liczb całkowitych.
+        """
+        day = self.day
+        start_bits = max(1, day.bit_length())
+        keys = []
+        for highest, mask, eliminated in zip(self.highest_pass.tolist(), self.failure_mask, self.eliminated_on_day.tolist()):
+            start_day = eliminated or day
+            keys.append(((((day - highest) << day) | (mask << (day - start_day))) << start_bits) | start_day)
+        return keys
+
+    def ordered(self):
+        """Zwraca listę (indeks uczestnika, miejsce) w kolejności rankingu."""
+        if self._order is None:
+            # Budujemy lokalnie i przypisujemy na końcu - inna sesja może liczyć to samo równolegle
+            keys = self.sort_keys()
+            order = []
+            last_key = None
+            for pos, i in enumerate(sorted(range(len(keys)), key=keys.__getitem__)):
+                if pos > 0 and keys[i] == last_key:
+                    rank = order[-1][1]
+                else:
+                    rank = pos + 1
+                order.append((i, rank))
+                last_key = keys[i]
+            self._order = order
+        return self._order
+
+    def ranks(self):
+        """Słownik {uczestnik: miejsce}."""
+        return {self.participants[i]: rank for i, rank in self.ordered()}
+
+    def eliminated_on(self, i):
+        """Dzień eliminacji uczestnika lub None."""
+        return int(self.eliminated_on_day[i]) or None
+
+    def failed_days(self, i):
+        """Lista dni niezaliczonych (wraz z brakami danych) do eliminacji włącznie."""
+        mask = self.failure_mask[i]
+        return [bit + 1 for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+    def elimination_map(self):
+        return {p: self.eliminated_on(i) for i, p in enumerate(self.participants)}
+
+
+class RankingEngine:
+    """Silnik, który konsumuje kolejne dni edycji i zwraca ranking na dowolny dzień."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.participants = matrix.participants
+        n = len(self.participants)
+        self._highest_pass = np.zeros(n, dtype=int)
+        self._consecutive_fails = np.zeros(n, dtype=int)
+        self._failure_mask = [0] * n
+        self._eliminated_on_day = np.zeros(n, dtype=int)  # 0 = nadal w grze
+        self._snapshots = [self._take_snapshot(0)]
+        self._lock = threading.RLock()
+
+    def _take_snapshot(self, day):
+        return RankingSnapshot(
+            day,
+            self.participants,
+            self._highest_pass.copy(),
+            self._consecutive_fails.copy(),
+            list(self._failure_mask),
+            self._eliminated_on_day.copy()
+        )
+
+    def _step(self):
+        day = len(self._snapshots)
+        day_bit = 1 << (day - 1)
+        active = self._eliminated_on_day == 0
+        passed = active & (self.matrix.day_codes(day) == STATUS_PASSED)
+        failed = active & ~passed
+
+        self._highest_pass[passed] = day
+        self._consecutive_fails[passed] = 0
+        self._consecutive_fails[failed] += 1
+        for i in np.flatnonzero(failed):
+            self._failure_mask[i] |= day_bit
+        self._eliminated_on_day[failed & (self._consecutive_fails >= ELIMINATION_STREAK)] = day
+
+        self._snapshots.append(self._take_snapshot(day))
+
+    def snapshot(self, day):
+        """Migawka po dniu `day`; silnik dolicza brakujące dni tylko raz."""
+        day = max(0, int(day))
+        with self._lock:
+            while len(self._snapshots) <= day:
+                self._step()
+            return self._snapshots[day]
+
+    def rank_history(self, max_day):
+        """Miejsca wszystkich uczestników dla dni 1..max_day: {dzień: {uczestnik: miejsce}}."""
+        with self._lock:
+            return {day: self.snapshot(day).ranks() for day in range(1, max_day + 1)}
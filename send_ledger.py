@@ -0,0 +1,125 @@
+"""
+Rejestr wysłanych powiadomień (SQLite obok aplikacji).
+
+Newsletter z oficjalnymi wynikami wychodził do wszystkich subskrybentów przy
+każdym zapisie, który "dotknął" kompletnego etapu. Rejestr trzyma klucz
+(edycja, etap, rodzaj): zanim zbudujemy wiadomość, rezerwujemy klucz, a po
+wysyłce oznaczamy go jako wysłany - każdy etap wychodzi raz. Ostatni
+wysłany etap wyznacza też, od którego dnia szukać nowego kompletu.
+
+Edycję identyfikuje arkusz i data startu (edition_ledger_key) - klucze
+miesięcy w EDITIONS_CONFIG ('may', 'december') wracają co roku.
+
+Rezerwacja bez udanej wysyłki (restart w trakcie, błąd SMTP) blokuje etap
+przez CLAIM_TIMEOUT_SECONDS - w tym czasie wysyłkę może ponowić admin
+z listy dead letters - a potem przejmuje ją kolejny zapis.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from config import SEND_LEDGER_PATH
+
+KIND_RESULTS = 'results'
+CLAIM_TIMEOUT_SECONDS = 15 * 60
+
+STATE_CLAIMED = 'claimed'
+STATE_SENT = 'sent'
+STATE_FAILED = 'failed'
+
+
+def edition_ledger_key(cfg):
+    """Klucz edycji w rejestrze: nazwa arkusza + data startu (z configu lub JSON)."""
+    start_date = cfg['start_date']
+    start_date = start_date.isoformat() if hasattr(start_date, 'isoformat') else str(start_date)
+    return f"{cfg['sheet_name']}@{start_date}"
+
+
+class SendLedger:
+    """Tabela sends: wiersz = (edycja, etap, rodzaj) ze stanem claimed/sent/failed."""
+
+    def __init__(self, path=SEND_LEDGER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.enabled = True
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS sends ("
+                    " edition TEXT NOT NULL,"
+                    " stage INTEGER NOT NULL,"
+                    " kind TEXT NOT NULL,"
+                    " state TEXT NOT NULL,"
+                    " updated_at REAL NOT NULL,"
+                    " PRIMARY KEY (edition, stage, kind))"
+                )
+        except (OSError, sqlite3.Error) as e:
+            # Bez rejestru wysyłamy jak dawniej - przy każdym zapisie
+            print(f"Rejestr powiadomień wyłączony ({self.path}): {e}")
+            self.enabled = False
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:  # commit/rollback
+                yield db
+        finally:
+            db.close()
+
+    def last_sent_stage(self, edition, kind=KIND_RESULTS):
+        """Ostatni wysłany etap; 0 = jeszcze nic."""
+        if not self.enabled:
+            return 0
+        with self._connect() as db:
+            stage = db.execute(
+                "SELECT MAX(stage) FROM sends WHERE edition = ? AND kind = ? AND state = ?", (edition, kind, STATE_SENT)
+            ).fetchone()[0]
+        return stage or 0
+
+    def claim(self, edition, stage, kind=KIND_RESULTS):
+        """
+        Rezerwuje wysyłkę; True = wolno budować i wysłać wiadomość. Rezerwację
+        bez udanej wysyłki starszą niż CLAIM_TIMEOUT_SECONDS można przejąć.
+        """
+        if not self.enabled:
+            return True
+        now = time.time()
+        with self._lock, self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO sends VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (edition, stage, kind) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at"
+                " WHERE sends.state != ? AND sends.updated_at < ?",
+                (edition, stage, kind, STATE_CLAIMED, now, STATE_SENT, now - CLAIM_TIMEOUT_SECONDS)
+            )
+            return cursor.rowcount > 0
+
+    def mark(self, edition, stage, sent, kind=KIND_RESULTS):
+        """Wynik wysyłki zarezerwowanego klucza."""
+        if not self.enabled:
+            return
+        with self._lock, self._connect() as db:
+            db.execute(
+                "UPDATE sends SET state = ?, updated_at = ? WHERE edition = ? AND stage = ? AND kind = ?",
+                (STATE_SENT if sent else STATE_FAILED, time.time(), edition, stage, kind)
+            )
+
+    def state(self, edition, stage, kind=KIND_RESULTS):
+        if not self.enabled:
+            return None
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT state FROM sends WHERE edition = ? AND stage = ? AND kind = ?", (edition, stage, kind)
+            ).fetchone()
+        return row[0] if row else None
+
+
+@st.cache_resource
+def get_send_ledger():
+    """Jeden rejestr powiadomień na proces."""
+    return SendLedger()
@@ -0,0 +1,259 @@
+"""
+Pamięć podręczna arkuszy Google Sheets (per zakładka).
+
+st.cache_data potrafi tylko wyczyścić wszystko naraz, więc po każdym zapisie
+formularza znikały też dane historyczne, inne edycje i log - a kolejne
+reruny wszystkich sesji rzucały się naraz na Google Sheets. Tutaj każda
+zakładka ma własny wpis: po zapisie unieważniamy tylko zakładki, do których
+pisaliśmy, a dopisany wiersz od razu doklejamy do zapamiętanej ramki.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import streamlit as st
+from gspread.utils import numericise_all
+
+SHEET_TTL_SECONDS = 600
+
+
+def hash_worksheet(df_raw):
+    """
+    Skrót zawartości arkusza (nagłówki + wszystkie komórki) - wspólny klucz
+    wersji danych dla pamięci pochodnych (edycje, historia, subskrybenci).
+    """
+    digest = hashlib.sha1(repr(list(df_raw.columns)).encode())
+    if not df_raw.empty:
+        digest.update(pd.util.hash_pandas_object(df_raw, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class CachedWorksheet:
+    """
+    Zapamiętana zakładka. synced_rows to znak wodny: tyle pierwszych wierszy
+    ramki pochodzi z arkusza (dalej mogą być wiersze doklejone lokalnie po
+    append_row). full_loaded_at to czas ostatniego pełnego pobrania.
+    """
+
+    def __init__(self, frame, synced_rows=None, fetched_at=None, full_loaded_at=None):
+        self.frame = frame
+        self.synced_rows = len(frame) if synced_rows is None else synced_rows
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.full_loaded_at = self.fetched_at if full_loaded_at is None else full_loaded_at
+
+
+def _patched(entry, rows):
+    """Wpis z doklejonymi wierszami (wartości jak z get_all_records, pozycje wg nagłówków)."""
+    df = entry.frame
+    n_cols = len(df.columns)
+    records = []
+    for row in rows:
+        values = ["" if v is None else str(v) for v in row][:n_cols]
+        values += [""] * (n_cols - len(values))
+        records.append(numericise_all(values))
+
+    patched = pd.concat([df, pd.DataFrame(records, columns=df.columns)], ignore_index=True)
+    # Czas pobrania i znak wodny zostają - doklejony wiersz nie przedłuża ważności
+    # reszty danych, a przy synchronizacji przyjdzie z arkusza razem z nowymi
+    return CachedWorksheet(patched, entry.synced_rows, entry.fetched_at, entry.full_loaded_at)
+
+
+class WorksheetCache:
+    """
+    Zapamiętane zakładki: {nazwa: CachedWorksheet}.
+
+    Przeterminowana zakładka jest zwracana od razu, a odświeżana w wątku
+    w tle (stale-while-revalidate). Z migawkami na dysku (snapshots) tak samo
+    działa zimny start - czekamy na Google Sheets tylko, gdy zakładki nie ma
+    ani w pamięci, ani na dysku.
+    """
+
+    def __init__(self, ttl=SHEET_TTL_SECONDS, snapshots=None, unsent_rows=None):
+        self.ttl = ttl
+        self.snapshots = snapshots
+        # unsent_rows(zakładka, ramka) - wiersze z kolejki zapisów, których arkusz jeszcze nie ma
+        self.unsent_rows = unsent_rows
+        self._frames = {}
+        self._lock = threading.Lock()
+        # Osobna blokada na zakładkę - równoległe sesje nie pobierają tego samego arkusza kilka razy
+        self._fetch_locks = defaultdict(threading.Lock)
+        self._refreshing = set()
+
+    def entry(self, worksheet_name):
+        """Wpis zakładki z pamięci, a przy pierwszym odczycie - z migawki na dysku."""
+        with self._lock:
+            entry = self._frames.get(worksheet_name)
+        if entry is None and self.snapshots is not None:
+            entry = self.snapshots.load(worksheet_name)
+            if entry is not None:
+                with self._lock:
+                    entry = self._frames.setdefault(worksheet_name, entry)
+        return entry
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry.fetched_at < self.ttl
+
+    def get(self, worksheet_name, fetch, refresh=None):
+        """
+        Zwraca kopię ramki zakładki.
+
+        fetch(poprzedni_wpis) pobiera zakładkę, gdy nie mamy żadnej wersji;
+        refresh(poprzedni_wpis) - bez komunikatów UI - odświeża w tle wersję
+        przeterminowaną. Poprzedni wpis pozwala dociągnąć tylko nowe wiersze.
+        Obie zwracają CachedWorksheet albo None (błąd - nic nie zapamiętujemy).
+        Bez refresh przeterminowana zakładka pobiera się od razu przez fetch.
+        """
+        entry = self.entry(worksheet_name)
+        if self.is_fresh(entry):
+            return entry.frame.copy()
+        if entry is not None and refresh is not None:
+            self.revalidate(worksheet_name, refresh)
+            return entry.frame.copy()
+
+        with self._fetch_locks[worksheet_name]:
+            entry = self.entry(worksheet_name)
+            if not self.is_fresh(entry):
+                entry = fetch(entry)
+                if entry is None:
+                    return pd.DataFrame()
+                self.store(worksheet_name, entry)
+        return entry.frame.copy()
+
+    def claim_refresh(self, worksheet_names):
+        """Rezerwuje zakładki do odświeżenia; zwraca te, których nikt właśnie nie odświeża."""
+        with self._lock:
+            claimed = [name for name in dict.fromkeys(worksheet_names) if name not in self._refreshing]
+            self._refreshing.update(claimed)
+        return claimed
+
+    def release_refresh(self, worksheet_names):
+        with self._lock:
+            self._refreshing.difference_update(worksheet_names)
+
+    def in_background(self, worksheet_names, job):
+        """
+        Uruchamia job(zakładki) w wątku w tle - tylko dla zakładek, których nikt
+        właśnie nie odświeża (jedno odświeżanie naraz na zakładkę).
+        """
+        claimed = self.claim_refresh(worksheet_names)
+        if not claimed:
+            return
+
+        def run():
+            try:
+                job(claimed)
+            finally:
+                self.release_refresh(claimed)
+
+        threading.Thread(target=run, name=f"refresh-{'-'.join(claimed)}", daemon=True).start()
+
+    def revalidate(self, worksheet_name, refresh):
+        """Odświeża przeterminowaną zakładkę w tle funkcją refresh(poprzedni_wpis)."""
+        def job(_names):
+            with self._fetch_locks[worksheet_name]:
+                previous = self.entry(worksheet_name)
+                if self.is_fresh(previous):
+                    return
+                entry = refresh(previous)
+                if entry is not None:
+                    self.replace(worksheet_name, previous, entry)
+
+        self.in_background([worksheet_name], job)
+
+    def missing(self, worksheet_names):
+        """Zakładki z listy, których nie ma w pamięci ani na dysku."""
+        return [name for name in dict.fromkeys(worksheet_names) if self.entry(name) is None]
+
+    def stale(self, worksheet_names):
+        """Zakładki z listy, które mamy, ale są przeterminowane."""
+        result = []
+        for name in dict.fromkeys(worksheet_names):
+            entry = self.entry(name)
+            if entry is not None and not self.is_fresh(entry):
+                result.append(name)
+        return result
+
+    def _with_unsent(self, worksheet_name, entry):
+        """
+        Wpis z arkusza uzupełniony o wiersze czekające w kolejce zapisów - inaczej
+        odświeżenie przed ich wysłaniem chowałoby świeży wpis użytkownika.
+        """
+        if self.unsent_rows is None or len(entry.frame.columns) == 0:
+            return entry
+        rows = self.unsent_rows(worksheet_name, entry.frame)
+        return _patched(entry, rows) if rows else entry
+
+    def store(self, worksheet_name, entry):
+        """Zapamiętuje świeżo pobraną (lub zsynchronizowaną) zakładkę - w pamięci i na dysku."""
+        entry = self._with_unsent(worksheet_name, entry)
+        with self._lock:
+            self._frames[worksheet_name] = entry
+        if self.snapshots is not None:
+            self.snapshots.save(worksheet_name, entry)
+
+    def replace(self, worksheet_name, previous, entry):
+        """
+        Podmienia wpis tylko, jeśli w międzyczasie nikt go nie zmienił (np. nie
+        dokleił wiersza po append_row) - inaczej wynik odświeżania przepada,
+        a zakładka odświeży się przy następnym odczycie.
+        """
+        entry = self._with_unsent(worksheet_name, entry)
+        with self._lock:
+            if self._frames.get(worksheet_name) is not previous:
+                return False
+            self._frames[worksheet_name] = entry
+        if self.snapshots is not None:
+            self.snapshots.save(worksheet_name, entry)
+        return True
+
+    def invalidate(self, worksheet_name=None):
+        """Usuwa zakładkę z pamięci i z dysku (albo wszystkie, gdy worksheet_name=None)."""
+        with self._lock:
+            if worksheet_name is None:
+                self._frames.clear()
+            else:
+                self._frames.pop(worksheet_name, None)
+        if self.snapshots is not None:
+            self.snapshots.delete(worksheet_name)
+
+    def append_rows(self, worksheet_name, rows):
+        """
+        Dokleja dopisane wiersze do zapamiętanej ramki - tak, jak zwróciłoby je
+        get_all_records (pozycje wg nagłówków, liczby zamienione na int/float).
+        Gdy nie znamy nagłówków (brak wpisu lub pusta ramka), zakładka jest
+        po prostu unieważniana i przy następnym odczycie pobierze się na nowo.
+        """
+        entry = self.entry(worksheet_name)
+        if entry is None or len(entry.frame.columns) == 0:
+            self.invalidate(worksheet_name)
+            return False
+
+        with self._lock:
+            entry = self._frames.get(worksheet_name, entry)
+            patched_entry = _patched(entry, rows)
+            self._frames[worksheet_name] = patched_entry
+        if self.snapshots is not None:
+            self.snapshots.save(worksheet_name, patched_entry)
+        return True
+
+
+@st.cache_resource
+def get_worksheet_cache():
+    """
+    Jedna pamięć zakładek na proces (wspólna dla wszystkich sesji), z migawkami
+    na dysku i wierszami czekającymi w kolejce zapisów.
+    """
+    from snapshot_store import SnapshotStore
+    from write_queue import get_write_queue
+    return WorksheetCache(snapshots=SnapshotStore(), unsent_rows=get_write_queue().unsent_rows)
+
+
+def invalidate_worksheet(worksheet_name=None):
+    get_worksheet_cache().invalidate(worksheet_name)
+
+
+def patch_cached_worksheet(worksheet_name, rows):
+    """Rejestruje wiersze dopisane przez aplikację (append_row) w pamięci zakładki."""
+    return get_worksheet_cache().append_rows(worksheet_name, rows)
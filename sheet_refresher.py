@@ -0,0 +1,87 @@
+"""
+Odświeżanie zakładek w tle, niezależne od rerunów użytkowników.
+
+Jeden wątek na proces (start przez st.cache_resource) co kilka minut
+dociąga trwające edycje i LogWpisow jednym żądaniem values_batch_get
+i podmienia wpisy w pamięci zakładek. Odświeżanie wypada częściej niż
+TTL, więc render strony czyta zawsze z pamięci i nie czeka na sieć.
+"""
+import threading
+import time
+from datetime import date
+
+import streamlit as st
+
+from config import EDITIONS_CONFIG, get_active_edition_keys
+from data_loader import refresh_worksheets
+from sheet_cache import SHEET_TTL_SECONDS, get_worksheet_cache
+
+REFRESH_INTERVAL_SECONDS = SHEET_TTL_SECONDS // 2
+MAX_BACKOFF_SECONDS = 1800
+
+
+def refreshed_worksheet_names(today=None):
+    """Zakładki odświeżane w tle: trwające edycje i log wpisów."""
+    keys = get_active_edition_keys(today or date.today())
+    return [EDITIONS_CONFIG[key]['sheet_name'] for key in keys] + ["LogWpisow"]
+
+
+class SheetRefresher:
+    """Wątek odświeżający zakładki, z licznikami do podglądu w panelu admina."""
+
+    def __init__(self, sheet, cache, interval=REFRESH_INTERVAL_SECONDS):
+        self.sheet = sheet
+        self.cache = cache
+        self.interval = interval
+        self.last_refresh_at = None
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sheet-refresher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh_once(self):
+        try:
+            refresh_worksheets(self.sheet, refreshed_worksheet_names(), self.cache)
+        except Exception as e:
+            self.failure_count += 1
+            self.consecutive_failures += 1
+            self.last_error = str(e)
+            print(f"Odświeżanie w tle nie powiodło się ({self.consecutive_failures}. raz z rzędu): {e}")
+            return False
+        self.last_refresh_at = time.time()
+        self.refresh_count += 1
+        self.consecutive_failures = 0
+        return True
+
+    def _next_delay(self):
+        # Po błędach (np. limit zapytań) odstęp rośnie wykładniczo
+        return min(self.interval * 2 ** self.consecutive_failures, MAX_BACKOFF_SECONDS)
+
+    def _run(self):
+        while not self._stop.wait(self._next_delay()):
+            self.refresh_once()
+
+    def status(self):
+        """Stan do wyświetlenia: wiek ostatniego odświeżenia (s) i liczniki."""
+        return {
+            'last_refresh_age': None if self.last_refresh_at is None else time.time() - self.last_refresh_at,
+            'refresh_count': self.refresh_count,
+            'failure_count': self.failure_count,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+        }
+
+
+@st.cache_resource(on_release=lambda refresher: refresher.stop())
+def start_sheet_refresher(_sheet):
+    """Uruchamia (raz na proces) wątek odświeżający zakładki w tle."""
+    return SheetRefresher(_sheet, get_worksheet_cache()).start()
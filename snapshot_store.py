@@ -0,0 +1,100 @@
+"""
+Trwałe migawki zakładek na dysku (SQLite w katalogu cache).
+
+Po restarcie kontenera pamięć procesu jest pusta i każda zakładka szłaby
+do Google Sheets. Migawka przechowuje ramkę zakładki razem z czasem
+pobrania i znakiem wodnym wierszy, więc aplikacja od razu pokazuje ostatnie
+znane dane, a odświeża je w tle (stale-while-revalidate).
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from config import CACHE_DIR
+from sheet_cache import CachedWorksheet
+
+SNAPSHOT_DB = "sheets.sqlite"
+
+
+class SnapshotStore:
+    """Migawki zakładek: jedna tabela, wiersz = zakładka."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.path = os.path.join(cache_dir, SNAPSHOT_DB)
+        self._lock = threading.Lock()
+        self.enabled = True
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS snapshots ("
+                    " worksheet TEXT PRIMARY KEY,"
+                    " frame TEXT NOT NULL,"
+                    " synced_rows INTEGER NOT NULL,"
+                    " fetched_at REAL NOT NULL,"
+                    " full_loaded_at REAL NOT NULL)"
+                )
+        except (OSError, sqlite3.Error) as e:
+            # Brak zapisu na dysk (np. system plików tylko do odczytu) - działamy bez migawek
+            print(f"Migawki zakładek wyłączone ({self.path}): {e}")
+            self.enabled = False
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:  # commit/rollback
+                yield db
+        finally:
+            db.close()
+
+    def load(self, worksheet_name):
+        """Zwraca CachedWorksheet z dysku albo None."""
+        if not self.enabled:
+            return None
+        try:
+            with self._connect() as db:
+                row = db.execute(
+                    "SELECT frame, synced_rows, fetched_at, full_loaded_at FROM snapshots WHERE worksheet = ?",
+                    (worksheet_name,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu migawki {worksheet_name}: {e}")
+            return None
+        if row is None:
+            return None
+
+        frame_json, synced_rows, fetched_at, full_loaded_at = row
+        split = json.loads(frame_json)
+        frame = pd.DataFrame(split['data'], columns=split['columns'])
+        return CachedWorksheet(frame, synced_rows, fetched_at, full_loaded_at)
+
+    def save(self, worksheet_name, entry):
+        if not self.enabled:
+            return
+        split = entry.frame.to_dict(orient='split')
+        frame_json = json.dumps({'columns': split['columns'], 'data': split['data']}, default=str)
+        try:
+            with self._lock, self._connect() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                    (worksheet_name, frame_json, entry.synced_rows, entry.fetched_at, entry.full_loaded_at)
+                )
+        except sqlite3.Error as e:
+            print(f"Błąd zapisu migawki {worksheet_name}: {e}")
+
+    def delete(self, worksheet_name=None):
+        if not self.enabled:
+            return
+        try:
+            with self._lock, self._connect() as db:
+                if worksheet_name is None:
+                    db.execute("DELETE FROM snapshots")
+                else:
+                    db.execute("DELETE FROM snapshots WHERE worksheet = ?", (worksheet_name,))
+        except sqlite3.Error as e:
+            print(f"Błąd usuwania migawki {worksheet_name}: {e}")
@@ -0,0 +1,90 @@
+"""
+Indeks subskrybentów z arkusza 'Emails'.
+
+Sprawdzenie powiadomień po każdym zapisie od nowa szukało nazw kolumn
+(next(...) po nagłówkach) i filtrowało cały arkusz (.astype(str).str.strip()
+== nick) dla jednej osoby, a listę odbiorców rankingu budowało kolejnym
+filtrem. Indeks robi to raz dla danej wersji arkusza: kolumny są ustalone,
+nicki znormalizowane, a zapis to już tylko odczyt ze słownika.
+"""
+import pandas as pd
+import streamlit as st
+
+from sheet_cache import hash_worksheet
+
+# --- KONFIGURACJA KOLUMN SUBSKRYPCJI ---
+# Nazwy kolumn w arkuszu 'Emails'
+COL_ALERT_RISK = 'Alert_Risk'     # Dla ostrzeżeń indywidualnych (Ryzyko/Eliminacja)
+COL_ALERT_RESULTS = 'Alert_Results' # Dla rankingu ogólnego
+
+NICK_COLUMNS = ['nick', 'participant', 'uczestnik', 'user']
+EMAIL_COLUMNS = ['email', 'e-mail', 'mail']
+# Ostrzeżenia idą domyślnie (wyłącza je wyraźne "nie"), ranking tylko po wyraźnym "tak"
+OPT_OUT_VALUES = {'FALSE', 'NO', 'NIE', '0'}
+OPT_IN_VALUES = {'TRUE', 'YES', 'TAK', '1'}
+
+
+def normalize_nick(nick):
+    return str(nick).strip().lower()
+
+
+class Subscriber:
+    """Wiersz arkusza 'Emails' jednego uczestnika (pierwszy, jeśli nick się powtarza)."""
+
+    def __init__(self, nick, email, alert_risk, alert_results):
+        self.nick = nick
+        self.email = email
+        self.alert_risk = alert_risk
+        self.alert_results = alert_results
+
+
+class SubscriberIndex:
+    """Subskrybenci: subscriber(nick), risk_email(nick), results_recipients."""
+
+    def __init__(self, sub_df):
+        columns = list(sub_df.columns)
+        self.col_nick = next((c for c in columns if c.lower() in NICK_COLUMNS), None)
+        self.col_email = next((c for c in columns if c.lower() in EMAIL_COLUMNS), None)
+        self.col_risk = next((c for c in columns if c == COL_ALERT_RISK), None)
+        self.col_results = next((c for c in columns if c == COL_ALERT_RESULTS), None)
+
+        self._by_nick = {}
+        if self.col_nick and self.col_email:
+            risk = sub_df[self.col_risk].astype(str).str.upper() if self.col_risk else None
+            results = sub_df[self.col_results].astype(str).str.upper() if self.col_results else None
+            for pos, (nick, email) in enumerate(zip(sub_df[self.col_nick], sub_df[self.col_email])):
+                key = normalize_nick(nick)
+                if key in self._by_nick:
+                    continue
+                self._by_nick[key] = Subscriber(
+                    nick,
+                    email,
+                    alert_risk=risk is None or risk.iat[pos] not in OPT_OUT_VALUES,
+                    alert_results=results is not None and results.iat[pos] in OPT_IN_VALUES
+                )
+
+        # Odbiorcy rankingu - kolejność wierszy arkusza
+        self.results_recipients = []
+        if self.col_results and self.col_email:
+            opted_in = sub_df[self.col_results].astype(str).str.upper().isin(OPT_IN_VALUES)
+            self.results_recipients = sub_df.loc[opted_in, self.col_email].dropna().tolist()
+
+    def subscriber(self, nick):
+        return self._by_nick.get(normalize_nick(nick))
+
+    def risk_email(self, nick):
+        """Adres do ostrzeżeń o ryzyku/eliminacji albo None (brak wpisu, adresu lub zgody)."""
+        sub = self.subscriber(nick)
+        if sub is None or not sub.alert_risk or not sub.email or pd.isna(sub.email):
+            return None
+        return sub.email
+
+
+@st.cache_resource(max_entries=4)
+def _get_subscriber_index(data_version, _sub_df):
+    return SubscriberIndex(_sub_df)
+
+
+def get_subscriber_index(sub_df):
+    """Indeks dla danej wersji arkusza 'Emails' (klucz = skrót zawartości ramki)."""
+    return _get_subscriber_index(hash_worksheet(sub_df), sub_df)
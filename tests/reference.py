@@ -0,0 +1,164 @@
+"""
+Pierwotne (sprzed optymalizacji) wersje algorytmów - wzorzec dla testów
+równoważności. Kod jak w bazowej wersji aplikacji, na słowniku
+{uczestnik: {dzień: {"status": ...}}}.
+"""
+import random
+
+import pandas as pd
+
+from translations import _t
+
+
+def random_edition(seed, participants_count=None, days_count=None):
+    """Losowa edycja: (dane, ostatni raportowany dzień, lista uczestników)."""
+    rng = random.Random(seed)
+    participants_count = participants_count or rng.randint(1, 25)
+    days_count = rng.randint(0, 40) if days_count is None else days_count
+    participants = [f"u{i}" for i in range(participants_count)]
+    data = {}
+    for p in participants:
+        if rng.random() < 0.1:
+            continue
+        pass_rate = rng.random()
+        days = {}
+        for day in range(1, rng.randint(0, days_count) + 1):
+            if rng.random() < 0.15:
+                continue
+            status = rng.choices(["Zaliczone", "Niezaliczone", "Brak raportu"], [pass_rate, 1 - pass_rate, 0.1])[0]
+            days[day] = {"status": status, "timestamp": "", "notes": ""}
+        if days:
+            data[p] = days
+    max_day = max((max(days) for days in data.values()), default=0)
+    return data, max_day, participants
+
+
+def find_last_complete_stage(data, elimination_map, max_day, participants_list):
+    """Pierwotna pętla dzień × uczestnik."""
+    participant_max_days = {
+        p: max((int(k) for k in data.get(p, {}).keys()), default=0)
+        for p in participants_list
+    }
+
+    complete_stages = []
+    for day in range(1, max_day + 1):
+        is_complete_for_all = True
+        active_participants_on_this_day = []
+
+        for p in participants_list:
+            elim_day = elimination_map.get(p)
+            if elim_day is None or elim_day >= day:
+                active_participants_on_this_day.append(p)
+
+        if not active_participants_on_this_day and max_day > 0:
+            continue
+
+        for p in active_participants_on_this_day:
+            if participant_max_days.get(p, 0) < day:
+                is_complete_for_all = False
+                break
+
+        if is_complete_for_all:
+            complete_stages.append(day)
+
+    return complete_stages
+
+
+def calculate_ranking(data, max_day_reported, lang, participants_list, ranking_type='live', complete_stages=None):
+    """Pierwotny ranking: pętla po dniach dla każdego uczestnika, sortowanie po krotce porażek."""
+    ranking_data = []
+    elimination_map = {}
+
+    for participant in participants_list:
+        days_data = data.get(participant, {})
+        failed_stages = []
+        completed_stages = []
+        consecutive_fails = 0
+        eliminated_on_day = None
+
+        for day in range(1, max_day_reported + 1):
+            if eliminated_on_day:
+                break
+            if day in days_data and days_data[day]["status"] == "Zaliczone":
+                completed_stages.append(day)
+                consecutive_fails = 0
+            else:
+                failed_stages.append(day)
+                consecutive_fails += 1
+            if consecutive_fails >= 3:
+                eliminated_on_day = day
+                break
+
+        highest_completed = max(completed_stages) if completed_stages else 0
+
+        last_official_day = complete_stages[-1] if complete_stages else 0
+        confirmed_failed_stages = []
+        all_missing_data_days = []
+        max_day_for_this_user = max((int(k) for k in days_data.keys()), default=0)
+        check_until_day = max(last_official_day, max_day_for_this_user)
+
+        for day in range(1, check_until_day + 1):
+            if day in days_data:
+                if days_data[day]["status"] == "Niezaliczone":
+                    confirmed_failed_stages.append(day)
+            elif day <= last_official_day:
+                all_missing_data_days.append(day)
+
+        if eliminated_on_day and eliminated_on_day > last_official_day:
+            for day in range(last_official_day + 1, eliminated_on_day + 1):
+                if day not in days_data:
+                    all_missing_data_days.append(day)
+
+        confirmed_failed_stages.sort()
+        all_missing_data_days.sort()
+
+        confirmed_failed_str = ", ".join(map(str, confirmed_failed_stages[:10])) + ("..." if len(confirmed_failed_stages) > 10 else "")
+        missing_data_str = ", ".join(map(str, all_missing_data_days)) if all_missing_data_days else ""
+
+        start_day = eliminated_on_day or max(highest_completed, max_day_reported)
+        failure_tuple = tuple(1 if d in failed_stages else 0 for d in range(start_day, 0, -1))
+
+        if ranking_type == 'live':
+            failed_col_key = 'ranking_col_failed_list_live'
+            if not eliminated_on_day and consecutive_fails == 2:
+                confirmed_failed_str += "❗"
+        else:
+            failed_col_key = 'ranking_col_failed_list_official'
+            confirmed_failed_str = ", ".join(map(str, sorted(failed_stages)))
+
+        ranking_data.append({
+            _t('ranking_col_participant', lang): participant,
+            _t('ranking_col_highest_pass', lang): highest_completed,
+            "sort_key_failure_tuple": failure_tuple,
+            _t(failed_col_key, lang): confirmed_failed_str,
+            "missing_data_days": missing_data_str,
+        })
+        elimination_map[participant] = eliminated_on_day
+
+    highest_col = _t('ranking_col_highest_pass', lang)
+    ranking_data.sort(key=lambda entry: (-entry[highest_col], entry["sort_key_failure_tuple"]))
+
+    rank_col_name = _t('ranking_col_rank', lang)
+    last_sort_key = None
+    for i, entry in enumerate(ranking_data):
+        current_sort_key = (entry[highest_col], entry["sort_key_failure_tuple"])
+        if i > 0 and current_sort_key == last_sort_key:
+            entry[rank_col_name] = ranking_data[i - 1][rank_col_name]
+        else:
+            entry[rank_col_name] = i + 1
+        last_sort_key = current_sort_key
+
+    df_ranking = pd.DataFrame(ranking_data)
+    if not df_ranking.empty:
+        df_ranking[rank_col_name] = df_ranking[rank_col_name].astype(int)
+
+    failed_col_name = _t('ranking_col_failed_list_live' if ranking_type == 'live' else 'ranking_col_failed_list_official', lang)
+    cols_to_return = [rank_col_name, _t('ranking_col_participant', lang), highest_col]
+    if failed_col_name in df_ranking.columns:
+        cols_to_return.append(failed_col_name)
+    if ranking_type == 'live':
+        missing_col_name = _t('ranking_col_missing_data', lang)
+        df_ranking = df_ranking.rename(columns={"missing_data_days": missing_col_name})
+        cols_to_return.append(missing_col_name)
+
+    return df_ranking[cols_to_return], elimination_map
@@ -0,0 +1,83 @@
+"""
+Równoważność EditionMatrix.complete_days (tablica różnic, O(D + P)) z
+pierwotną pętlą find_last_complete_stage na losowych macierzach.
+"""
+import numpy as np
+import pytest
+
+from edition_matrix import EditionMatrix, STATUS_MISSING, STATUS_PASSED, STATUS_FAILED, STATUS_NO_REPORT
+import reference
+
+STATUSES = {STATUS_PASSED: "Zaliczone", STATUS_FAILED: "Niezaliczone", STATUS_NO_REPORT: "Brak raportu"}
+
+
+def _as_dict(codes, participants):
+    return {
+        p: {day + 1: {"status": STATUSES[code]} for day, code in enumerate(codes[:, col]) if code != STATUS_MISSING}
+        for col, p in enumerate(participants)
+    }
+
+
+def _random_elimination_map(rng, participants, days_count):
+    return {p: (int(rng.integers(1, days_count + 4)) if rng.random() < 0.4 else None) for p in participants}
+
+
+def _assert_equivalent(codes, participants, elimination_map, max_day):
+    expected = reference.find_last_complete_stage(_as_dict(codes, participants), elimination_map, max_day, participants)
+    assert EditionMatrix(participants, codes).complete_days(elimination_map, max_day) == expected
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_matrices(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        days_count, participants_count = int(rng.integers(0, 35)), int(rng.integers(1, 15))
+        codes = rng.integers(0, 4, size=(days_count, participants_count)).astype(np.int8)
+        # Ogony braków wpisów jak w prawdziwym arkuszu
+        for col in range(participants_count):
+            codes[int(rng.integers(0, days_count + 1)):, col] = STATUS_MISSING
+        participants = [f"p{i}" for i in range(participants_count)]
+
+        maps = [{}, _random_elimination_map(rng, participants, days_count)]
+        if days_count:
+            maps.append(EditionMatrix(participants, codes).elimination_map())
+        for elimination_map in maps:
+            for max_day in {0, days_count, max(0, days_count - 2), days_count + 3}:
+                _assert_equivalent(codes, participants, elimination_map, max_day)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_single_participant(seed):
+    rng = np.random.default_rng(100 + seed)
+    days_count = int(rng.integers(1, 30))
+    codes = rng.integers(0, 4, size=(days_count, 1)).astype(np.int8)
+    for elimination_map in ({}, {"solo": int(rng.integers(1, days_count + 1))}, {"solo": None}):
+        _assert_equivalent(codes, ["solo"], elimination_map, days_count)
+
+
+def test_all_missing_has_no_complete_day():
+    participants = ["a", "b", "c"]
+    codes = np.zeros((10, 3), dtype=np.int8)
+    assert EditionMatrix(participants, codes).complete_days({}, 10) == []
+    _assert_equivalent(codes, participants, {}, 10)
+
+
+def test_no_complete_day_when_someone_never_reports():
+    participants = ["a", "b"]
+    codes = np.zeros((5, 2), dtype=np.int8)
+    codes[:, 0] = STATUS_PASSED
+    assert EditionMatrix(participants, codes).complete_days({}, 5) == []
+    _assert_equivalent(codes, participants, {}, 5)
+
+
+def test_everyone_eliminated_skips_later_days():
+    participants = ["a", "b"]
+    codes = np.full((6, 2), STATUS_FAILED, dtype=np.int8)
+    codes[3:] = STATUS_MISSING
+    elimination_map = {"a": 3, "b": 3}
+    assert EditionMatrix(participants, codes).complete_days(elimination_map, 6) == [1, 2, 3]
+    _assert_equivalent(codes, participants, elimination_map, 6)
+
+
+def test_zero_days():
+    assert EditionMatrix(["a"], np.zeros((0, 1), dtype=np.int8)).complete_days({}, 0) == []
@@ -0,0 +1,18 @@
+"""HistoricalStats żyje w cache_resource procesu - pamięć wyników musi mieć limit."""
+import pandas as pd
+
+import historical_stats_data
+from historical_stats_data import HistoricalStats
+
+
+def test_memo_is_bounded_lru():
+    users = [f"u{i}" for i in range(20)]
+    df = pd.DataFrame({'uczestnik': users, 'rezultat_numeric': range(20), 'miejsce': range(1, 21)})
+    stats = HistoricalStats(df)
+
+    first = stats.selection(1, users[:1])
+    for i in range(historical_stats_data.MAX_MEMO_ENTRIES * 2):
+        stats.selection(1, [users[i % 20], f"x{i}"])
+        assert stats.selection(1, users[:1]) is first  # używany wpis nie wypada
+    assert len(stats._memo) <= historical_stats_data.MAX_MEMO_ENTRIES
+    assert ('selection', 1, ('u0', 'x0')) not in stats._memo
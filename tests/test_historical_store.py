@@ -0,0 +1,47 @@
+"""Skompilowana historia: przebudowa po zmianie JSON-a, bez ponownego SHA-1 po samym touch."""
+import json
+import os
+
+import pytest
+
+import historical_store
+from historical_store import load_historical_frame
+
+HISTORY = {
+    "a": {"08.2022": {"miejsce": 1, "rezultat_uczestnika": "5", "status": None}},
+    "b": {"08.2022": {"miejsce": 2, "rezultat_uczestnika": "3", "status": None},
+          "09.2022": {"miejsce": 1, "rezultat_uczestnika": "7", "status": None}},
+}
+
+
+def _write_source(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def test_touched_source_is_hashed_once(tmp_path, monkeypatch):
+    source, target = str(tmp_path / "history.json"), str(tmp_path / "cache" / "history.feather")
+    _write_source(source, HISTORY)
+    assert len(load_historical_frame(source, target)) == 3
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # np. checkout z gita
+    hashed = []
+    sha1 = historical_store._source_sha1
+    monkeypatch.setattr(historical_store, "_source_sha1", lambda path: hashed.append(path) or sha1(path))
+    monkeypatch.setattr(historical_store, "compile_historical_data", lambda *a: pytest.fail("przebudowa mimo tej samej treści"))
+
+    for _ in range(3):
+        assert len(load_historical_frame(source, target)) == 3
+    assert hashed == [source]
+
+
+def test_changed_source_is_recompiled(tmp_path):
+    source, target = str(tmp_path / "history.json"), str(tmp_path / "history.feather")
+    _write_source(source, HISTORY)
+    load_historical_frame(source, target)
+
+    _write_source(source, {**HISTORY, "c": {"10.2022": {"miejsce": 1, "rezultat_uczestnika": "9", "status": None}}})
+    df = load_historical_frame(source, target)
+    assert sorted(df['uczestnik'].unique()) == ["a", "b", "c"]
+    assert df['edycja_nr'].max() == 3
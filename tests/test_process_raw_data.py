@@ -0,0 +1,38 @@
+"""process_raw_data: duplikaty (uczestnik, dzień) rozstrzyga najnowszy Timestamp."""
+import pandas as pd
+
+from data_loader import process_raw_data
+
+EXPECTED_COLS = ['Participant', 'Day', 'Status', 'Timestamp']
+
+
+def _process(rows):
+    df_raw = pd.DataFrame(rows, columns=EXPECTED_COLS + ['Notes'])
+    current_data, max_day, ok = process_raw_data(df_raw, 'pl', EXPECTED_COLS, 'Arkusz')
+    assert ok
+    return current_data, max_day
+
+
+def test_latest_timestamp_wins_regardless_of_row_order():
+    current_data, max_day = _process([
+        ['a', 1, 'Zaliczone', '2025-12-01T12:00:00', 'nowszy'],
+        ['a', 1, 'Niezaliczone', '2025-12-01T09:00:00', 'starszy'],
+        ['a', 2, 'Zaliczone', '', 'bez czasu'],
+        ['a', 2, 'Niezaliczone', '2025-12-02T09:00:00', 'z czasem'],
+    ])
+    assert max_day == 2
+    assert current_data['a'][1]['notes'] == 'nowszy'
+    assert current_data['a'][2]['notes'] == 'z czasem'
+
+
+def test_mixed_naive_and_timezone_aware_timestamps():
+    current_data, _ = _process([
+        ['a', 1, 'Zaliczone', '2025-12-01T10:00:00.123456', 'naiwny'],
+        ['a', 1, 'Niezaliczone', '2025-12-01T11:00:00Z', 'utc'],
+        ['b', 1, 'Niezaliczone', '2025-12-01T12:00:00+02:00', 'strefa'],
+        ['b', 1, 'Zaliczone', '2025-12-01T10:30:00', 'naiwny'],
+        ['c', 1, 'Zaliczone', 'nie-data', 'śmieci'],
+    ])
+    assert current_data['a'][1]['notes'] == 'utc'
+    assert current_data['b'][1]['notes'] == 'naiwny'
+    assert current_data['c'][1]['notes'] == 'śmieci'
@@ -0,0 +1,55 @@
+"""
+Złoty test rankingu: silnik z kluczem sortowania w jednej liczbie
+(RankingSnapshot.sort_keys) daje te same rankingi co pierwotny algorytm -
+dla każdego dnia, live i official, PL i EN.
+"""
+import pytest
+
+from edition_matrix import EditionMatrix
+from page_current_ranking import calculate_ranking, compute_ranking
+import reference
+
+SEEDS = range(80)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_calculate_ranking_matches_original(seed):
+    data, max_day, participants = reference.random_edition(seed)
+    complete_stages = reference.find_last_complete_stage(data, {}, max_day, participants)
+    matrix = EditionMatrix.from_processed(data, participants, max_day)
+
+    for day in range(0, max_day + 2):
+        stages = complete_stages if day == max_day else None
+        for ranking_type in ('live', 'official'):
+            for lang in ('pl', 'en'):
+                expected, expected_elim = reference.calculate_ranking(data, day, lang, participants, ranking_type, stages)
+                ranking, elimination_map = calculate_ranking(matrix, day, lang, ranking_type, stages)
+                assert ranking.equals(expected), (day, ranking_type, lang)
+                assert elimination_map == expected_elim
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_compute_ranking_ranks_match_original(seed):
+    """Miejsca i kolejność uczestników w neutralnym językowo wyniku."""
+    data, max_day, participants = reference.random_edition(seed, participants_count=40, days_count=60)
+    matrix = EditionMatrix.from_processed(data, participants, max_day)
+
+    for day in range(1, max_day + 1):
+        for ranking_type in ('live', 'official'):
+            expected, _ = reference.calculate_ranking(data, day, 'pl', participants, ranking_type)
+            ranking, _ = compute_ranking(matrix, day, ranking_type)
+            assert ranking['rank'].tolist() == expected.iloc[:, 0].tolist()
+            assert ranking['participant'].tolist() == expected.iloc[:, 1].tolist()
+
+
+def test_ties_share_rank():
+    """Identyczna historia = to samo miejsce, następne miejsce przeskakuje."""
+    passed = {"status": "Zaliczone"}
+    data = {p: {1: passed, 2: passed} for p in ("a", "b")}
+    data["c"] = {1: passed}
+    matrix = EditionMatrix.from_processed(data, ["a", "b", "c"], 2)
+
+    ranking, _ = compute_ranking(matrix, 2)
+
+    assert ranking['rank'].tolist() == [1, 1, 3]
+    assert ranking['participant'].tolist() == ["a", "b", "c"]
@@ -0,0 +1,80 @@
+"""Rejestr wysyłek: jeden newsletter na etap, osobno dla każdej edycji (także tego samego miesiąca)."""
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import notifications
+import send_ledger
+from send_ledger import SendLedger, edition_ledger_key
+
+PARTICIPANTS = ["a", "b"]
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    ledger = SendLedger(str(tmp_path / "ledger.sqlite"))
+    monkeypatch.setattr(notifications, "get_send_ledger", lambda: ledger)
+    return ledger
+
+
+def _edition_sheet(days):
+    rows = [
+        {"Participant": p, "Day": d, "Status": "Zaliczone", "Timestamp": f"2025-12-{d:02d}T10:00:00", "Notes": ""}
+        for d in range(1, days + 1) for p in PARTICIPANTS
+    ]
+    return pd.DataFrame(rows)
+
+
+def _newsletters(emails):
+    return [e.subject for e in emails if isinstance(e.recipients, list)]
+
+
+def test_claim_once_then_sent(ledger):
+    assert ledger.claim("EdycjaMaj@2026-05-01", 3)
+    assert not ledger.claim("EdycjaMaj@2026-05-01", 3)
+    ledger.mark("EdycjaMaj@2026-05-01", 3, True)
+    assert ledger.last_sent_stage("EdycjaMaj@2026-05-01") == 3
+    assert not ledger.claim("EdycjaMaj@2026-05-01", 3)
+
+
+def test_failed_claim_taken_over_after_timeout(ledger, monkeypatch):
+    assert ledger.claim("EdycjaMaj@2026-05-01", 3)
+    ledger.mark("EdycjaMaj@2026-05-01", 3, False)
+    assert not ledger.claim("EdycjaMaj@2026-05-01", 3)
+    monkeypatch.setattr(send_ledger, "CLAIM_TIMEOUT_SECONDS", -1)
+    assert ledger.claim("EdycjaMaj@2026-05-01", 3)
+
+
+def test_key_includes_sheet_and_start_date():
+    this_year = {"sheet_name": "EdycjaGrudzien", "start_date": date(2025, 12, 1)}
+    next_year = {"sheet_name": "EdycjaGrudzien", "start_date": date(2026, 12, 1)}
+    from_json = {"sheet_name": "EdycjaGrudzien", "start_date": "2025-12-01"}
+    assert edition_ledger_key(this_year) != edition_ledger_key(next_year)
+    assert edition_ledger_key(this_year) == edition_ledger_key(from_json)
+
+
+def test_editions_sharing_month_key_are_tracked_separately(ledger, monkeypatch):
+    sheets = {"EdycjaGrudzien": _edition_sheet(10), "Emails": pd.DataFrame({
+        "Nick": PARTICIPANTS, "Email": ["a@x", "b@x"], "Alert_Risk": ["TRUE"] * 2, "Alert_Results": ["TRUE"] * 2,
+    })}
+    monkeypatch.setattr(notifications, "load_google_sheet_data", lambda conn, name: sheets[name].copy())
+    log = lambda level, text: None
+
+    # Zeszłoroczny grudzień: wysłany etap 10
+    monkeypatch.setitem(notifications.EDITIONS_CONFIG, "december", {
+        "start_date": date(2025, 12, 1), "sheet_name": "EdycjaGrudzien", "participants": PARTICIPANTS,
+    })
+    emails = notifications.collect_notifications(object(), "december", None, None, None, log)
+    assert _newsletters(emails) == ["🏁 Poprzeczka: Wyniki Etapu 10"]
+    for email in emails:
+        email.report(True)
+    assert _newsletters(notifications.collect_notifications(object(), "december", None, None, None, log)) == []
+
+    # Nowy grudzień pod tym samym kluczem miesiąca: etap 4 nie może uchodzić za wysłany
+    sheets["EdycjaGrudzien"] = _edition_sheet(4)
+    monkeypatch.setitem(notifications.EDITIONS_CONFIG, "december", {
+        "start_date": date(2026, 12, 1), "sheet_name": "EdycjaGrudzien", "participants": PARTICIPANTS,
+    })
+    emails = notifications.collect_notifications(object(), "december", None, None, None, log)
+    assert _newsletters(emails) == ["🏁 Poprzeczka: Wyniki Etapu 4"]
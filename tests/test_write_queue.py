@@ -0,0 +1,127 @@
+"""Kolejka zapisów: idempotencja, rozpoznawanie niejasnych błędów, ponowienia i dead_writes."""
+import pytest
+from gspread.exceptions import APIError, WorksheetNotFound
+
+import write_queue
+from write_queue import WriteQueue, _is_ambiguous, flush_worksheet, row_key
+
+ROW = ["a", 3, "Zaliczone", "2025-12-03T10:00:00.123456", ""]
+OTHER_ROW = ["b", 3, "Zaliczone", "2025-12-03T10:05:00.654321", ""]
+
+
+class FakeResponse:
+    def __init__(self, code):
+        self.code = code
+        self.text = ""
+
+    def json(self):
+        return {"error": {"code": self.code, "message": "błąd", "status": ""}}
+
+
+class FakeWorksheet:
+    def __init__(self, values=()):
+        self.values = [list(row) for row in values]
+        self.append_calls = 0
+
+    def get_all_values(self):
+        return [[write_queue._cell(v) for v in row] for row in self.values]
+
+    def append_rows(self, rows):
+        self.append_calls += 1
+        self.values.extend(rows)
+
+
+class FakeSheet:
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+
+    def worksheet(self, name):
+        if name not in self.worksheets:
+            raise WorksheetNotFound(name)
+        return self.worksheets[name]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WriteQueue(str(tmp_path / "queue.sqlite"))
+
+
+def test_enqueue_skips_queued_and_written_rows(queue):
+    assert queue.enqueue("EdycjaGrudzien", [ROW]) == [ROW]
+    assert queue.enqueue("EdycjaGrudzien", [ROW]) == []
+    assert queue.enqueue("LogWpisow", [ROW]) == [ROW]
+
+    entries = queue.due_batches()["EdycjaGrudzien"]
+    queue.mark_written(entries)
+    assert queue.pending_rows("EdycjaGrudzien") == []
+    assert queue.enqueue("EdycjaGrudzien", [ROW]) == []
+
+
+def test_row_key_matches_values_read_back_from_sheet():
+    read_back = ["a", "3", "Zaliczone", "2025-12-03T10:00:00.123456"]
+    assert row_key("EdycjaGrudzien", ROW) == row_key("EdycjaGrudzien", read_back)
+    assert row_key("EdycjaGrudzien", ROW) != row_key("LogWpisow", ROW)
+
+
+@pytest.mark.parametrize("error, ambiguous", [
+    (APIError(FakeResponse(429)), False),
+    (APIError(FakeResponse(400)), False),
+    (WorksheetNotFound("EdycjaGrudzien"), False),
+    (APIError(FakeResponse(503)), True),
+    (ConnectionError("reset"), True),
+    (TimeoutError(), True),
+])
+def test_is_ambiguous(error, ambiguous):
+    assert _is_ambiguous(error) is ambiguous
+
+
+def test_flush_after_ambiguous_error_skips_rows_already_in_sheet(queue):
+    queue.enqueue("EdycjaGrudzien", [ROW, OTHER_ROW])
+    queue.mark_failed(queue.due_batches()["EdycjaGrudzien"], APIError(FakeResponse(503)))
+
+    ws = FakeWorksheet([ROW])  # pierwsza próba jednak doszła dla jednego wiersza
+    entries = queue.due_batches(now=float("inf"))["EdycjaGrudzien"]
+    assert all(needs_check for *_, needs_check in entries)
+    assert flush_worksheet(FakeSheet({"EdycjaGrudzien": ws}), queue, "EdycjaGrudzien", entries) == 1
+    assert ws.values == [ROW, OTHER_ROW]
+    assert queue.stats()["pending"] == 0
+
+
+def test_backoff_grows_exponentially_up_to_cap(queue, monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(write_queue.time, "time", lambda: now)
+    queue.enqueue("EdycjaGrudzien", [ROW])
+
+    delays = []
+    for _ in range(write_queue.MAX_ATTEMPTS - 1):
+        entries = queue.due_batches(now=float("inf"))["EdycjaGrudzien"]
+        queue.mark_failed(entries, APIError(FakeResponse(429)))
+        delays.append(queue.next_attempt_at() - now)
+        assert queue.due_batches(now=now) == {}
+
+    assert delays[:4] == [5, 10, 20, 40]
+    assert max(delays) == write_queue.MAX_RETRY_SECONDS
+    assert delays == sorted(delays)
+
+
+def test_row_goes_dead_after_max_attempts_and_stops_blocking(queue):
+    sheet = FakeSheet({})
+    queue.enqueue("Usunieta", [ROW])
+    queue.enqueue("Usunieta", [OTHER_ROW])
+
+    for _ in range(write_queue.MAX_ATTEMPTS):
+        batch = queue.due_batches(now=float("inf"))["Usunieta"][:1]
+        with pytest.raises(WorksheetNotFound) as excinfo:
+            flush_worksheet(sheet, queue, "Usunieta", batch)
+        queue.mark_failed(batch, excinfo.value)
+
+    stats = queue.stats()
+    assert (stats["pending"], stats["dead"]) == (1, 1)
+    [dead] = queue.dead_writes()
+    assert dead["row"] == ROW and dead["attempts"] == write_queue.MAX_ATTEMPTS
+    # Kolejny wiersz zakładki nie czeka już za porzuconym
+    assert [row for _, _, row, _ in queue.due_batches()["Usunieta"]] == [OTHER_ROW]
+
+    assert queue.retry_dead_writes() == 1
+    assert queue.stats()["dead"] == 0
+    assert queue.pending_rows("Usunieta") == [OTHER_ROW, ROW]
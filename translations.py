@@ -337,6 +337,15 @@ translations = {
         'scatter_plot_title': "Wyniki uczestników w poszczególnych edycjach (z miejscami)",
         'scatter_plot_desc': "Wykres punktowy przedstawiający wyniki każdego uczestnika w kolejnych edycjach. Kolor punktu oznacza zajęte miejsce.",
         'position_legend': "Miejsce",
+        # --- ZAKŁADKI STATYSTYK HISTORYCZNYCH ---
+        'hist_tab_participants': "👤 Uczestnicy",
+        'hist_tab_monthly': "📅 Zestawienia",
+        'hist_tab_medals': "🏅 Medale",
+        'hist_tab_positions': "🗺️ Miejsca",
+        'hist_tab_player_stats': "📊 Statystyki graczy",
+        'hist_tab_editions': "🗓️ Edycje",
+        'hist_tab_records': "🏆 Rekordy",
+        'hist_tab_survival': "⏳ Przetrwanie",
         # --- KRONIKA HISTORYCZNA ---
         'chronicle_title': "🏆 Kronika Historyczna",
         'chronicle_description': "Kompletna historia wszystkich edycji, podzielona na lata.",
@@ -692,6 +701,15 @@ translations = {
         'scatter_plot_title': "Participant results in each edition (with positions)",
         'scatter_plot_desc': "Scatter plot showing each participant's results in subsequent editions. Point color indicates position held.",
         'position_legend': "Position",
+        # --- HISTORICAL STATS TABS ---
+        'hist_tab_participants': "👤 Participants",
+        'hist_tab_monthly': "📅 Monthly tables",
+        'hist_tab_medals': "🏅 Medals",
+        'hist_tab_positions': "🗺️ Positions",
+        'hist_tab_player_stats': "📊 Player stats",
+        'hist_tab_editions': "🗓️ Editions",
+        'hist_tab_records': "🏆 Records",
+        'hist_tab_survival': "⏳ Survival",
     }
 }
 
@@ -0,0 +1,402 @@
+"""
+Trwała kolejka zapisów do Google Sheets (SQLite obok aplikacji).
+
+Zapis formularza robił dwa kolejne append_row (zakładka edycji, potem
+LogWpisow), a użytkownik czekał na oba. Teraz wiersze trafiają najpierw do
+lokalnej bazy - to jest potwierdzenie zapisu - i od razu do pamięci zakładek,
+a wątek w tle wysyła je partiami: jedno append_rows na zakładkę dla
+wszystkich oczekujących wierszy.
+
+Każdy wiersz ma klucz idempotencji (skrót zakładki i treści wiersza; znacznik
+czasu z mikrosekundami czyni go unikalnym). Ten sam wiersz nie trafi do
+kolejki dwa razy, a po błędzie, przy którym nie wiadomo, czy zapis doszedł
+(zerwane połączenie, błąd 5xx), przed ponowieniem sprawdzamy, które wiersze
+są już w arkuszu. Po limicie zapytań (429) i innych błędach kolejne próby
+odsuwają się wykładniczo. Wiersz, którego po MAX_ATTEMPTS próbach nadal nie
+da się zapisać (np. zakładkę usunięto lub przemianowano), trafia do tabeli
+dead_writes - widać go w panelu admina, można go ponowić i nie blokuje już
+kolejnych wierszy zakładki. Zakładamy jeden proces aplikacji na bazę.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+from gspread.exceptions import APIError, WorksheetNotFound
+
+from config import WRITE_QUEUE_PATH
+from sheet_cache import patch_cached_worksheet
+
+MAX_BATCH_ROWS = 500
+# Krótka zwłoka po zgłoszeniu - zapisy z kilku sesji naraz idą jednym żądaniem
+BATCH_WINDOW_SECONDS = 0.5
+RETRY_BASE_SECONDS = 5
+MAX_RETRY_SECONDS = 1800
+# Po tylu nieudanych próbach wiersz przechodzi do dead_writes (łącznie ok. 1,7 h ponowień)
+MAX_ATTEMPTS = 12
+# Klucze zapisanych wierszy pamiętamy tydzień - ponowne zgłoszenie tego samego wiersza jest pomijane
+WRITTEN_KEYS_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _cell(value):
+    """Komórka tak, jak odczyta ją get_all_values (RAW: 5.0 -> "5")."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def row_key(worksheet_name, row):
+    """Klucz idempotencji wiersza: skrót nazwy zakładki i treści (bez pustych komórek na końcu)."""
+    cells = [_cell(v) for v in row]
+    while cells and cells[-1] == "":
+        cells.pop()
+    return hashlib.sha1(json.dumps([worksheet_name, cells]).encode()).hexdigest()
+
+
+def _is_ambiguous(error):
+    """
+    Czy po błędzie wiersze mogły jednak trafić do arkusza. Odpowiedź 4xx
+    (w tym limit 429) i brak zakładki oznaczają, że zapisu nie było; 5xx
+    i błędy sieci - nie wiadomo.
+    """
+    if isinstance(error, WorksheetNotFound):
+        return False
+    return not (isinstance(error, APIError) and 400 <= error.code < 500)
+
+
+class WriteQueue:
+    """Oczekujące wiersze (pending_writes), porzucone po MAX_ATTEMPTS (dead_writes) i klucze już zapisanych (written_keys)."""
+
+    def __init__(self, path=WRITE_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.enabled = True
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with self._connect() as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS pending_writes ("
+                    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " idempotency_key TEXT NOT NULL UNIQUE,"
+                    " worksheet TEXT NOT NULL,"
+                    " row TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " attempts INTEGER NOT NULL DEFAULT 0,"
+                    " next_attempt_at REAL NOT NULL DEFAULT 0,"
+                    " needs_check INTEGER NOT NULL DEFAULT 0,"
+                    " last_error TEXT)"
+                )
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS dead_writes ("
+                    " id INTEGER PRIMARY KEY,"
+                    " idempotency_key TEXT NOT NULL UNIQUE,"
+                    " worksheet TEXT NOT NULL,"
+                    " row TEXT NOT NULL,"
+                    " created_at REAL NOT NULL,"
+                    " attempts INTEGER NOT NULL,"
+                    " needs_check INTEGER NOT NULL,"
+                    " failed_at REAL NOT NULL,"
+                    " last_error TEXT)"
+                )
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS written_keys ("
+                    " idempotency_key TEXT PRIMARY KEY,"
+                    " written_at REAL NOT NULL)"
+                )
+        except (OSError, sqlite3.Error) as e:
+            # Brak zapisu na dysk - formularz zapisuje wtedy bezpośrednio do arkusza
+            print(f"Kolejka zapisów wyłączona ({self.path}): {e}")
+            self.enabled = False
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:  # commit/rollback
+                yield db
+        finally:
+            db.close()
+
+    def enqueue(self, worksheet_name, rows):
+        """Dopisuje wiersze do kolejki; zwraca te, których jeszcze nie było (po kluczu)."""
+        now = time.time()
+        added = []
+        with self._lock, self._connect() as db:
+            for row in rows:
+                key = row_key(worksheet_name, row)
+                if db.execute("SELECT 1 FROM written_keys WHERE idempotency_key = ?", (key,)).fetchone():
+                    continue
+                cursor = db.execute(
+                    "INSERT OR IGNORE INTO pending_writes (idempotency_key, worksheet, row, created_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, worksheet_name, json.dumps(list(row), default=str), now)
+                )
+                if cursor.rowcount:
+                    added.append(row)
+        return added
+
+    def pending_rows(self, worksheet_name):
+        """Wiersze zakładki czekające na wysłanie (w kolejności zgłoszenia)."""
+        if not self.enabled:
+            return []
+        try:
+            with self._connect() as db:
+                rows = db.execute(
+                    "SELECT row FROM pending_writes WHERE worksheet = ? ORDER BY id", (worksheet_name,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu kolejki zapisów: {e}")
+            return []
+        return [json.loads(row) for row, in rows]
+
+    def due_batches(self, now=None):
+        """
+        Partie gotowe do wysłania: {zakładka: [(id, klucz, wiersz, needs_check)]}.
+        Zakładka, której pierwszy wiersz czeka na ponowienie, czeka w całości -
+        wiersze jednej zakładki wysyłamy po kolei.
+        """
+        now = time.time() if now is None else now
+        with self._connect() as db:
+            records = db.execute(
+                "SELECT id, idempotency_key, worksheet, row, next_attempt_at, needs_check"
+                " FROM pending_writes ORDER BY id"
+            ).fetchall()
+        batches, waiting = {}, set()
+        for row_id, key, worksheet, row, next_attempt_at, needs_check in records:
+            if worksheet in waiting:
+                continue
+            if worksheet not in batches and next_attempt_at > now:
+                waiting.add(worksheet)
+                continue
+            batch = batches.setdefault(worksheet, [])
+            if len(batch) < MAX_BATCH_ROWS:
+                batch.append((row_id, key, json.loads(row), bool(needs_check)))
+        return batches
+
+    def next_attempt_at(self):
+        """Najbliższy termin próby - liczą się pierwsze wiersze zakładek (None = kolejka pusta)."""
+        with self._connect() as db:
+            return db.execute(
+                "SELECT MIN(next_attempt_at) FROM pending_writes"
+                " WHERE id IN (SELECT MIN(id) FROM pending_writes GROUP BY worksheet)"
+            ).fetchone()[0]
+
+    def unsent_rows(self, worksheet_name, frame):
+        """
+        Oczekujące wiersze zakładki, których nie ma jeszcze w ramce pobranej
+        z arkusza - pamięć zakładek dokleja je po każdym odświeżeniu.
+        """
+        rows = self.pending_rows(worksheet_name)
+        if not rows:
+            return []
+        present = {row_key(worksheet_name, values) for values in frame.itertuples(index=False)}
+        return [row for row in rows if row_key(worksheet_name, row) not in present]
+
+    def mark_written(self, entries):
+        """Usuwa zapisane wiersze z kolejki i zapamiętuje ich klucze."""
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.executemany("DELETE FROM pending_writes WHERE id = ?", [(row_id,) for row_id, *_ in entries])
+            db.executemany(
+                "INSERT OR REPLACE INTO written_keys VALUES (?, ?)", [(key, now) for _, key, *_ in entries]
+            )
+            db.execute("DELETE FROM written_keys WHERE written_at < ?", (now - WRITTEN_KEYS_TTL_SECONDS,))
+
+    def mark_failed(self, entries, error):
+        """
+        Odkłada ponowienie partii (wykładniczo); po niejasnym błędzie każe sprawdzić
+        arkusz. Wiersze po MAX_ATTEMPTS próbach przenosi do dead_writes.
+        """
+        now = time.time()
+        needs_check = int(_is_ambiguous(error))
+        with self._lock, self._connect() as db:
+            for row_id, *_ in entries:
+                attempts = db.execute("SELECT attempts FROM pending_writes WHERE id = ?", (row_id,)).fetchone()
+                if attempts is None:
+                    continue
+                delay = min(RETRY_BASE_SECONDS * 2 ** attempts[0], MAX_RETRY_SECONDS)
+                db.execute(
+                    "UPDATE pending_writes SET attempts = attempts + 1, next_attempt_at = ?,"
+                    " needs_check = MAX(needs_check, ?), last_error = ? WHERE id = ?",
+                    (now + delay, needs_check, str(error), row_id)
+                )
+                if attempts[0] + 1 >= MAX_ATTEMPTS:
+                    db.execute(
+                        "INSERT OR REPLACE INTO dead_writes"
+                        " SELECT id, idempotency_key, worksheet, row, created_at, attempts, needs_check, ?, last_error"
+                        " FROM pending_writes WHERE id = ?",
+                        (now, row_id)
+                    )
+                    db.execute("DELETE FROM pending_writes WHERE id = ?", (row_id,))
+
+    def dead_writes(self):
+        """Porzucone wiersze do podglądu w panelu admina (najnowsze porażki pierwsze)."""
+        if not self.enabled:
+            return []
+        with self._connect() as db:
+            records = db.execute(
+                "SELECT worksheet, row, attempts, failed_at, last_error FROM dead_writes ORDER BY failed_at DESC"
+            ).fetchall()
+        return [
+            {'worksheet': worksheet, 'row': json.loads(row), 'attempts': attempts, 'failed_at': failed_at, 'error': error}
+            for worksheet, row, attempts, failed_at, error in records
+        ]
+
+    def retry_dead_writes(self):
+        """Wraca porzucone wiersze do kolejki z wyzerowanym licznikiem prób; zwraca ich liczbę."""
+        with self._lock, self._connect() as db:
+            moved = db.execute(
+                "INSERT OR IGNORE INTO pending_writes"
+                " (idempotency_key, worksheet, row, created_at, needs_check, last_error)"
+                " SELECT idempotency_key, worksheet, row, created_at, needs_check, last_error"
+                " FROM dead_writes ORDER BY id"
+            ).rowcount
+            db.execute("DELETE FROM dead_writes")
+        return moved
+
+    def stats(self):
+        """Liczba oczekujących i porzuconych wierszy, najstarszy oczekujący (wiek w s) i ostatni błąd."""
+        if not self.enabled:
+            return {'pending': 0, 'dead': 0, 'oldest_age': None, 'last_error': None}
+        try:
+            with self._connect() as db:
+                pending, oldest = db.execute("SELECT COUNT(*), MIN(created_at) FROM pending_writes").fetchone()
+                dead = db.execute("SELECT COUNT(*) FROM dead_writes").fetchone()[0]
+                last_error = db.execute(
+                    "SELECT last_error FROM pending_writes WHERE last_error IS NOT NULL ORDER BY next_attempt_at DESC LIMIT 1"
+                ).fetchone()
+        except sqlite3.Error as e:
+            return {'pending': 0, 'dead': 0, 'oldest_age': None, 'last_error': str(e)}
+        return {
+            'pending': pending,
+            'dead': dead,
+            'oldest_age': None if oldest is None else time.time() - oldest,
+            'last_error': last_error[0] if last_error else None,
+        }
+
+
+def flush_worksheet(sheet, queue, worksheet_name, entries):
+    """
+    Wysyła partię wierszy jednej zakładki jednym append_rows. Po wcześniejszym
+    niejasnym błędzie najpierw pomija wiersze, które już są w arkuszu.
+    """
+    ws = sheet.worksheet(worksheet_name)
+    if any(needs_check for *_, needs_check in entries):
+        existing = {row_key(worksheet_name, row) for row in ws.get_all_values()}
+        already_written = [entry for entry in entries if entry[1] in existing]
+        if already_written:
+            queue.mark_written(already_written)
+            entries = [entry for entry in entries if entry[1] not in existing]
+    if entries:
+        ws.append_rows([row for _, _, row, _ in entries])
+        queue.mark_written(entries)
+    return len(entries)
+
+
+class WriteQueueWorker:
+    """Wątek wysyłający kolejkę zapisów, z licznikami do podglądu w panelu admina."""
+
+    def __init__(self, sheet, queue):
+        self.sheet = sheet
+        self.queue = queue
+        self.written_count = 0
+        self.failure_count = 0
+        self.last_flush_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="write-queue", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        """Sygnał, że w kolejce są nowe wiersze."""
+        self._wake.set()
+
+    def flush_once(self, now=None):
+        """Wysyła wszystkie partie, na które przyszła pora; zwraca liczbę zapisanych wierszy."""
+        written = 0
+        for worksheet_name, entries in self.queue.due_batches(now).items():
+            try:
+                written += flush_worksheet(self.sheet, self.queue, worksheet_name, entries)
+            except Exception as e:
+                self.failure_count += 1
+                self.queue.mark_failed(entries, e)
+                print(f"Zapis {len(entries)} wierszy do {worksheet_name} nie powiódł się, ponowimy: {e}")
+        self.written_count += written
+        self.last_flush_at = time.time()
+        return written
+
+    def _next_delay(self):
+        next_at = self.queue.next_attempt_at()
+        if next_at is None:
+            return None  # pusta kolejka - czekamy na wake()
+        return max(0.0, next_at - time.time())
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._wake.wait(self._next_delay())
+                self._wake.clear()
+                if self._stop.wait(BATCH_WINDOW_SECONDS):
+                    break
+                self.flush_once()
+            except Exception as e:
+                # Np. chwilowo zablokowana baza - wątek nie może zginąć
+                print(f"Błąd kolejki zapisów: {e}")
+                self._stop.wait(RETRY_BASE_SECONDS)
+
+    def status(self):
+        return {**self.queue.stats(), 'written_count': self.written_count, 'failure_count': self.failure_count}
+
+
+@st.cache_resource
+def get_write_queue():
+    """Jedna kolejka zapisów na proces."""
+    return WriteQueue()
+
+
+@st.cache_resource(on_release=lambda worker: worker and worker.stop())
+def start_write_queue(_sheet):
+    """Uruchamia (raz na proces) wątek wysyłający kolejkę - także wiersze sprzed restartu."""
+    queue = get_write_queue()
+    if not queue.enabled:
+        return None
+    worker = WriteQueueWorker(_sheet, queue).start()
+    worker.wake()
+    return worker
+
+
+def queue_rows(sheet, writes):
+    """
+    Zgłasza zapis wierszy [(zakładka, wiersz), ...] i od razu dokleja je do
+    pamięci zakładek; do arkusza wysyła je wątek w tle. Bez kolejki (brak
+    dysku) zapisuje bezpośrednio, jak dawniej.
+    """
+    by_worksheet = {}
+    for worksheet_name, row in writes:
+        by_worksheet.setdefault(worksheet_name, []).append(row)
+
+    queue = get_write_queue()
+    if not queue.enabled:
+        for worksheet_name, rows in by_worksheet.items():
+            sheet.worksheet(worksheet_name).append_rows(rows)
+            patch_cached_worksheet(worksheet_name, rows)
+        return
+
+    for worksheet_name, rows in by_worksheet.items():
+        added = queue.enqueue(worksheet_name, rows)
+        if added:
+            patch_cached_worksheet(worksheet_name, added)
+    start_write_queue(sheet).wake()